@@ -0,0 +1,175 @@
+# agents/fanout.py
+"""
+Fan-out execution for the general-knowledge team.
+
+Instead of letting the leader call its members one after another, every
+member gets the question at once, each with its own deadline. The leader
+then writes the answer from whatever came back in time. If the leader
+misses its latency budget, a fallback answer built from the member
+outputs is returned instead (no extra model call).
+
+Every run reports per-member and leader timing:
+
+    {"mode": "fanout",
+     "members": {"WebSearchAgent": {"status": "ok", "seconds": 2.1}, ...},
+     "leader": {"status": "timeout", "seconds": 10.0},
+     "fallback": true, "seconds": 14.3}
+
+Statuses: ok, empty, timeout, error.
+"""
+
+import asyncio
+import re
+import time
+
+_THINK = re.compile(r"<think>.*?</think>", re.DOTALL)
+
+NO_ANSWER = "I couldn't gather enough information to answer that right now. Please try again in a moment."
+
+
+def _content(response) -> str:
+    content = getattr(response, "content", response)
+    return _THINK.sub("", content if isinstance(content, str) else str(content or "")).strip()
+
+
+def _timing(status: str, start: float, error: str = None):
+    timing = {"status": status, "seconds": round(time.perf_counter() - start, 3)}
+    if error:
+        timing["error"] = error
+    return timing
+
+
+class TeamFanout:
+    def __init__(self, members, leader, member_timeouts: dict, default_timeout: float,
+                 leader_budget: float, fallback_order=()):
+        self.members = members
+        self.leader = leader
+        self.member_timeouts = member_timeouts
+        self.default_timeout = default_timeout
+        self.leader_budget = leader_budget
+        # Member whose answer is preferred as the fallback, best first
+        self.fallback_order = list(fallback_order) or [m.name for m in members]
+
+    # ----------------------------------------------------
+    #   MEMBERS
+    # ----------------------------------------------------
+    async def _run_member(self, member, query: str):
+        start = time.perf_counter()
+        timeout = self.member_timeouts.get(member.name, self.default_timeout)
+        try:
+            content = _content(await asyncio.wait_for(member.arun(query), timeout))
+        except asyncio.TimeoutError:
+            return None, _timing("timeout", start)
+        except Exception as e:
+            return None, _timing("error", start, str(e))
+        return content or None, _timing("ok" if content else "empty", start)
+
+    async def run_members(self, query: str):
+        """Returns ({name: content}, {name: timing}) for all members, run concurrently."""
+        results = await asyncio.gather(*(self._run_member(m, query) for m in self.members))
+        outputs, timings = {}, {}
+        for member, (content, timing) in zip(self.members, results):
+            timings[member.name] = timing
+            if content:
+                outputs[member.name] = content
+        return outputs, timings
+
+    # ----------------------------------------------------
+    #   LEADER
+    # ----------------------------------------------------
+    def leader_prompt(self, query: str, outputs: dict) -> str:
+        if outputs:
+            findings = "\n\n".join(f"[{name}]\n{content}" for name, content in outputs.items())
+        else:
+            findings = "(none of your team members answered in time; rely on your own knowledge)"
+        return f"User question: {query}\n\nFindings from your team:\n{findings}\n\nWrite the final answer for the user."
+
+    def fallback(self, outputs: dict) -> str:
+        for name in self.fallback_order:
+            if name in outputs:
+                return outputs[name]
+        return NO_ANSWER
+
+    async def run(self, query: str):
+        """Returns (answer, meta)."""
+        start = time.perf_counter()
+        outputs, member_timings = await self.run_members(query)
+
+        leader_start = time.perf_counter()
+        answer, fallback = None, False
+        try:
+            answer = _content(await asyncio.wait_for(self.leader.arun(self.leader_prompt(query, outputs)),
+                                                     self.leader_budget))
+            leader = _timing("ok" if answer else "empty", leader_start)
+        except asyncio.TimeoutError:
+            leader = _timing("timeout", leader_start)
+        except Exception as e:
+            leader = _timing("error", leader_start, str(e))
+
+        if not answer:
+            answer, fallback = self.fallback(outputs), True
+        return answer, {
+            "mode": "fanout",
+            "members": member_timings,
+            "leader": leader,
+            "fallback": fallback,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    async def stream(self, query: str, meta: dict = None):
+        """
+        Yields the answer in chunks. The leader's budget applies to its first
+        token; once it has started streaming it is allowed to finish.
+        `meta` (if given) is filled in like the one returned by run().
+        """
+        from agno.run.agent import RunEvent
+
+        meta = meta if meta is not None else {}
+        start = time.perf_counter()
+        outputs, member_timings = await self.run_members(query)
+        meta.update({"mode": "fanout", "members": member_timings, "fallback": False})
+
+        leader_start = time.perf_counter()
+        stream = self.leader.arun(self.leader_prompt(query, outputs), stream=True).__aiter__()
+        streamed, in_think, status, error = False, False, "ok", None
+        try:
+            while True:
+                if streamed:
+                    event = await stream.__anext__()
+                else:
+                    remaining = self.leader_budget - (time.perf_counter() - leader_start)
+                    event = await asyncio.wait_for(stream.__anext__(), max(remaining, 0))
+                if getattr(event, "event", None) != RunEvent.run_content or not isinstance(event.content, str):
+                    continue
+                token = event.content
+                # qwen3 may open with a <think> block; it is not part of the answer
+                if "<think>" in token:
+                    in_think = True
+                if in_think:
+                    if "</think>" in token:
+                        in_think = False
+                        token = token.split("</think>", 1)[1]
+                    else:
+                        continue
+                if not streamed and not token.strip():
+                    continue
+                streamed = True
+                yield token
+        except StopAsyncIteration:
+            pass
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except Exception as e:
+            status, error = "error", str(e)
+        finally:
+            if hasattr(stream, "aclose"):
+                try:
+                    await stream.aclose()
+                except Exception:
+                    pass
+
+        if not streamed:
+            meta["fallback"] = True
+            yield self.fallback(outputs)
+        meta["leader"] = _timing(status if streamed or status != "ok" else "empty", leader_start, error)
+        meta["seconds"] = round(time.perf_counter() - start, 3)
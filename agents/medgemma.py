@@ -1,63 +1,120 @@
-from transformers import pipeline
+import asyncio
 import os
 from dotenv import load_dotenv
 
+from agents.model_server import BatchingModelServer, QueueFullError
+
 load_dotenv()
 
-# Initialize the pipeline globally so it loads once when the app starts
-pipe = None
-init_error = None
-
-def init_medgemma():
-    global pipe, init_error
-    if pipe is None:
-        try:
-            print("Loading MedGemma model. This may take a while depending on hardware...")
-            hf_token = os.getenv("HF_TOKEN")
-            pipe = pipeline(
-                "image-text-to-text", 
-                model="google/medgemma-4b-it", 
-                device_map="auto",
-                token=hf_token
-            )
-            print("MedGemma loaded successfully.")
-        except Exception as e:
-            init_error = str(e)
-            print(f"Error loading MedGemma: {e}")
-
-def run_medgemma_inference(text_query: str, image_url: str = None) -> str:
-    global pipe
-    if pipe is None:
-        init_medgemma()
-    
-    if pipe is None:
-        return f"MedGemma Initialization Error: {init_error}"
+# Any image-text-to-text checkpoint works; point this at a tiny model for tests
+MEDGEMMA_MODEL_ID = os.getenv("MEDGEMMA_MODEL_ID", "google/medgemma-4b-it")
+MEDGEMMA_MAX_NEW_TOKENS = int(os.getenv("MEDGEMMA_MAX_NEW_TOKENS", "256"))
+MEDGEMMA_WORKERS = int(os.getenv("MEDGEMMA_WORKERS", "1"))
+MEDGEMMA_QUEUE_SIZE = int(os.getenv("MEDGEMMA_QUEUE_SIZE", "16"))
+MEDGEMMA_MAX_BATCH = int(os.getenv("MEDGEMMA_MAX_BATCH", "4"))
+MEDGEMMA_MAX_WAIT_MS = float(os.getenv("MEDGEMMA_MAX_WAIT_MS", "50"))
+MEDGEMMA_TIMEOUT = float(os.getenv("MEDGEMMA_TIMEOUT", "300"))
+
+
+# ----------------------------------------------------
+#   WORKER SIDE (runs inside the model server process)
+# ----------------------------------------------------
+def load_pipeline():
+    from transformers import pipeline
 
+    print(f"Loading MedGemma model ({MEDGEMMA_MODEL_ID}). This may take a while depending on hardware...")
+    pipe = pipeline(
+        "image-text-to-text",
+        model=MEDGEMMA_MODEL_ID,
+        device_map="auto",
+        token=os.getenv("HF_TOKEN")
+    )
+    print("MedGemma loaded successfully.")
+    return pipe
+
+
+def _build_messages(text_query: str, image_url: str = None):
     content = []
     if image_url:
         content.append({"type": "image", "url": image_url})
-    
+
     content.append({"type": "text", "text": text_query})
 
-    messages = [
+    return [
         {
             "role": "user",
             "content": content
         },
     ]
 
+
+def _extract_text(result) -> str:
+    # Batched calls return one list per input; single calls return the list itself
+    if isinstance(result, list) and len(result) > 0:
+        result = result[0]
+    if isinstance(result, dict) and 'generated_text' in result:
+        # With chat templates, pipeline usually returns the ASSISTANT's message as a dict
+        gen_text = result['generated_text']
+        if isinstance(gen_text, list):
+            # Usually the last message is the assistant's
+            return gen_text[-1].get('content', str(gen_text))
+        return str(gen_text)
+    return str(result)
+
+
+def infer_batch(pipe, requests):
+    messages = [_build_messages(r["text"], r.get("image_url")) for r in requests]
+    results = pipe(text=messages, max_new_tokens=MEDGEMMA_MAX_NEW_TOKENS, batch_size=len(messages))
+    if len(messages) == 1 and results and isinstance(results[0], dict):
+        results = [results]
+    return [_extract_text(r) for r in results]
+
+
+# ----------------------------------------------------
+#   APP SIDE
+# ----------------------------------------------------
+# The model lives in its own process(es); requests are queued, micro-batched
+# and rejected with QueueFullError once MEDGEMMA_QUEUE_SIZE are waiting.
+server = BatchingModelServer(
+    "medgemma",
+    loader="agents.medgemma:load_pipeline",
+    handler="agents.medgemma:infer_batch",
+    num_workers=MEDGEMMA_WORKERS,
+    max_queue=MEDGEMMA_QUEUE_SIZE,
+    max_batch_size=MEDGEMMA_MAX_BATCH,
+    max_wait_ms=MEDGEMMA_MAX_WAIT_MS,
+    request_timeout=MEDGEMMA_TIMEOUT,
+)
+
+
+def submit_medgemma(text_query: str, image_url: str = None, block: bool = False):
+    """Queues an inference and returns a concurrent Future (raises QueueFullError if busy)."""
+    return server.submit({"text": text_query, "image_url": image_url}, block=block)
+
+
+def run_medgemma_inference(text_query: str, image_url: str = None, block: bool = False) -> str:
+    future = submit_medgemma(text_query, image_url, block=block)
+    try:
+        return future.result(timeout=MEDGEMMA_TIMEOUT)
+    except TimeoutError:
+        future.cancel()
+        return f"MedGemma inference error: timed out after {MEDGEMMA_TIMEOUT:.0f}s"
+    except Exception as e:
+        return f"MedGemma inference error: {str(e)}"
+
+
+async def arun_medgemma_inference(text_query: str, image_url: str = None) -> str:
+    """Awaitable variant: waits on the model server without tying up a thread."""
+    future = submit_medgemma(text_query, image_url)
     try:
-        results = pipe(text=messages, max_new_tokens=256)
-        if isinstance(results, list) and len(results) > 0:
-             # Extract generated text; format may vary based on pipeline output
-             if 'generated_text' in results[0]:
-                 # Sometimes generated_text contains the whole prompt too. We might need to clean it.
-                 # With chat templates, pipeline usually returns the ASSISTANT's message as a dict
-                 gen_text = results[0]['generated_text']
-                 if isinstance(gen_text, list):
-                     # Usually the last message is the assistant's
-                     return gen_text[-1].get('content', str(gen_text))
-                 return str(gen_text)
-        return str(results)
+        return await asyncio.wait_for(asyncio.wrap_future(future), MEDGEMMA_TIMEOUT)
     except Exception as e:
         return f"MedGemma inference error: {str(e)}"
+
+
+def get_stats():
+    return server.stats()
+
+
+def shutdown():
+    server.shutdown()
@@ -1,33 +1,122 @@
-import joblib
 import numpy as np
 import os 
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-model = joblib.load(os.path.join(BASE_DIR, "cancer_prediction_model.pkl"))
-le_target = joblib.load(os.path.join(BASE_DIR, "target_encoder.pkl"))
-le_sex = joblib.load(os.path.join(BASE_DIR, "sex_encoder.pkl"))
+# arrays: memory-mapped tree export (agents/model_arrays, see agents/tree_arrays.py)
+# pickle: the original joblib artifacts; auto prefers arrays when present
+ML_MODEL_FORMAT = os.getenv("ML_MODEL_FORMAT", "auto")
+ARRAYS_DIR = os.path.join(BASE_DIR, "model_arrays")
 
-def predict_cancer(data):
+# Column order the model was trained on
+FEATURE_COLUMNS = [
+    "Diagnosis Age",
+    "Mutation Count",
+    "Sex",
+    "TMB (nonsynonymous)",
+    "Number of Samples Per Patient"
+]
+
+if ML_MODEL_FORMAT == "arrays" or (
+    ML_MODEL_FORMAT == "auto" and os.path.exists(os.path.join(ARRAYS_DIR, "meta.json"))
+):
+    from agents.tree_arrays import TreeArrayModel
+
+    # Pages are shared by every worker that maps the same files
+    model = TreeArrayModel(ARRAYS_DIR)
+    target_classes = model.meta["target_classes"]
+    sex_classes = model.meta["sex_classes"]
+else:
+    import joblib
+
+    model = joblib.load(os.path.join(BASE_DIR, "cancer_prediction_model.pkl"))
+    le_target = joblib.load(os.path.join(BASE_DIR, "target_encoder.pkl"))
+    le_sex = joblib.load(os.path.join(BASE_DIR, "sex_encoder.pkl"))
+    target_classes = list(le_target.inverse_transform(model.classes_))
+    sex_classes = list(le_sex.classes_)
+
+# Lookup tables replacing the LabelEncoder transforms
+_target_labels = np.asarray(target_classes, dtype=object)
+_sex_codes = {label: code for code, label in enumerate(sex_classes)}
+
+
+def encode_sex(values):
+    """
+    Vectorized LabelEncoder lookup. Returns (codes, valid_mask); unknown
+    labels get code -1 and valid=False instead of raising.
+    """
+    codes = np.fromiter((_sex_codes.get(v, -1) for v in values), dtype=np.int64, count=len(values))
+    return codes, codes >= 0
+
+
+def to_numeric(values):
+    """
+    Converts one feature column to float64. Returns (numbers, valid_mask);
+    missing (None, "", NaN), infinite and non-numeric values are invalid.
+    """
+    try:
+        # Fast path: the whole column converts at once
+        numbers = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        numbers = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            try:
+                numbers[i] = float(value)
+            except (TypeError, ValueError):
+                pass
+    return numbers, np.isfinite(numbers)
 
-    # Encode sex
-    sex_encoded = le_sex.transform([data["Sex"]])[0]
 
-    features = np.array([[
-        float(data["Diagnosis Age"]),
-        float(data["Mutation Count"]),
-        sex_encoded,
-        float(data["TMB (nonsynonymous)"]),
-        float(data["Number of Samples Per Patient"])
-    ]])
+def predict_cancer_batch(columns):
+    """
+    Scores many patients in one vectorized pass.
+
+    `columns` maps each name in FEATURE_COLUMNS to a sequence of values.
+    Returns (predictions, confidences, errors); rows with an unknown Sex or a
+    missing / non-numeric feature are left as None / NaN and get an error
+    message, every other row's error is None.
+    """
+    sex_codes, valid = encode_sex(columns["Sex"])
+    n = len(sex_codes)
+    errors = np.full(n, None, dtype=object)
+    for i in np.flatnonzero(~valid):
+        errors[i] = f"Unknown Sex value: {columns['Sex'][i]!r}"
+
+    features = np.empty((n, len(FEATURE_COLUMNS)), dtype=np.float64)
+    for j, name in enumerate(FEATURE_COLUMNS):
+        if name == "Sex":
+            features[:, j] = sex_codes
+            continue
+        features[:, j], numeric = to_numeric(columns[name])
+        for i in np.flatnonzero(~numeric & valid):
+            errors[i] = f"Invalid {name} value: {columns[name][i]!r}"
+        valid &= numeric
+
+    predictions = np.full(n, None, dtype=object)
+    confidences = np.full(n, np.nan)
+
+    if valid.any():
+        # One predict_proba call; the predicted class is its argmax
+        probability = model.predict_proba(features[valid])
+        predictions[valid] = _target_labels[np.argmax(probability, axis=1)]
+        confidences[valid] = np.max(probability, axis=1) * 100
+
+    return predictions, confidences, errors
+
+
+def predict_cancer(data):
 
-    prediction = model.predict(features)
-    probability = model.predict_proba(features)
+    predictions, confidences, errors = predict_cancer_batch(
+        {name: [data[name]] for name in FEATURE_COLUMNS}
+    )
 
-    cancer_type = le_target.inverse_transform(prediction)[0]
-    confidence = float(np.max(probability)) * 100
+    if data["Sex"] not in _sex_codes:
+        # Same failure as LabelEncoder.transform on an unseen label
+        raise ValueError(f"y contains previously unseen labels: {data['Sex']!r}")
+    if errors[0]:
+        raise ValueError(errors[0])
 
     return {
-        "prediction": cancer_type,
-        "confidence": round(confidence, 2)
-    }
\ No newline at end of file
+        "prediction": predictions[0],
+        "confidence": round(float(confidences[0]), 2)
+    }
@@ -0,0 +1,329 @@
+# agents/model_server.py
+
+import collections
+import importlib
+import itertools
+import multiprocessing as mp
+import multiprocessing.connection
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class QueueFullError(Exception):
+    """Raised when a model server cannot accept more requests (maps to HTTP 429)."""
+
+
+def _resolve(path: str):
+    module_name, attr = path.split(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _worker_main(index, loader_path, handler_path, request_q, result_conn, max_batch_size, max_wait):
+    """
+    Worker process loop: owns the model and answers requests in micro-batches.
+
+    The first request blocks; further requests are drained until the batch is
+    full or `max_wait` seconds have passed since the first one arrived. Each
+    batch is announced with a "claim" message before it runs, so the app side
+    knows which requests to fail if this process dies. Results go back over
+    this worker's own pipe: a worker killed mid-send cannot leave a shared
+    lock held.
+    """
+    handler = _resolve(handler_path)
+    try:
+        state = _resolve(loader_path)()
+        init_error = None
+    except Exception as e:
+        state, init_error = None, str(e)
+
+    stopping = False
+    while not stopping:
+        item = request_q.get()
+        if item is None:
+            break
+
+        batch = [item]
+        deadline = time.monotonic() + max_wait
+        while len(batch) < max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = request_q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                stopping = True
+                break
+            batch.append(item)
+
+        ids = [request_id for request_id, _ in batch]
+        result_conn.send(("claim", index, ids))
+        if init_error is not None:
+            for request_id in ids:
+                result_conn.send(("result", request_id, False, f"Initialization Error: {init_error}", len(batch)))
+            continue
+
+        try:
+            results = handler(state, [payload for _, payload in batch])
+            for request_id, result in zip(ids, results):
+                result_conn.send(("result", request_id, True, result, len(batch)))
+        except Exception as e:
+            for request_id in ids:
+                result_conn.send(("result", request_id, False, str(e), len(batch)))
+
+
+class BatchingModelServer:
+    """
+    Runs a model in dedicated worker processes behind a bounded queue.
+
+    `loader` and `handler` are "module:function" paths so they can be
+    imported inside the (spawned) workers: `loader()` builds the model state
+    once per worker, `handler(state, payloads)` returns one result per payload.
+    Workers are started lazily on the first submit.
+
+    A worker that dies (e.g. OOM-killed) is restarted and the requests it was
+    running fail at once. A batch running longer than `request_timeout`
+    seconds has its worker killed the same way. Futures that are cancelled
+    (e.g. by a caller's timeout) are dropped from the pending table.
+    """
+
+    def __init__(self, name: str, loader: str, handler: str, num_workers: int = 1,
+                 max_queue: int = 64, max_batch_size: int = 4, max_wait_ms: float = 20,
+                 request_timeout: float = None, monitor_interval: float = 0.5):
+        self.name = name
+        self.loader = loader
+        self.handler = handler
+        self.num_workers = num_workers
+        self.max_queue = max_queue
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.request_timeout = request_timeout
+        self.monitor_interval = monitor_interval
+
+        self._ctx = mp.get_context("spawn")
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending = {}
+        # request_id -> (worker index, claimed at) for requests a worker is running
+        self._assigned = {}
+        self._stopping = False
+        self._workers = []
+        self._request_q = None
+        self._conns = []
+        self._collector = None
+
+        self._counters = collections.Counter()
+        self._latencies = collections.deque(maxlen=1000)
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            self._stopping = False
+            self._request_q = self._ctx.Queue(maxsize=self.max_queue)
+            self._conns = [None] * self.num_workers
+            self._workers = [self._spawn(i) for i in range(self.num_workers)]
+            self._collector = threading.Thread(
+                target=self._collect, name=f"{self.name}-collector", daemon=True
+            )
+            self._collector.start()
+
+    def _spawn(self, index: int):
+        reader, writer = self._ctx.Pipe(duplex=False)
+        worker = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.loader, self.handler, self._request_q, writer,
+                  self.max_batch_size, self.max_wait),
+            name=f"{self.name}-worker-{index}",
+            daemon=True,
+        )
+        worker.start()
+        writer.close()
+        self._conns[index] = reader
+        return worker
+
+    # ----------------------------------------------------
+    #   RESULTS
+    # ----------------------------------------------------
+    def _collect(self):
+        while not (self._stopping and not self._workers):
+            with self._lock:
+                conns = [c for c in self._conns if c is not None]
+            for conn in mp.connection.wait(conns, timeout=self.monitor_interval):
+                self._drain(conn)
+            self._supervise()
+
+    def _drain(self, conn):
+        """Handles every message waiting on a worker's pipe; closes it at EOF."""
+        try:
+            while conn.poll():
+                self._handle(conn.recv())
+        except (EOFError, OSError):
+            with self._lock:
+                if conn in self._conns:
+                    self._conns[self._conns.index(conn)] = None
+            conn.close()
+
+    def _handle(self, message):
+        if message[0] == "claim":
+            _, index, ids = message
+            now = time.monotonic()
+            with self._lock:
+                for request_id in ids:
+                    if request_id in self._pending:
+                        self._assigned[request_id] = (index, now)
+            return
+
+        _, request_id, ok, result, batch_size = message
+        with self._lock:
+            self._assigned.pop(request_id, None)
+            future, submitted = self._pending.pop(request_id, (None, None))
+        if future is None or not future.set_running_or_notify_cancel():
+            return
+        self._latencies.append(time.monotonic() - submitted)
+        self._counters["completed" if ok else "failed"] += 1
+        self._counters["batched_requests"] += 1
+        self._counters["batch_size_total"] += batch_size
+        if ok:
+            future.set_result(result)
+        else:
+            future.set_exception(RuntimeError(result))
+
+    def _fail(self, request_ids, error: Exception, counter: str):
+        with self._lock:
+            futures = [self._pending.pop(i, (None, None))[0] for i in request_ids]
+            for request_id in request_ids:
+                self._assigned.pop(request_id, None)
+        for future in futures:
+            if future is not None and future.set_running_or_notify_cancel():
+                self._counters[counter] += 1
+                future.set_exception(error)
+
+    # ----------------------------------------------------
+    #   SUPERVISION
+    # ----------------------------------------------------
+    def _supervise(self):
+        if self._stopping:
+            return
+        now = time.monotonic()
+        with self._lock:
+            workers = list(self._workers)
+            assigned = dict(self._assigned)
+
+        if self.request_timeout is not None:
+            overdue = {index for index, claimed in assigned.values() if now - claimed > self.request_timeout}
+            for index in overdue:
+                print(f"{self.name} worker {index} exceeded {self.request_timeout:.0f}s, killing it")
+                workers[index].kill()
+                workers[index].join(timeout=5)
+
+        for index, worker in enumerate(workers):
+            if worker.is_alive():
+                continue
+            # Results the worker sent before dying may still be in its pipe
+            with self._lock:
+                conn = self._conns[index]
+            if conn is not None:
+                self._drain(conn)
+                if not conn.closed:
+                    conn.close()
+            with self._lock:
+                lost = [i for i, (owner, _) in self._assigned.items() if owner == index]
+            timed_out = any(now - assigned[i][1] > self.request_timeout for i in lost
+                            if i in assigned and self.request_timeout is not None)
+            if timed_out:
+                self._fail(lost, TimeoutError(f"{self.name} request timed out"), "timed_out")
+            else:
+                self._fail(lost, RuntimeError(f"{self.name} worker exited with code {worker.exitcode}"), "failed")
+            print(f"{self.name} worker {index} exited with code {worker.exitcode}, restarting")
+            with self._lock:
+                if self._stopping:
+                    return
+                self._workers[index] = self._spawn(index)
+            self._counters["restarts"] += 1
+
+    def _forget(self, request_id, future: Future):
+        # Cancelled by the caller (e.g. asyncio.wait_for timed out): stop tracking it
+        if future.cancelled():
+            with self._lock:
+                self._pending.pop(request_id, None)
+                self._assigned.pop(request_id, None)
+            self._counters["cancelled"] += 1
+
+    def submit(self, payload, block: bool = False, timeout: float = None) -> Future:
+        """
+        Queues a request and returns a Future for its result.
+
+        With `block=False` a full queue raises QueueFullError immediately,
+        which the HTTP layer turns into a 429.
+        """
+        self.start()
+
+        request_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            self._pending[request_id] = (future, time.monotonic())
+        future.add_done_callback(lambda f: self._forget(request_id, f))
+
+        try:
+            self._request_q.put((request_id, payload), block=block, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            self._counters["rejected"] += 1
+            raise QueueFullError(f"{self.name} is busy, please retry shortly")
+
+        self._counters["submitted"] += 1
+        return future
+
+    def shutdown(self):
+        with self._lock:
+            self._stopping = True
+            workers, self._workers = self._workers, []
+        if not workers:
+            return
+        for _ in workers:
+            self._request_q.put(None)
+        for worker in workers:
+            worker.join(timeout=5)
+            if worker.is_alive():
+                worker.terminate()
+        self._collector.join(timeout=5)
+        for conn in self._conns:
+            if conn is not None and not conn.closed:
+                conn.close()
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+        batched = self._counters["batched_requests"]
+
+        def pct(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 1)
+
+        try:
+            queue_depth = self._request_q.qsize() if self._request_q is not None else 0
+        except NotImplementedError:
+            queue_depth = None
+
+        return {
+            "workers": len(self._workers),
+            "workers_alive": sum(w.is_alive() for w in self._workers),
+            "queue_depth": queue_depth,
+            "in_flight": len(self._pending),
+            "queue_capacity": self.max_queue,
+            "submitted": self._counters["submitted"],
+            "completed": self._counters["completed"],
+            "failed": self._counters["failed"],
+            "timed_out": self._counters["timed_out"],
+            "cancelled": self._counters["cancelled"],
+            "rejected": self._counters["rejected"],
+            "restarts": self._counters["restarts"],
+            "avg_batch_size": round(self._counters["batch_size_total"] / batched, 2) if batched else None,
+            "latency_p50_ms": pct(0.5),
+            "latency_p99_ms": pct(0.99),
+        }
@@ -0,0 +1,215 @@
+# agents/router.py
+"""
+Intent router for the supervisor: "rag" (interpret a report, result or
+finding), "team" (general medical / cancer knowledge) or "trivial"
+(greetings, thanks, questions about the assistant), with a confidence.
+
+1. Keyword fast path: precompiled, word-bounded patterns for unambiguous
+   cases (greetings, "my biopsy report", "nodule", "BI-RADS", ...).
+2. Nearest centroid: the query's MiniLM embedding is compared with the
+   mean embedding of each label's examples in router_examples.json;
+   a softmax over the cosine similarities gives the confidence.
+3. Below ROUTER_MIN_CONFIDENCE, or before the centroids are built (they are
+   built by warm_up, never on the request path), queries go to
+   ROUTER_FALLBACK.
+
+Trivial queries are answered from canned replies without any LLM call.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXAMPLES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "router_examples.json")
+ROUTER_MIN_CONFIDENCE = float(os.getenv("ROUTER_MIN_CONFIDENCE", "0.5"))
+# Answering a real question with a canned reply is worse than a wasted LLM call
+ROUTER_TRIVIAL_CONFIDENCE = float(os.getenv("ROUTER_TRIVIAL_CONFIDENCE", "0.8"))
+ROUTER_TRIVIAL_MAX_WORDS = int(os.getenv("ROUTER_TRIVIAL_MAX_WORDS", "6"))
+ROUTER_TEMPERATURE = float(os.getenv("ROUTER_TEMPERATURE", "0.05"))
+ROUTER_FALLBACK = os.getenv("ROUTER_FALLBACK", "team")
+ROUTER_CACHE_SIZE = int(os.getenv("ROUTER_CACHE_SIZE", "2048"))
+
+_WHITESPACE = re.compile(r"\s+")
+
+TRIVIAL_PATTERN = re.compile(
+    r"(hi|hello|hey|hiya|yo|good (morning|afternoon|evening)|thanks|thank you|thx|ok|okay|cool|great|"
+    r"got it|bye|goodbye|see you|who are you|what can you do|how are you)"
+    r"( there| so much| a lot| again| later)?[\s!.?]*",
+)
+
+DIAGNOSTIC_PATTERN = re.compile(
+    r"\b("
+    r"(my|this|the) (biopsy|pathology|lab|labs|blood|scan|ct|mri|pet|x-ray|xray|mammogram|ultrasound|"
+    r"imaging|radiology|test)( test)? (report|results?|findings)|"
+    r"explain my|interpret my|"
+    r"bi-?rads|ti-?rads|lung-?rads|"
+    r"nodules?|granulomas?|tuberculosis|sarcoidosis|mimickers?|"
+    r"malignant (vs\.?|versus|or) benign|imaging features|biomarker ratio|risk weightage"
+    r")\b"
+)
+
+TRIVIAL_REPLIES = {
+    "thanks": "You're welcome! Let me know if you have any other questions about your health or reports.",
+    "bye": "Take care! Come back any time you have questions.",
+    "default": (
+        "Hello! I'm an AI assistant for early cancer detection. I can explain medical reports and test "
+        "results, answer questions about cancer and general health, and analyze medical images. "
+        "How can I help you today?"
+    ),
+}
+
+
+def normalize(query: str) -> str:
+    return _WHITESPACE.sub(" ", query).strip().lower()
+
+
+def trivial_reply(query: str) -> str:
+    q = normalize(query)
+    if re.match(r"(thanks|thank you|thx)", q):
+        return TRIVIAL_REPLIES["thanks"]
+    if re.match(r"(bye|goodbye|see you)", q):
+        return TRIVIAL_REPLIES["bye"]
+    return TRIVIAL_REPLIES["default"]
+
+
+def _default_embedder():
+    from rag.retrival import get_embedding_model
+    return get_embedding_model()
+
+
+class IntentRouter:
+    def __init__(self, embedder_factory=_default_embedder, examples_path: str = EXAMPLES_PATH):
+        self.embedder_factory = embedder_factory
+        self.examples_path = examples_path
+        self.embedder = None
+        self.labels = None
+        self.centroids = None
+
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._counts = {}
+        self._latencies = {"keyword": deque(maxlen=500), "embedding": deque(maxlen=500)}
+
+    @property
+    def ready(self) -> bool:
+        return self.centroids is not None
+
+    def warm_up(self):
+        """Embeds the labeled examples and builds one normalized centroid per label."""
+        with self._load_lock:
+            if self.centroids is None:
+                self._build_centroids()
+
+    def _build_centroids(self):
+        with open(self.examples_path) as f:
+            examples = json.load(f)
+        embedder = self.embedder_factory()
+
+        start = time.perf_counter()
+        labels, centroids = [], []
+        for label, queries in examples.items():
+            vectors = np.asarray(embedder.embed_documents([normalize(q) for q in queries]), dtype=np.float32)
+            vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+            centroid = vectors.mean(axis=0)
+            labels.append(label)
+            centroids.append(centroid / np.linalg.norm(centroid))
+
+        self.embedder = embedder
+        self.labels = labels
+        self.centroids = np.stack(centroids)
+        print(f"Intent router ready: {len(labels)} labels in {time.perf_counter() - start:.2f}s")
+
+    def _keyword(self, q: str):
+        if TRIVIAL_PATTERN.fullmatch(q):
+            return "trivial"
+        if DIAGNOSTIC_PATTERN.search(q):
+            return "rag"
+        return None
+
+    def _nearest_centroid(self, q: str):
+        cached = self._cache.get(q)
+        if cached is not None:
+            return cached
+
+        vector = np.asarray(self.embedder.embed_query(q), dtype=np.float32)
+        similarities = self.centroids @ (vector / np.linalg.norm(vector))
+        weights = np.exp((similarities - similarities.max()) / ROUTER_TEMPERATURE)
+        probabilities = weights / weights.sum()
+        best = int(np.argmax(probabilities))
+        result = (self.labels[best], float(probabilities[best]))
+
+        with self._lock:
+            self._cache[q] = result
+            if len(self._cache) > ROUTER_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return result
+
+    def classify(self, query: str):
+        """Returns {"branch", "confidence", "method"}; branch is "rag", "team" or "trivial"."""
+        start = time.perf_counter()
+        q = normalize(query)
+        keyword = self._keyword(q)
+        nearest = self._nearest_centroid(q) if keyword is None and self.centroids is not None else None
+        return self._decide(q, keyword, nearest, start)
+
+    async def aclassify(self, query: str):
+        """
+        Like classify, for async handlers: an uncached query is embedded in
+        a worker thread so MiniLM never runs on the event loop.
+        """
+        start = time.perf_counter()
+        q = normalize(query)
+        keyword = self._keyword(q)
+        nearest = None
+        if keyword is None and self.centroids is not None:
+            nearest = self._cache.get(q) or await asyncio.to_thread(self._nearest_centroid, q)
+        return self._decide(q, keyword, nearest, start)
+
+    def _decide(self, q: str, keyword, nearest, start: float):
+        timed = "keyword"
+        if keyword is not None:
+            result = {"branch": keyword, "confidence": 1.0, "method": "keyword"}
+        elif nearest is None:
+            result = {"branch": ROUTER_FALLBACK, "confidence": 0.0, "method": "fallback"}
+        else:
+            branch, confidence = nearest
+            method = timed = "embedding"
+            if branch == "trivial" and (confidence < ROUTER_TRIVIAL_CONFIDENCE
+                                        or len(q.split()) > ROUTER_TRIVIAL_MAX_WORDS):
+                branch, method = ROUTER_FALLBACK, "fallback"
+            elif confidence < ROUTER_MIN_CONFIDENCE:
+                branch, method = ROUTER_FALLBACK, "fallback"
+            result = {"branch": branch, "confidence": round(confidence, 3), "method": method}
+
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            key = f"{result['branch']}/{result['method']}"
+            self._counts[key] = self._counts.get(key, 0) + 1
+            if result["method"] != "fallback" or timed == "embedding":
+                self._latencies[timed].append(elapsed)
+        return result
+
+    def stats(self):
+        with self._lock:
+            latency = {}
+            for method, recent in self._latencies.items():
+                if recent:
+                    ordered = sorted(recent)
+                    latency[method] = {
+                        "p50_ms": round(ordered[len(ordered) // 2] * 1000, 3),
+                        "max_ms": round(ordered[-1] * 1000, 3),
+                    }
+            return {"ready": self.ready, "routes": dict(self._counts), "latency": latency}
+
+
+router = IntentRouter()
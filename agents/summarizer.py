@@ -1,58 +1,312 @@
 # agents/summarizer.py
-import torch
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import difflib
+import os
+import shutil
+import statistics
+import tempfile
+from dotenv import load_dotenv
 
-bart_tokenizer = None
-bart_model = None
-init_error = None
+from agents.model_server import BatchingModelServer
 
-def get_summarizer():
-    global bart_tokenizer, bart_model, init_error
-    if bart_model is None or bart_tokenizer is None:
-        try:
-            print("Loading facebook/bart-large-cnn directly...")
-            bart_tokenizer = AutoTokenizer.from_pretrained("facebook/bart-large-cnn")
-            
-            # Use GPU if available, else CPU
-            device = "cuda" if torch.cuda.is_available() else "cpu"
-            bart_model = AutoModelForSeq2SeqLM.from_pretrained("facebook/bart-large-cnn").to(device)
-            print("Summarization model loaded successfully.")
-        except Exception as e:
-            init_error = str(e)
-            print("Error loading summarizer:", e)
-    return bart_tokenizer, bart_model
+load_dotenv()
 
-def summarize_medical_text(text: str) -> str:
-    """Uses facebook/bart-large-cnn to summarize clinical text effectively."""
-    if not text or len(text.strip()) < 30:
-        return "Text is too short for facebook/bart-large-cnn to summarize effectively."
-    
-    tokenizer, model = get_summarizer()
-    if not tokenizer or not model:
-        return f"BART Summarization model failed to load. Error: {init_error}"
-    
-    # BART model has token limits, so we explicitly chop super long text to safe limits (approx 1024 tokens)
-    short_text = text[:3500] 
-    
+SUMMARIZER_MODEL_ID = os.getenv("SUMMARIZER_MODEL_ID", "facebook/bart-large-cnn")
+# torch (fp32) | int8 (dynamic quantization, CPU) | onnx (ONNX Runtime, needs optimum[onnxruntime])
+SUMMARIZER_BACKEND = os.getenv("SUMMARIZER_BACKEND", "torch")
+SUMMARIZER_ONNX_DIR = os.getenv("SUMMARIZER_ONNX_DIR", os.path.join("models", "onnx"))
+SUMMARIZER_WORKERS = int(os.getenv("SUMMARIZER_WORKERS", "1"))
+SUMMARIZER_BATCH_SIZE = int(os.getenv("SUMMARIZER_BATCH_SIZE", "8"))
+SUMMARIZER_MAX_WAIT_MS = float(os.getenv("SUMMARIZER_MAX_WAIT_MS", "50"))
+SUMMARIZER_QUEUE_SIZE = int(os.getenv("SUMMARIZER_QUEUE_SIZE", "256"))
+SUMMARIZER_THREADS = int(os.getenv("SUMMARIZER_THREADS", "0"))  # 0 = torch default
+SUMMARIZER_TIMEOUT = float(os.getenv("SUMMARIZER_TIMEOUT", "600"))
+# Long documents: chunk size in tokens (BART's window is 1024) and compute caps
+SUMMARIZER_CHUNK_TOKENS = int(os.getenv("SUMMARIZER_CHUNK_TOKENS", "900"))
+SUMMARIZER_MAX_CHUNKS = int(os.getenv("SUMMARIZER_MAX_CHUNKS", "32"))
+SUMMARIZER_MAX_ROUNDS = int(os.getenv("SUMMARIZER_MAX_ROUNDS", "3"))
+
+TOO_SHORT_MESSAGE = "Text is too short for facebook/bart-large-cnn to summarize effectively."
+
+
+# ----------------------------------------------------
+#   WORKER SIDE (runs inside the summarizer process)
+# ----------------------------------------------------
+def _onnx_export_dir():
+    return os.path.join(SUMMARIZER_ONNX_DIR, SUMMARIZER_MODEL_ID.replace("/", "--"))
+
+
+def _load_onnx_model():
     try:
-        # Generate summary directly
-        device = "cuda" if torch.cuda.is_available() else "cpu"
-        inputs = tokenizer(
-            short_text, 
-            max_length=1024, 
-            return_tensors="pt", 
-            truncation=True
-        ).to(device)
-        
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    except ImportError:
+        raise RuntimeError("SUMMARIZER_BACKEND=onnx requires `pip install optimum[onnxruntime]`")
+
+    export_dir = _onnx_export_dir()
+    if os.path.exists(os.path.join(export_dir, "config.json")):
+        return ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+
+    # First run: export once and cache the artifact for every later start. Each
+    # process exports into its own directory and renames it into place, so
+    # workers starting together never see a half-written export.
+    print(f"Exporting {SUMMARIZER_MODEL_ID} to ONNX at {export_dir} (one-time)...")
+    os.makedirs(SUMMARIZER_ONNX_DIR, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(prefix=".export-", dir=SUMMARIZER_ONNX_DIR)
+    try:
+        ORTModelForSeq2SeqLM.from_pretrained(SUMMARIZER_MODEL_ID, export=True).save_pretrained(tmp_dir)
+        os.chmod(tmp_dir, 0o755)  # mkdtemp creates it private
+        try:
+            os.rename(tmp_dir, export_dir)
+        except OSError:
+            pass  # another process renamed its identical export into place first
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+
+
+def load_summarizer(backend: str = None):
+    import torch
+    from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+
+    backend = backend or SUMMARIZER_BACKEND
+
+    if SUMMARIZER_THREADS:
+        torch.set_num_threads(SUMMARIZER_THREADS)
+
+    print(f"Loading {SUMMARIZER_MODEL_ID} directly ({backend} backend)...")
+    tokenizer = AutoTokenizer.from_pretrained(SUMMARIZER_MODEL_ID)
+
+    if backend == "onnx":
+        return tokenizer, _load_onnx_model(), "cpu"
+
+    # Use GPU if available, else CPU (int8 dynamic quantization is CPU-only)
+    device = "cuda" if torch.cuda.is_available() and backend == "torch" else "cpu"
+    model = AutoModelForSeq2SeqLM.from_pretrained(SUMMARIZER_MODEL_ID).to(device)
+    model.eval()
+
+    if backend == "int8":
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    elif backend != "torch":
+        raise ValueError(f"Unknown SUMMARIZER_BACKEND: {backend}")
+
+    print("Summarization model loaded successfully.")
+    return tokenizer, model, device
+
+
+def summarize_batch(state, texts):
+    """Pads a batch of texts to a common length and runs a single generate call."""
+    import torch
+
+    tokenizer, model, device = state
+
+    # Callers send chunks that fit BART's 1024-token window; truncation is only a safety net
+    inputs = tokenizer(
+        texts,
+        max_length=1024,
+        padding=True,
+        truncation=True,
+        return_tensors="pt"
+    ).to(device)
+
+    with torch.inference_mode():
         summary_ids = model.generate(
             inputs["input_ids"],
-            max_length=150, 
-            min_length=40, 
-            length_penalty=2.0, 
-            num_beams=4, 
+            attention_mask=inputs["attention_mask"],
+            max_length=150,
+            min_length=40,
+            length_penalty=2.0,
+            num_beams=4,
             early_stopping=True
         )
-        summary = tokenizer.decode(summary_ids[0], skip_special_tokens=True)
-        return summary
+    return tokenizer.batch_decode(summary_ids, skip_special_tokens=True)
+
+
+def summary_parity(reference, candidate):
+    """Share of identical summaries, and mean token-level similarity (used to check the int8/ONNX backends)."""
+    exact = sum(a == b for a, b in zip(reference, candidate)) / len(reference)
+    similarity = statistics.mean(
+        difflib.SequenceMatcher(None, a.split(), b.split()).ratio()
+        for a, b in zip(reference, candidate)
+    )
+    return exact, similarity
+
+
+# ----------------------------------------------------
+#   APP SIDE
+# ----------------------------------------------------
+server = BatchingModelServer(
+    "summarizer",
+    loader="agents.summarizer:load_summarizer",
+    handler="agents.summarizer:summarize_batch",
+    num_workers=SUMMARIZER_WORKERS,
+    max_queue=SUMMARIZER_QUEUE_SIZE,
+    max_batch_size=SUMMARIZER_BATCH_SIZE,
+    max_wait_ms=SUMMARIZER_MAX_WAIT_MS,
+    request_timeout=SUMMARIZER_TIMEOUT,
+)
+
+
+def _failure_message(error: Exception) -> str:
+    message = str(error)
+    if message.startswith("Initialization Error: "):
+        return f"BART Summarization model failed to load. Error: {message[len('Initialization Error: '):]}"
+    return f"Summarization failed: {message}"
+
+
+def submit_many(texts):
+    """
+    Queues many texts and returns, per input, a Future or a ready-made message.
+
+    Texts are queued longest-first so that neighbours in a micro-batch have
+    similar lengths and little padding.
+    """
+    pending = [None] * len(texts)
+
+    order = sorted(range(len(texts)), key=lambda i: len(texts[i] or ""), reverse=True)
+    for i in order:
+        text = texts[i]
+        if not text or len(text.strip()) < 30:
+            pending[i] = TOO_SHORT_MESSAGE
+            continue
+        pending[i] = server.submit(text, block=True)
+
+    return pending
+
+
+def _resolve_summary(item) -> str:
+    if isinstance(item, str):
+        return item
+    try:
+        return item.result(timeout=SUMMARIZER_TIMEOUT)
+    except TimeoutError:
+        item.cancel()
+        return f"Summarization failed: timed out after {SUMMARIZER_TIMEOUT:.0f}s"
+    except Exception as e:
+        return _failure_message(e)
+
+
+def summarize_many(texts):
+    """Summarizes many clinical texts, returning one summary per input in order."""
+    return [_resolve_summary(item) for item in submit_many(texts)]
+
+
+# ----------------------------------------------------
+#   LONG DOCUMENTS (map-reduce)
+# ----------------------------------------------------
+_tokenizer = None
+
+
+def get_tokenizer():
+    global _tokenizer
+    if _tokenizer is None:
+        from transformers import AutoTokenizer
+        _tokenizer = AutoTokenizer.from_pretrained(SUMMARIZER_MODEL_ID)
+    return _tokenizer
+
+
+def split_into_chunks(text: str, max_tokens: int = SUMMARIZER_CHUNK_TOKENS):
+    """Splits text on token boundaries into pieces of at most `max_tokens` tokens."""
+    encoding = get_tokenizer()(text, add_special_tokens=False, return_offsets_mapping=True)
+    offsets = encoding["offset_mapping"]
+
+    chunks = []
+    for i in range(0, len(offsets), max_tokens):
+        window = offsets[i:i + max_tokens]
+        chunk = text[window[0][0]:window[-1][1]].strip()
+        if chunk:
+            chunks.append(chunk)
+    return chunks
+
+
+def _cap_chunks(chunks, max_chunks):
+    # Over budget: keep evenly spaced chunks so the whole report stays represented
+    if len(chunks) <= max_chunks:
+        return chunks
+    step = len(chunks) / max_chunks
+    return [chunks[int(i * step)] for i in range(max_chunks)]
+
+
+def _is_failure(summary: str) -> bool:
+    return summary == TOO_SHORT_MESSAGE or summary.startswith(("Summarization failed", "BART Summarization"))
+
+
+def iter_summarize_long(text: str, max_chunks: int = SUMMARIZER_MAX_CHUNKS,
+                        max_rounds: int = SUMMARIZER_MAX_ROUNDS):
+    """
+    Map-reduce summarization that yields partial results as they arrive.
+
+    Yields {"stage": "chunk", ...} for each first-round chunk summary (in
+    completion order) and finally {"stage": "final", "summary": ...}. Each
+    round summarizes its chunks in parallel batches; the joined summaries are
+    re-chunked and summarized again until they fit a single window or
+    `max_rounds` is reached.
+    """
+    from concurrent.futures import as_completed
+
+    chunks = split_into_chunks(text)
+    if len(chunks) <= 1:
+        yield {"stage": "final", "summary": summarize_many([text])[0], "chunks": len(chunks), "rounds": 1}
+        return
+
+    total_chunks = len(chunks)
+    chunks = _cap_chunks(chunks, max_chunks)
+
+    # Round 1 (map), streamed as each chunk finishes
+    pending = submit_many(chunks)
+    summaries = [None] * len(chunks)
+    index_of = {item: i for i, item in enumerate(pending) if not isinstance(item, str)}
+    for i, item in enumerate(pending):
+        if isinstance(item, str):
+            summaries[i] = item
+    for future in as_completed(index_of):
+        i = index_of[future]
+        summaries[i] = _resolve_summary(future)
+        yield {"stage": "chunk", "index": i, "total": len(chunks), "summary": summaries[i]}
+
+    # Reduce rounds
+    rounds = 1
+    while True:
+        joined = "\n".join(s for s in summaries if not _is_failure(s))
+        if not joined:
+            final = summaries[0]
+            break
+        chunks = split_into_chunks(joined)
+        rounds += 1
+        if len(chunks) <= 1 or rounds >= max_rounds:
+            final = summarize_many([chunks[0] if len(chunks) == 1 else joined])[0]
+            break
+        summaries = summarize_many(_cap_chunks(chunks, max_chunks))
+
+    yield {
+        "stage": "final",
+        "summary": final,
+        "chunks": total_chunks,
+        "chunks_summarized": min(total_chunks, max_chunks),
+        "rounds": rounds,
+    }
+
+
+def summarize_long(text: str, **kwargs) -> str:
+    for event in iter_summarize_long(text, **kwargs):
+        if event["stage"] == "final":
+            return event["summary"]
+
+
+def summarize_medical_text(text: str) -> str:
+    """Uses facebook/bart-large-cnn to summarize clinical text effectively."""
+    if not text or len(text.strip()) < 30:
+        return TOO_SHORT_MESSAGE
+    # Long reports are summarized chunk by chunk instead of being truncated
+    try:
+        return summarize_long(text)
     except Exception as e:
         return f"Summarization failed: {str(e)}"
+
+
+def get_stats():
+    return server.stats()
+
+
+def shutdown():
+    server.shutdown()
@@ -1,14 +1,57 @@
 # agents/supervisor.py
-from agno.models.groq import Groq
-from agno.agent import Agent
-from agno.team.team import Team
-from agents.web_agent import WebSearchAgent
-from agents.cancer_agent import CancerKnowledgeAgent
-from rag.retrival import is_diagnostic_query, analyze_cancer_case
+import asyncio
+import threading
+import time
+from rag.retrival import analyze_cancer_case, analyze_cancer_case_async, stream_cancer_case
+from agents.router import router, trivial_reply
 from dotenv import load_dotenv
 import os 
 load_dotenv()
-Groq.api_key=os.getenv("GROQ_API_KEY")
+
+# fanout: members run concurrently with deadlines, the leader only synthesizes (agents/fanout.py)
+# delegate: the agno Team leader calls its members itself, one after another
+TEAM_MODE = os.getenv("TEAM_MODE", "fanout")
+TEAM_MEMBER_TIMEOUT = float(os.getenv("TEAM_MEMBER_TIMEOUT", "20"))
+TEAM_WEB_TIMEOUT = float(os.getenv("TEAM_WEB_TIMEOUT", str(TEAM_MEMBER_TIMEOUT)))
+TEAM_KNOWLEDGE_TIMEOUT = float(os.getenv("TEAM_KNOWLEDGE_TIMEOUT", str(TEAM_MEMBER_TIMEOUT)))
+# Past this the leader is abandoned and a member's answer is returned instead
+TEAM_LEADER_BUDGET = float(os.getenv("TEAM_LEADER_BUDGET", "10"))
+
+LEADER_INSTRUCTIONS = """
+            When a user asks a general medicine or cancer-related question:
+            1. First, evaluate if you have enough context. If the query is vague, simply ask clarifying questions in a highly conversational tone.
+            2. DO NOT use any markdown formatting (no hashes `#`, no asterisks `*`, no bullet points `-`). Write everything as regular, plain text paragraphs.
+            3. Use WebSearchAgent and CancerKnowledgeAgent selectively for factual checks.
+            4. Keep your final output extremely concise, conversational, and direct, as if texting a patient.
+            """
+
+FANOUT_LEADER_INSTRUCTIONS = """
+            You answer a user's general medicine or cancer-related question using findings your team (WebSearchAgent and CancerKnowledgeAgent) already gathered.
+            1. If the query is vague, simply ask clarifying questions in a highly conversational tone.
+            2. DO NOT use any markdown formatting (no hashes `#`, no asterisks `*`, no bullet points `-`). Write everything as regular, plain text paragraphs.
+            3. Prefer the findings for facts; where they disagree or are missing, say so briefly.
+            4. Keep your final output extremely concise, conversational, and direct, as if texting a patient.
+            """
+
+
+# ----------------------------------------------------
+#   EVENT LOOP FOR SYNC CALLERS
+# ----------------------------------------------------
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _run_coroutine(coro):
+    """
+    Runs `coro` on a dedicated event-loop thread and waits for it. Unlike
+    asyncio.run this works from threads that already have a running loop.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="supervisor-loop", daemon=True).start()
+    return asyncio.run_coroutine_threadsafe(coro, _loop).result()
 
 
 # SupervisorAgent = Team(
@@ -35,36 +78,121 @@ class SupervisorAgent:
     Supervisor Agent routes queries between:
     1. Diagnostic RAG pipeline
     2. Web + Knowledge multi-agent team
+    3. Canned replies for greetings and small talk (no LLM call)
     """
 
-    def __init__(self):
+    def __init__(self, mode: str = TEAM_MODE):
+        self.mode = mode
+        self._team = None
+        self._fanout = None
+        self._team_lock = threading.Lock()
+
+    @property
+    def team(self):
+        """
+        The agno team is built (and agno imported) on first use or warm-up
+        """
+        if self._team is None:
+            with self._team_lock:
+                if self._team is None:
+                    self._team = self._build_team()
+        return self._team
+
+    def _build_team(self):
+        from agno.models.groq import Groq
+        from agno.team.team import Team
+        from agents.web_agent import WebSearchAgent
+        from agents.cancer_agent import CancerKnowledgeAgent
+
+        Groq.api_key=os.getenv("GROQ_API_KEY")
 
         # 🌍 General + Web Knowledge Team
-        self.team = Team(
+        return Team(
             members=[WebSearchAgent, CancerKnowledgeAgent],
             model=Groq(id="qwen/qwen3-32b"),
             name="SupervisorAgent",
             markdown=False,
             show_members_responses=False,
-            instructions="""
-            When a user asks a general medicine or cancer-related question:
-            1. First, evaluate if you have enough context. If the query is vague, simply ask clarifying questions in a highly conversational tone.
-            2. DO NOT use any markdown formatting (no hashes `#`, no asterisks `*`, no bullet points `-`). Write everything as regular, plain text paragraphs.
-            3. Use WebSearchAgent and CancerKnowledgeAgent selectively for factual checks.
-            4. Keep your final output extremely concise, conversational, and direct, as if texting a patient.
-            """
+            instructions=LEADER_INSTRUCTIONS
         )
 
+    @property
+    def fanout(self):
+        """
+        Same members as the team, run concurrently; built on first use or warm-up
+        """
+        if self._fanout is None:
+            with self._team_lock:
+                if self._fanout is None:
+                    self._fanout = self._build_fanout()
+        return self._fanout
+
+    def _build_fanout(self):
+        from agno.agent import Agent
+        from agno.models.groq import Groq
+        from agents.fanout import TeamFanout
+        from agents.web_agent import WebSearchAgent
+        from agents.cancer_agent import CancerKnowledgeAgent
+
+        leader = Agent(
+            name="SupervisorAgent",
+            model=Groq(id="qwen/qwen3-32b"),
+            markdown=False,
+            instructions=FANOUT_LEADER_INSTRUCTIONS
+        )
+        return TeamFanout(
+            members=[WebSearchAgent, CancerKnowledgeAgent],
+            leader=leader,
+            member_timeouts={"WebSearchAgent": TEAM_WEB_TIMEOUT, "CancerKnowledgeAgent": TEAM_KNOWLEDGE_TIMEOUT},
+            default_timeout=TEAM_MEMBER_TIMEOUT,
+            leader_budget=TEAM_LEADER_BUDGET,
+            fallback_order=["CancerKnowledgeAgent", "WebSearchAgent"]
+        )
+
+    def warm_up(self):
+        return self.fanout if self.mode == "fanout" else self.team
+
+    @property
+    def ready(self) -> bool:
+        return (self._fanout if self.mode == "fanout" else self._team) is not None
+
+    def classify(self, query: str):
+        """
+        Returns {"branch", "confidence", "method"} from the intent router
+        """
+        return router.classify(query)
+
+    async def aclassify(self, query: str):
+        """
+        classify for async callers; the embedding step runs off the event loop
+        """
+        return await router.aclassify(query)
+
+    def route(self, query: str):
+        """
+        Returns the branch a query is sent down: "rag", "team" or "trivial"
+        """
+        return router.classify(query)["branch"]
+
     def run(self, query: str, vision_score=None):
         """
         Main routing logic
         """
 
+        branch = self.route(query)
+
+        # 👋 Greetings and small talk → canned reply
+        if branch == "trivial":
+            return trivial_reply(query)
+
         # 🔬 If diagnostic-style query → Use RAG pipeline
-        if is_diagnostic_query(query):
+        if branch == "rag":
             return analyze_cancer_case(query, vision_score)
 
         # 🌍 Otherwise → Use Agno Team (Web + Knowledge)
+        if self.mode == "fanout":
+            return _run_coroutine(self.fanout.run(query))[0]
+
         response = self.team.run(query)
 
         # Clean return handling
@@ -73,6 +201,68 @@ class SupervisorAgent:
 
         return str(response)
 
+    async def arun(self, query: str, vision_score=None):
+        """
+        Async routing logic, awaited directly from async handlers
+        """
+        return (await self.arun_detailed(query, vision_score))[0]
+
+    async def arun_detailed(self, query: str, vision_score=None, route: dict = None):
+        """
+        Like arun, but returns (response, meta) with the route and, for the
+        team branch, per-member and leader timing. Pass `route` when the
+        caller already classified the query.
+        """
+        start = time.perf_counter()
+        route = route or await self.aclassify(query)
+        meta = {"route": route}
+
+        if route["branch"] == "trivial":
+            response = trivial_reply(query)
+        elif route["branch"] == "rag":
+            response = await analyze_cancer_case_async(query, vision_score)
+        elif self.mode == "fanout":
+            response, team_meta = await self.fanout.run(query)
+            meta["team"] = team_meta
+        else:
+            response = await self.team.arun(query)
+            response = response.content if hasattr(response, "content") else str(response)
+            meta["team"] = {"mode": "delegate"}
+
+        meta["seconds"] = round(time.perf_counter() - start, 3)
+        return response, meta
+
+    async def astream(self, query: str, vision_score=None, meta: dict = None, route: dict = None):
+        """
+        Streaming routing logic, yields text chunks as they are generated.
+        In fanout mode, team timing is written into `meta` when given.
+        Pass `route` when the caller already classified the query.
+        """
+
+        branch = (route or await self.aclassify(query))["branch"]
+        if branch == "trivial":
+            yield trivial_reply(query)
+            return
+        if branch == "rag":
+            async for token in stream_cancer_case(query, vision_score):
+                yield token
+            return
+
+        if self.mode == "fanout":
+            team_meta = {}
+            if meta is not None:
+                meta["team"] = team_meta
+            async for token in self.fanout.stream(query, team_meta):
+                yield token
+            return
+
+        from agno.run.team import TeamRunEvent
+
+        # Only the leader's content events; member and tool events are skipped
+        async for event in self.team.arun(query, stream=True):
+            if getattr(event, "event", None) == TeamRunEvent.run_content and isinstance(event.content, str):
+                yield event.content
+
 
 # Singleton instance (recommended for FastAPI)
 supervisor = SupervisorAgent()
\ No newline at end of file
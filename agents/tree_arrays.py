@@ -0,0 +1,181 @@
+# agents/tree_arrays.py
+"""
+Flat NumPy export of the XGBoost cancer classifier.
+
+The boosted trees are written as plain .npy arrays (one entry per node,
+all trees concatenated) plus a small meta.json holding the base score and
+the label-encoder classes. Workers load the arrays with mmap_mode="r", so
+every uvicorn worker maps the same page-cache pages instead of unpickling
+its own copy, and neither xgboost nor scikit-learn is imported at runtime.
+
+Export (needs xgboost + joblib, run at build time):
+
+    python -m agents.tree_arrays
+"""
+
+import json
+import os
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+ARRAYS_DIR = os.path.join(BASE_DIR, "model_arrays")
+
+NODE_ARRAYS = ("feature", "threshold", "left", "default_right", "value", "roots")
+
+
+class TreeArrayModel:
+    """Binary `binary:logistic` tree ensemble evaluated with vectorized NumPy."""
+
+    def __init__(self, directory: str = ARRAYS_DIR, block_rows: int = 256):
+        self.block_rows = block_rows
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        for name in NODE_ARRAYS:
+            # np.asarray drops the memmap subclass (fast .take) but keeps the mapping
+            setattr(self, name, np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")))
+        self.base_margin = self.meta["base_margin"]
+        self.max_depth = self.meta["max_depth"]
+
+    def predict_margin(self, X):
+        """
+        Walks every (row, tree) pair one level per step. Children are laid
+        out side by side, so the next node is `left + (x >= threshold)`;
+        leaves point at themselves with a NaN threshold and stay put.
+        """
+        # XGBoost compares float32 feature values against float32 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        margin = np.empty(X.shape[0], dtype=np.float64)
+        # Row blocks keep the (rows x trees) working set cache-sized
+        for start in range(0, X.shape[0], self.block_rows):
+            margin[start:start + self.block_rows] = self._margin_block(X[start:start + self.block_rows])
+        return margin
+
+    def _margin_block(self, X):
+        n_rows, n_features = X.shape
+        values = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.int64) * n_features)[:, None]
+        has_missing = bool(np.isnan(values).any())
+
+        node = np.tile(self.roots, (n_rows, 1))
+        for _ in range(self.max_depth):
+            x = values.take(row_base + self.feature.take(node))
+            step = x >= self.threshold.take(node)
+            if has_missing:
+                step = np.where(np.isnan(x), self.default_right.take(node), step)
+            node = self.left.take(node) + step
+
+        return self.value.take(node).sum(axis=1, dtype=np.float64) + self.base_margin
+
+    def predict_proba(self, X):
+        positive = 1.0 / (1.0 + np.exp(-self.predict_margin(X)))
+        return np.column_stack([1.0 - positive, positive])
+
+
+# ----------------------------------------------------
+#   EXPORT
+# ----------------------------------------------------
+def _parse_base_score(value) -> float:
+    # xgboost>=3 stores it as a vector string, e.g. "[5E-1]"
+    return float(str(value).strip("[]").split(",")[0])
+
+
+def _flatten_tree(tree, offset: int):
+    """
+    Re-lays one XGBoost tree breadth-first so every right child sits right
+    after its left sibling. Returns the node columns and the tree depth.
+    """
+    left = tree["left_children"]
+    right = tree["right_children"]
+    split_indices = tree["split_indices"]
+    conditions = tree["split_conditions"]
+    default_left = tree["default_left"]
+
+    order, depth, level = [0], 0, [0]
+    while True:
+        level = [child for n in level if left[n] != -1 for child in (left[n], right[n])]
+        if not level:
+            break
+        order.extend(level)
+        depth += 1
+    position = {old: new for new, old in enumerate(order)}
+
+    columns = {name: [] for name in ("feature", "threshold", "left", "default_right", "value")}
+    for old in order:
+        new = offset + position[old]
+        if left[old] == -1:
+            # Leaf: loops on itself, NaN threshold never compares true
+            columns["feature"].append(0)
+            columns["threshold"].append(np.nan)
+            columns["left"].append(new)
+            columns["default_right"].append(0)
+            # For leaves, split_conditions holds the leaf weight
+            columns["value"].append(conditions[old])
+        else:
+            columns["feature"].append(split_indices[old])
+            columns["threshold"].append(conditions[old])
+            columns["left"].append(offset + position[left[old]])
+            columns["default_right"].append(0 if default_left[old] else 1)
+            columns["value"].append(0.0)
+    return columns, depth
+
+
+def export_xgb_classifier(model, le_target, le_sex, out_dir: str = ARRAYS_DIR, check_rows: int = 2000):
+    booster = model.get_booster()
+    raw = json.loads(booster.save_raw("json"))
+    learner = raw["learner"]
+
+    objective = learner["objective"]["name"]
+    if objective != "binary:logistic":
+        raise ValueError(f"Only binary:logistic models can be exported, got {objective}")
+
+    base_score = _parse_base_score(learner["learner_model_param"]["base_score"])
+    trees = learner["gradient_booster"]["model"]["trees"]
+
+    columns = {name: [] for name in ("feature", "threshold", "left", "default_right", "value")}
+    roots, offset, max_depth = [], 0, 0
+
+    for tree in trees:
+        tree_columns, depth = _flatten_tree(tree, offset)
+        for name, values in tree_columns.items():
+            columns[name].extend(values)
+        roots.append(offset)
+        max_depth = max(max_depth, depth)
+        offset += len(tree_columns["left"])
+
+    dtypes = {"feature": np.int32, "threshold": np.float32, "left": np.int32,
+              "default_right": np.int32, "value": np.float32}
+    os.makedirs(out_dir, exist_ok=True)
+    for name, values in columns.items():
+        np.save(os.path.join(out_dir, f"{name}.npy"), np.asarray(values, dtype=dtypes[name]))
+    np.save(os.path.join(out_dir, "roots.npy"), np.asarray(roots, dtype=np.int32))
+
+    meta = {
+        "base_margin": float(np.log(base_score / (1 - base_score))),
+        "max_depth": max_depth,
+        "target_classes": [str(c) for c in le_target.inverse_transform(model.classes_)],
+        "sex_classes": [str(c) for c in le_sex.classes_],
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+
+    # Refuse to ship arrays that disagree with xgboost
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0, 100, (check_rows, booster.num_features())).astype(np.float32)
+    X[rng.random(X.shape) < 0.02] = np.nan
+    expected = model.predict_proba(X)
+    actual = TreeArrayModel(out_dir).predict_proba(X)
+    if not np.allclose(expected, actual, atol=1e-5):
+        raise RuntimeError(f"Exported trees disagree with xgboost (max diff {np.abs(expected - actual).max()})")
+
+    return meta
+
+
+if __name__ == "__main__":
+    import joblib
+
+    model = joblib.load(os.path.join(BASE_DIR, "cancer_prediction_model.pkl"))
+    le_target = joblib.load(os.path.join(BASE_DIR, "target_encoder.pkl"))
+    le_sex = joblib.load(os.path.join(BASE_DIR, "sex_encoder.pkl"))
+    meta = export_xgb_classifier(model, le_target, le_sex)
+    print(f"Exported {len(np.load(os.path.join(ARRAYS_DIR, 'roots.npy')))} trees to {ARRAYS_DIR}: {meta}")
@@ -1,7 +1,8 @@
 # agents/web_agent.py
 from agno.agent import Agent
 from agno.models.groq import Groq
-from agno.tools.duckduckgo import DuckDuckGoTools
+
+from agents.web_tools import CachedDuckDuckGoTools
 
  
 
@@ -15,5 +16,5 @@ WebSearchAgent = Agent(
     1. Be brief and conversational.
     2. Respond in PLAIN TEXT ONLY. DO NOT use markdown formatting like `#`, `*`, or bullet lists.
     """,
-    tools=[DuckDuckGoTools()]
+    tools=[CachedDuckDuckGoTools()]
 )
\ No newline at end of file
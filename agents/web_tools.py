@@ -0,0 +1,86 @@
+# agents/web_tools.py
+"""
+DuckDuckGo tools for WebSearchAgent, with results served from
+services/search_cache.py. The model sees the same two tools
+(web_search, search_news) with the same signatures and output.
+
+At most SEARCH_MAX_CONCURRENCY searches leave this process at once, so a
+burst of distinct queries cannot trip DuckDuckGo's rate limit.
+"""
+
+import json
+import os
+import threading
+
+from agno.tools.duckduckgo import DuckDuckGoTools
+from agno.utils.log import log_debug
+from dotenv import load_dotenv
+
+from services.search_cache import search_cache, SEARCH_CACHE_ENABLED
+
+load_dotenv()
+
+SEARCH_MAX_CONCURRENCY = int(os.getenv("SEARCH_MAX_CONCURRENCY", "4"))
+
+_search_slots = threading.BoundedSemaphore(SEARCH_MAX_CONCURRENCY)
+
+
+class CachedDuckDuckGoTools(DuckDuckGoTools):
+    def __init__(self, cache=search_cache, search_backend=None, cache_enabled: bool = SEARCH_CACHE_ENABLED, **kwargs):
+        """
+        `search_backend(kind, query, **search_kwargs)` returns the list of
+        results for kind "text" or "news"; it defaults to DDGS.
+        """
+        self.cache = cache
+        self.search_backend = search_backend or self._ddgs_search
+        self.cache_enabled = cache_enabled
+        super().__init__(**kwargs)
+
+    def _ddgs_search(self, kind: str, query: str, **search_kwargs):
+        from ddgs import DDGS
+
+        with DDGS(proxy=self.proxy, timeout=self.timeout, verify=self.verify_ssl) as ddgs:
+            search = ddgs.text if kind == "text" else ddgs.news
+            return search(query=query, **search_kwargs)
+
+    def _search(self, kind: str, query: str, max_results: int):
+        search_kwargs = {"max_results": self.fixed_max_results or max_results, "backend": self.backend}
+        if self.timelimit is not None:
+            search_kwargs["timelimit"] = self.timelimit
+        if self.region is not None:
+            search_kwargs["region"] = self.region
+
+        def search(q, **kw):
+            with _search_slots:
+                return self.search_backend(kind, q, **kw)
+
+        if not self.cache_enabled:
+            return search(query, **search_kwargs)
+        return self.cache.fetch(kind, query, search, **search_kwargs)
+
+    def web_search(self, query: str, max_results: int = 5) -> str:
+        """Use this function to search the web for a query.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The search results from the web.
+        """
+        search_query = f"{self.modifier} {query}" if self.modifier else query
+        log_debug(f"Searching web for: {search_query} using backend: {self.backend}")
+        return json.dumps(self._search("text", search_query, max_results), indent=2)
+
+    def search_news(self, query: str, max_results: int = 5) -> str:
+        """Use this function to get the latest news from the web.
+
+        Args:
+            query(str): The query to search for.
+            max_results (optional, default=5): The maximum number of results to return.
+
+        Returns:
+            The latest news from the web.
+        """
+        log_debug(f"Searching web news for: {query} using backend: {self.backend}")
+        return json.dumps(self._search("news", query, max_results), indent=2)
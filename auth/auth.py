@@ -1,10 +1,11 @@
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt
-import requests
 import os
 from dotenv import load_dotenv
 
+from auth.jwks import JWKSKeyStore, VerifiedTokenCache
+
 load_dotenv()
 
 security = HTTPBearer()
@@ -15,6 +16,26 @@ if not SUPABASE_URL:
     raise Exception("SUPABASE_URL not set in environment variables")
 
 JWKS_URL = f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+JWKS_TTL_SECONDS = float(os.getenv("JWKS_TTL_SECONDS", "600"))
+JWKS_MIN_REFETCH_SECONDS = float(os.getenv("JWKS_MIN_REFETCH_SECONDS", "30"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
+# Signing keys and verified tokens are cached in-process, so an
+# authenticated request no longer pays a round trip to Supabase
+key_store = JWKSKeyStore(
+    JWKS_URL,
+    ttl=JWKS_TTL_SECONDS,
+    min_refetch_interval=JWKS_MIN_REFETCH_SECONDS
+)
+token_cache = VerifiedTokenCache(maxsize=TOKEN_CACHE_SIZE)
+
+
+def _to_user(payload: dict):
+    return {
+        "id": payload.get("sub"),
+        "email": payload.get("email"),
+        "role": payload.get("role")
+    }
 
 
 def verify_token(
@@ -29,19 +50,17 @@ def verify_token(
             "role": "patient"
         }
 
-    try:
-        # Fetch latest JWKS (public keys)
-        jwks = requests.get(JWKS_URL).json()
+    payload = token_cache.get(token)
+    if payload is not None:
+        return _to_user(payload)
 
+    try:
         # Get token header
         unverified_header = jwt.get_unverified_header(token)
         kid = unverified_header.get("kid")
 
-        # Find matching public key
-        key = next(
-            (k for k in jwks["keys"] if k["kid"] == kid),
-            None
-        )
+        # Find matching public key (cached, refetched on unknown kid)
+        key = key_store.get_key(kid)
 
         if key is None:
             raise HTTPException(status_code=401, detail="Invalid key")
@@ -54,11 +73,8 @@ def verify_token(
             audience="authenticated"
         )
 
-        return {
-            "id": payload.get("sub"),
-            "email": payload.get("email"),
-            "role": payload.get("role")
-        }
+        token_cache.put(token, payload)
+        return _to_user(payload)
 
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
\ No newline at end of file
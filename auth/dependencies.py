@@ -1,11 +1,6 @@
-from supabase import create_client
-import os
-from dotenv import load_dotenv
+from services.db import db
 
-load_dotenv()
 
-url = os.getenv("SUPABASE_URL")
-key = os.getenv("SUPABASE_SERVICE_ROLE")
-
-supabase = create_client(url, key)
- 
\ No newline at end of file
+def get_supabase():
+    """Shared sync client; new code should use services.db.db directly."""
+    return db.client()
@@ -0,0 +1,121 @@
+# auth/jwks.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from jose import jwk
+
+
+class JWKSKeyStore:
+    """
+    In-process cache of the Supabase signing keys.
+
+    Keys are parsed once and indexed by `kid`. A daemon thread refreshes
+    the set every `ttl` seconds, and an unknown `kid` triggers an on-miss
+    refetch that is rate-limited to one per `min_refetch_interval`.
+    """
+
+    def __init__(self, jwks_url: str, ttl: float = 600, min_refetch_interval: float = 30,
+                 timeout: float = 5, algorithm: str = "ES256"):
+        self.jwks_url = jwks_url
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self.algorithm = algorithm
+
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+        self._session = requests.Session()
+        self._refresher = None
+
+    def _fetch(self):
+        jwks = self._session.get(self.jwks_url, timeout=self.timeout).json()
+        keys = {}
+        for k in jwks.get("keys", []):
+            try:
+                keys[k["kid"]] = jwk.construct(k, k.get("alg", self.algorithm))
+            except Exception as e:
+                print(f"Skipping unusable JWK {k.get('kid')}: {e}")
+        self._keys = keys
+        self._fetched_at = time.monotonic()
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            age = time.monotonic() - self._fetched_at
+            if not force and self._keys and age < self.min_refetch_interval:
+                return
+            self._fetch()
+
+    def _refresh_loop(self):
+        while True:
+            time.sleep(self.ttl)
+            try:
+                self.refresh(force=True)
+            except Exception as e:
+                print("JWKS background refresh failed:", e)
+
+    def start(self):
+        if self._refresher is None:
+            self._refresher = threading.Thread(
+                target=self._refresh_loop, name="jwks-refresh", daemon=True
+            )
+            self._refresher.start()
+
+    def get_key(self, kid: str):
+        self.start()
+
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+
+        # Unknown kid: keys may have rotated, refetch (rate-limited)
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is not None:
+                return key
+            if time.monotonic() - self._fetched_at >= self.min_refetch_interval or not self._keys:
+                self._fetch()
+            return self._keys.get(kid)
+
+
+class VerifiedTokenCache:
+    """
+    LRU cache of already-verified token payloads, each kept until its `exp`.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            payload, exp = entry
+            if exp <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def put(self, token: str, payload: dict):
+        exp = payload.get("exp")
+        if not exp:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (payload, float(exp))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
@@ -0,0 +1,142 @@
+# benchmarks/bench_auth.py
+"""
+Per-request auth overhead of `verify_token`, before and after the JWKS key store.
+
+Serves a stand-in JWKS endpoint locally (with an artificial round-trip delay
+to mimic Supabase) and verifies ES256 tokens against it.
+
+    python -m benchmarks.bench_auth --requests 200 --latency-ms 40
+"""
+
+import argparse
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from jose import jwk, jwt
+
+KID = "bench-key"
+
+
+def make_keypair():
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    private_pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    ).decode()
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    public_jwk = jwk.construct(public_pem, "ES256").to_dict()
+    public_jwk.update({"kid": KID, "alg": "ES256", "use": "sig"})
+    return private_pem, public_jwk
+
+
+def start_jwks_server(public_jwk, latency_s):
+    body = json.dumps({"keys": [public_jwk]}).encode()
+    hits = {"count": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hits["count"] += 1
+            time.sleep(latency_s)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, hits
+
+
+def make_token(private_pem, sub):
+    now = int(time.time())
+    claims = {
+        "sub": sub,
+        "email": f"{sub}@example.com",
+        "role": "authenticated",
+        "aud": "authenticated",
+        "iat": now,
+        "exp": now + 3600
+    }
+    return jwt.encode(claims, private_pem, algorithm="ES256", headers={"kid": KID})
+
+
+def legacy_verify(token, jwks_url):
+    """The original implementation: fetch JWKS on every request."""
+    jwks = requests.get(jwks_url).json()
+    kid = jwt.get_unverified_header(token).get("kid")
+    key = next((k for k in jwks["keys"] if k["kid"] == kid), None)
+    return jwt.decode(token, key, algorithms=["ES256"], audience="authenticated")
+
+
+def timed(fn, tokens):
+    samples = []
+    for token in tokens:
+        start = time.perf_counter()
+        fn(token)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label, samples):
+    samples = sorted(samples)
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(
+        f"{label:<32} mean {statistics.mean(samples):8.3f} ms"
+        f"   p50 {statistics.median(samples):8.3f} ms   p99 {p99:8.3f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    args = parser.parse_args()
+
+    private_pem, public_jwk = make_keypair()
+    server, hits = start_jwks_server(public_jwk, args.latency_ms / 1000)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    # auth.auth derives JWKS_URL from SUPABASE_URL at import time
+    os.environ["SUPABASE_URL"] = base_url
+    from fastapi.security import HTTPAuthorizationCredentials
+    from auth import auth
+
+    user_tokens = [make_token(private_pem, f"user-{i}") for i in range(args.users)]
+    tokens = [user_tokens[i % args.users] for i in range(args.requests)]
+    unique_tokens = [make_token(private_pem, f"fresh-{i}") for i in range(args.requests)]
+
+    def cached_verify(token):
+        return auth.verify_token(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token))
+
+    print(f"{args.requests} requests, {args.users} users, JWKS latency {args.latency_ms} ms\n")
+
+    hits["count"] = 0
+    report("before (fetch per request)", timed(lambda t: legacy_verify(t, auth.JWKS_URL), tokens))
+    print(f"{'':<32} JWKS fetches: {hits['count']}")
+
+    hits["count"] = 0
+    report("after (key store + token LRU)", timed(cached_verify, tokens))
+    report("after (key store, unseen tokens)", timed(cached_verify, unique_tokens))
+    print(f"{'':<32} JWKS fetches: {hits['count']}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
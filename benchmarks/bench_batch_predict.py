@@ -0,0 +1,86 @@
+# benchmarks/bench_batch_predict.py
+"""
+Cancer classifier throughput: rows/sec vs batch size for the vectorized
+`predict_cancer_batch`, against the original per-row path (LabelEncoder
+transform + predict + predict_proba for every patient).
+
+    python -m benchmarks.bench_batch_predict --rows 100000
+"""
+
+import argparse
+import os
+import time
+
+import joblib
+import numpy as np
+
+from agents import ml_model
+
+# The per-row baseline always uses the original pickled artifacts
+legacy_model = joblib.load(os.path.join(ml_model.BASE_DIR, "cancer_prediction_model.pkl"))
+legacy_le_target = joblib.load(os.path.join(ml_model.BASE_DIR, "target_encoder.pkl"))
+legacy_le_sex = joblib.load(os.path.join(ml_model.BASE_DIR, "sex_encoder.pkl"))
+
+
+def synthetic_columns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "Diagnosis Age": rng.uniform(20, 90, n),
+        "Mutation Count": rng.integers(1, 500, n).astype(float),
+        "Sex": rng.choice(["Male", "Female"], n).tolist(),
+        "TMB (nonsynonymous)": rng.uniform(0, 50, n),
+        "Number of Samples Per Patient": rng.integers(1, 4, n).astype(float),
+    }
+
+
+def legacy_predict(row):
+    """The original implementation, one patient at a time."""
+    sex_encoded = legacy_le_sex.transform([row["Sex"]])[0]
+    features = np.array([[
+        float(row["Diagnosis Age"]),
+        float(row["Mutation Count"]),
+        sex_encoded,
+        float(row["TMB (nonsynonymous)"]),
+        float(row["Number of Samples Per Patient"])
+    ]])
+    prediction = legacy_model.predict(features)
+    probability = legacy_model.predict_proba(features)
+    return legacy_le_target.inverse_transform(prediction)[0], float(np.max(probability)) * 100
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--legacy-rows", type=int, default=500)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 10, 100, 1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    columns = synthetic_columns(args.rows)
+
+    rows = [{name: columns[name][i] for name in columns} for i in range(args.legacy_rows)]
+    start = time.perf_counter()
+    legacy = [legacy_predict(row) for row in rows]
+    elapsed = time.perf_counter() - start
+    print(f"{'legacy per-row':<16} {len(rows) / elapsed:>12,.0f} rows/sec")
+
+    # Vectorized results must match the per-row path
+    predictions, confidences, _ = ml_model.predict_cancer_batch(
+        {name: values[:args.legacy_rows] for name, values in columns.items()}
+    )
+    assert all(p == l[0] for p, l in zip(predictions, legacy)), "prediction mismatch"
+    assert np.allclose(confidences, [l[1] for l in legacy], atol=1e-3), "confidence mismatch"
+
+    for batch_size in args.batch_sizes:
+        batch_size = min(batch_size, args.rows)
+        total = min(args.rows, max(batch_size * 20, 10_000))
+        start = time.perf_counter()
+        for offset in range(0, total, batch_size):
+            ml_model.predict_cancer_batch(
+                {name: values[offset:offset + batch_size] for name, values in columns.items()}
+            )
+        elapsed = time.perf_counter() - start
+        print(f"batch {batch_size:<10,} {total / elapsed:>12,.0f} rows/sec")
+
+
+if __name__ == "__main__":
+    main()
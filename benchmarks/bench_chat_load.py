@@ -0,0 +1,195 @@
+# benchmarks/bench_chat_load.py
+"""
+Load test for /chat: the original sync handler vs the async pipeline.
+
+Groq, MedGemma and Supabase are replaced with local stubs that sleep for a
+fixed latency, so the numbers isolate how the handler schedules work.
+Both apps are served by uvicorn on localhost and hit by concurrent clients.
+
+    python -m benchmarks.bench_chat_load --clients 50 --requests 1000
+"""
+
+import argparse
+import asyncio
+import atexit
+import os
+import shutil
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+# main.py reads these at import time; make that work offline
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+os.environ.setdefault("GROQ_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://127.0.0.1:6333")
+os.environ["RESPONSE_CACHE_ENABLED"] = "0"
+# Keep the write buffer on (it is part of the measured path) but away from the real journal
+os.environ["WRITE_BUFFER_DIR"] = tempfile.mkdtemp(prefix="bench_chat_load_")
+atexit.register(shutil.rmtree, os.environ["WRITE_BUFFER_DIR"], ignore_errors=True)
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI
+from pydantic import BaseModel
+
+import main
+from auth.auth import verify_token
+
+
+class StubLatency:
+    groq = 0.25
+    medgemma = 0.4
+    db = 0.05
+
+
+class _StubQuery:
+    def insert(self, row):
+        return self
+
+    def execute(self):
+        time.sleep(StubLatency.db)
+
+
+class StubSupabase:
+    def table(self, name):
+        return _StubQuery()
+
+
+def stub_medgemma(query, image_url=None):
+    time.sleep(StubLatency.medgemma)
+    return "stub image findings"
+
+
+async def stub_arun_medgemma(query, image_url=None):
+    return await asyncio.to_thread(stub_medgemma, query, image_url)
+
+
+def stub_supervisor_run(query, vision_score=None):
+    time.sleep(StubLatency.groq)
+    return "stub answer"
+
+
+async def stub_supervisor_arun(query, vision_score=None):
+    await asyncio.sleep(StubLatency.groq)
+    return "stub answer"
+
+
+async def stub_supervisor_arun_detailed(query, vision_score=None, route=None):
+    return await stub_supervisor_arun(query, vision_score), {}
+
+
+def fake_user():
+    return {"id": "bench-user", "email": "bench@example.com", "role": "patient"}
+
+
+def build_legacy_app():
+    """The original handler: serial, sync, inside the threadpool."""
+    app = FastAPI()
+    supabase = StubSupabase()
+
+    class AskRequests(BaseModel):
+        query: str
+        vision_score: float | None = None
+        image_url: str | None = None
+
+    @app.post("/chat")
+    def chat_with_ai(data: AskRequests, user=Depends(fake_user)):
+        if data.image_url:
+            medgemma_insights = stub_medgemma(data.query, data.image_url)
+            rag_insights = stub_supervisor_run(data.query, data.vision_score)
+            response = f"{medgemma_insights}\n{rag_insights}"
+        else:
+            response = stub_supervisor_run(data.query, data.vision_score)
+        supabase.table("chat_history").insert({}).execute()
+        return {"response": response}
+
+    return app
+
+
+async def stub_supervisor_aclassify(query):
+    return {"branch": "team", "confidence": 1.0, "method": "stub"}
+
+
+def patch_main_app():
+    main.db._client = StubSupabase()
+    main.arun_medgemma_inference = stub_arun_medgemma
+    main.supervisor.run = stub_supervisor_run
+    main.supervisor.arun = stub_supervisor_arun
+    main.supervisor.arun_detailed = stub_supervisor_arun_detailed
+    main.supervisor.route = lambda query: "team"
+    main.supervisor.classify = lambda query: {"branch": "team", "confidence": 1.0, "method": "stub"}
+    main.supervisor.aclassify = stub_supervisor_aclassify
+    main.app.dependency_overrides[verify_token] = fake_user
+    return main.app
+
+
+def serve(app):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning", lifespan="off"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def run_load(base_url, clients, total, image_ratio):
+    latencies = []
+    counter = iter(range(total))
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as http:
+        async def worker():
+            for i in counter:
+                body = {"query": "what are early symptoms of blood cancer?"}
+                if image_ratio and i % round(1 / image_ratio) == 0:
+                    body["image_url"] = "file:///stub.png"
+                start = time.perf_counter()
+                r = await http.post("/chat", json=body, headers={"Authorization": "Bearer bench"})
+                r.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(clients)))
+        elapsed = time.perf_counter() - start
+
+    return latencies, elapsed
+
+
+def report(label, latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(
+        f"{label:<8} p50 {statistics.median(latencies):8.1f} ms   p99 {p99:8.1f} ms"
+        f"   {len(latencies) / elapsed:8.1f} req/s"
+    )
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--image-ratio", type=float, default=0.2,
+                        help="fraction of requests that also run MedGemma")
+    args = parser.parse_args()
+
+    print(
+        f"{args.clients} clients, {args.requests} requests, stubs: groq {StubLatency.groq}s,"
+        f" medgemma {StubLatency.medgemma}s, db {StubLatency.db}s\n"
+    )
+
+    for label, app in (("sync", build_legacy_app()), ("async", patch_main_app())):
+        server, base_url = serve(app)
+        latencies, elapsed = asyncio.run(
+            run_load(base_url, args.clients, args.requests, args.image_ratio)
+        )
+        report(label, latencies, elapsed)
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,83 @@
+# benchmarks/bench_context_builder.py
+"""
+Prompt context size before/after rag/context_builder.py.
+
+For every query in benchmarks/data/rag_queries.json the top chunks are
+taken from a BM25 index over rag/DATA (no embeddings or network needed)
+and turned into a context twice: the old way (exact-duplicate removal,
+every chunk joined) and with build_context (near-duplicate removal,
+overlap merging, token budget). "coverage" is the share of queries whose
+context still contains one of the query's relevant terms.
+
+    python -m benchmarks.bench_context_builder --k 8 --budget 1500
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from langchain_core.documents import Document
+
+from benchmarks.bench_hybrid_retrieval import QUERIES_PATH, load_chunks
+from rag.bm25 import BM25Index
+from rag.context_builder import build_context, count_tokens, tokenizer_name
+
+
+def legacy_context(docs):
+    seen, parts = set(), []
+    for doc in docs:
+        content = doc.page_content.strip()
+        if content not in seen:
+            seen.add(content)
+            parts.append(f"Source [{doc.metadata.get('source', 'Medical Journal')}]: {content}")
+    return "\n\n".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--k", type=int, default=8)
+    parser.add_argument("--budget", type=int, default=1500)
+    args = parser.parse_args()
+
+    queries = json.loads(QUERIES_PATH.read_text())
+    chunks = load_chunks()
+    bm25 = BM25Index([c["text"] for c in chunks])
+    print(f"{len(chunks)} chunks, {len(queries)} queries, top {args.k}, budget {args.budget}, tokenizer {tokenizer_name()}\n")
+
+    results = {"legacy": ([], 0, []), "builder": ([], 0, [])}
+    dropped = merged = truncated = 0
+    for item in queries:
+        docs = [
+            Document(page_content=chunks[i]["text"], metadata=chunks[i]["metadata"])
+            for i, _ in bm25.search(item["query"], args.k)
+        ]
+        terms = [t.lower() for t in item["relevant"]]
+
+        start = time.perf_counter()
+        old = legacy_context(docs)
+        old_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        new, stats = build_context(docs, args.budget)
+        new_ms = (time.perf_counter() - start) * 1000
+
+        dropped += stats["near_duplicates_dropped"]
+        merged += len(docs) - stats["near_duplicates_dropped"] - stats["passages"]
+        truncated += stats["truncated"]
+        for label, context, ms in (("legacy", old, old_ms), ("builder", new, new_ms)):
+            tokens, covered, latencies = results[label]
+            tokens.append(count_tokens(context))
+            latencies.append(ms)
+            results[label] = (tokens, covered + any(t in context.lower() for t in terms), latencies)
+
+    n = len(queries)
+    for label, (tokens, covered, latencies) in results.items():
+        print(
+            f"{label:<8} tokens avg {statistics.mean(tokens):7.1f}   max {max(tokens):5d}"
+            f"   coverage {covered / n:.3f}   build p50 {statistics.median(latencies):6.2f} ms"
+        )
+    print(f"\nnear-duplicates dropped {dropped}, chunks merged {merged}, contexts truncated {truncated}")
+
+
+if __name__ == "__main__":
+    main()
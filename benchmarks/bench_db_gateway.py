@@ -0,0 +1,100 @@
+# benchmarks/bench_db_gateway.py
+"""
+Per-module Supabase clients called synchronously from async handlers (the
+old pattern) vs the shared services/db.py gateway, against the local
+PostgREST stand-in from bench_write_buffer.
+
+--concurrency coroutines each insert --requests / --concurrency report rows.
+"blocking" runs the sync client inside the coroutine, as routes/uploads.py
+did, so the event loop stalls on every request; "gateway" awaits
+db.aexecute. The stand-in counts the TCP connections it accepted.
+
+    python -m benchmarks.bench_db_gateway --requests 400 --concurrency 40
+"""
+
+import argparse
+import asyncio
+import statistics
+import threading
+import time
+
+from benchmarks.bench_write_buffer import FakePostgREST
+from services.db import SupabaseGateway
+
+KEY = "bench-anon-key"
+
+
+async def run(label, server, insert, requests, concurrency):
+    server.requests, server.connections = 0, set()
+    latencies = []
+    loop_lag = []
+    done = asyncio.Event()
+
+    async def probe():
+        # How late a 10 ms timer fires: a stalled event loop shows up here
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            loop_lag.append((time.perf_counter() - start - 0.01) * 1000)
+
+    async def worker(n):
+        for i in range(n):
+            start = time.perf_counter()
+            await insert({"user_id": "u1", "file_path": f"uploads/{i}", "status": "processing"})
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    probe_task = asyncio.create_task(probe())
+    start = time.perf_counter()
+    await asyncio.gather(*(worker(requests // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await probe_task
+
+    print(
+        f"{label:<9} {len(latencies) / elapsed:8.1f} req/s   p50 {statistics.median(latencies):7.2f} ms"
+        f"   event-loop lag max {max(loop_lag):7.1f} ms   TCP connections {len(server.connections)}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=40)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    server = FakePostgREST(args.latency_ms / 1000)
+    server.connections = set()
+    handle = server.finish_request
+
+    def finish_request(request, client_address):
+        server.connections.add(client_address)
+        handle(request, client_address)
+
+    server.finish_request = finish_request
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    from supabase import create_client
+
+    legacy = [create_client(server.url, KEY) for _ in range(4)]  # main, uploads, ai_analysis, auth
+
+    async def blocking_insert(row):
+        legacy[1].table("reports").insert(row).execute()
+
+    gateway = SupabaseGateway(server.url, KEY)
+
+    async def gateway_insert(row):
+        await gateway.aexecute("reports", lambda t: t.insert(row))
+
+    async def bench():
+        await run("blocking", server, blocking_insert, args.requests, args.concurrency)
+        await run("gateway", server, gateway_insert, args.requests, args.concurrency)
+        await gateway.aclose()
+
+    asyncio.run(bench())
+    print(f"\ngateway stats: {gateway.stats()['tables']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
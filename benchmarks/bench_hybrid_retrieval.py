@@ -0,0 +1,106 @@
+# benchmarks/bench_hybrid_retrieval.py
+"""
+Recall and latency of dense MMR retrieval vs hybrid BM25 + dense (RRF).
+
+Chunks come from rag/DATA through the same loader/splitter as
+rag/indexing.py and are served from a temporary local index, so no network
+is involved. benchmarks/data/rag_queries.json lists each query with the
+terms a relevant chunk must contain. recall@5 is the share of queries
+with at least one relevant chunk in the top 5, precision@5 the share of
+relevant chunks.
+
+    python -m benchmarks.bench_hybrid_retrieval                 # MiniLM (needs sentence-transformers)
+    python -m benchmarks.bench_hybrid_retrieval --embedder lsa  # TF-IDF + SVD stand-in, CPU-only
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from rag import indexing
+from rag.bm25 import BM25Index
+from rag.hybrid import HybridRetriever
+from rag.local_index import LocalVectorStore, write_index
+
+QUERIES_PATH = Path(__file__).resolve().parent / "data" / "rag_queries.json"
+K = 5
+
+
+class LSAEmbeddings:
+    """TF-IDF + truncated SVD, a rough dense stand-in when MiniLM is unavailable."""
+
+    def __init__(self, corpus, dim=128):
+        from sklearn.decomposition import TruncatedSVD
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.vectorizer = TfidfVectorizer(sublinear_tf=True, stop_words="english")
+        matrix = self.vectorizer.fit_transform(corpus)
+        self.svd = TruncatedSVD(n_components=min(dim, matrix.shape[1] - 1), random_state=0).fit(matrix)
+
+    def embed_documents(self, texts):
+        return self.svd.transform(self.vectorizer.transform(texts)).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def load_chunks():
+    chunks = []
+    for path in sorted(indexing.DATA_FOLDER.glob("*.pdf")):
+        chunks.extend(indexing.split_pages(path.name, "", indexing.load_pdf(str(path))))
+    return chunks
+
+
+def evaluate(label, search, queries):
+    latencies, recall, precision = [], 0, 0.0
+    for item in queries:
+        start = time.perf_counter()
+        docs = search(item["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        terms = [t.lower() for t in item["relevant"]]
+        relevant = [any(t in d.page_content.lower() for t in terms) for d in docs[:K]]
+        recall += any(relevant)
+        precision += sum(relevant) / K
+    n = len(queries)
+    print(
+        f"{label:<16} recall@{K} {recall / n:.3f}   precision@{K} {precision / n:.3f}"
+        f"   p50 {statistics.median(latencies):7.2f} ms   max {max(latencies):7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedder", choices=["minilm", "lsa"], default="minilm")
+    args = parser.parse_args()
+
+    queries = json.loads(QUERIES_PATH.read_text())
+    chunks = load_chunks()
+    texts = [c["text"] for c in chunks]
+    embedder = indexing.make_embedder() if args.embedder == "minilm" else LSAEmbeddings(texts)
+    vectors = np.asarray(embedder.embed_documents(texts), dtype=np.float32)
+    print(f"{len(chunks)} chunks, {len(queries)} labeled queries, {args.embedder} embeddings\n")
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_index(directory, [{"id": c["id"], "text": c["text"], "metadata": c["metadata"]} for c in chunks], vectors)
+        store = LocalVectorStore(directory, embedder)
+
+        evaluate("dense MMR", lambda q: store.max_marginal_relevance_search(q, k=K, fetch_k=20), queries)
+        evaluate("dense top-k", lambda q: store.similarity_search(q, k=K), queries)
+
+        bm25 = BM25Index(texts)
+        evaluate("bm25 only", lambda q: [store._to_documents(store.index, [i])[0] for i, _ in bm25.search(q, K)], queries)
+
+        hybrid = HybridRetriever(store, lambda: [(c["text"], c["metadata"]) for c in chunks], k=K, fetch_k=20)
+        hybrid.ensure_index()
+        evaluate("hybrid (cold)", hybrid.search, queries)
+        evaluate("hybrid (cached)", hybrid.search, queries)
+        print(f"\nBM25 build {hybrid.stats()['bm25_build_seconds']} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmarks/bench_importtime.py
+"""
+Cold-start check for `import main`.
+
+Runs `python -X importtime -c "import main"` in a fresh interpreter,
+prints the total and the slowest modules, and fails (exit 1) if the import
+takes longer than the budget or pulls in any of the heavy ML/DB packages,
+which must only load lazily or in the background warm-up.
+
+    python -m benchmarks.bench_importtime --budget-ms 1500
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = (
+    "torch", "transformers", "sentence_transformers", "langchain", "langchain_core",
+    "langchain_huggingface", "langchain_qdrant", "qdrant_client", "agno", "groq",
+    "supabase", "xgboost", "sklearn", "PyPDF2",
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure():
+    env = dict(os.environ)
+    # Dummy settings so the import works offline
+    env.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+    env.setdefault("SUPABASE_KEY", "bench.bench.bench")
+    env.setdefault("GROQ_API_KEY", "bench")
+    env.setdefault("QDRANT_URL", "http://127.0.0.1:6333")
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"`import main` failed:\n{result.stderr[-2000:]}")
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules[name.strip()] = (int(self_us), int(cumulative_us))
+    return modules
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    modules = measure()
+    total_ms = modules["main"][1] / 1000
+
+    print(f"import main: {total_ms:.0f} ms cumulative, {len(modules)} modules\n")
+    print("slowest modules (cumulative):")
+    for name, (_, cumulative) in sorted(modules.items(), key=lambda kv: -kv[1][1])[:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    heavy = sorted(name for name in modules if name.split(".")[0] in HEAVY_MODULES)
+    failed = False
+    if heavy:
+        roots = sorted({name.split(".")[0] for name in heavy})
+        print(f"\nFAIL: heavy packages imported eagerly: {', '.join(roots)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"\nFAIL: import took {total_ms:.0f} ms, budget is {args.budget_ms:.0f} ms")
+        failed = True
+    if not failed:
+        print(f"\nOK: within {args.budget_ms:.0f} ms and no heavy packages imported")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,92 @@
+# benchmarks/bench_long_summaries.py
+"""
+Map-reduce summarization of whole PDFs: wall time and memory per page.
+
+Runs every PDF in rag/DATA and uploads/ through `iter_summarize_long` and
+samples the summarizer worker's RSS while each document is processed.
+
+    python -m benchmarks.bench_long_summaries
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import PyPDF2
+
+from agents import summarizer
+from utils.extractor import extract_text_from_pdf
+
+ROOT = Path(__file__).resolve().parent.parent
+PDF_FOLDERS = [ROOT / "rag" / "DATA", ROOT / "uploads"]
+
+
+def worker_rss_mb():
+    total = 0
+    for worker in summarizer.server._workers:
+        try:
+            with open(f"/proc/{worker.pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+        except FileNotFoundError:
+            pass
+    return total / 1024
+
+
+class PeakSampler:
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, worker_rss_mb())
+            time.sleep(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def main():
+    pdfs = [p for folder in PDF_FOLDERS for p in sorted(folder.glob("*.pdf"))]
+
+    # Load the worker before timing anything
+    summarizer.summarize_many(["warm up " * 20])
+    idle_rss = worker_rss_mb()
+    print(f"worker idle RSS {idle_rss:.0f} MB\n")
+    print(f"{'file':<48} {'pages':>5} {'chunks':>6} {'wall s':>7} {'s/page':>7} {'peak MB':>8} {'MB/page':>8}")
+
+    for pdf in pdfs:
+        pages = len(PyPDF2.PdfReader(str(pdf)).pages)
+        text = extract_text_from_pdf(str(pdf))
+        if not text.strip():
+            print(f"{pdf.name[:48]:<48} {pages:>5}  (no extractable text)")
+            continue
+
+        with PeakSampler() as sampler:
+            start = time.perf_counter()
+            final = None
+            for event in summarizer.iter_summarize_long(text):
+                if event["stage"] == "final":
+                    final = event
+            elapsed = time.perf_counter() - start
+
+        growth = max(sampler.peak - idle_rss, 0.0)
+        print(
+            f"{pdf.name[:48]:<48} {pages:>5} {final['chunks']:>6} {elapsed:>7.1f}"
+            f" {elapsed / pages:>7.2f} {sampler.peak:>8.0f} {growth / pages:>8.1f}"
+        )
+
+    summarizer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# benchmarks/bench_model_startup.py
+"""
+Classifier startup cost per uvicorn-style worker: import time of
+agents.ml_model, and RSS / PSS with N workers alive at once, comparing the
+pickled artifacts with the memory-mapped tree arrays.
+
+PSS splits shared pages between the processes mapping them, so it shows
+what each worker really adds.
+
+    python -m benchmarks.bench_model_startup --workers 4
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+WORKER = r"""
+import json, sys, time
+start = time.perf_counter()
+import agents.ml_model
+elapsed = time.perf_counter() - start
+
+def field(path, name):
+    with open(path) as f:
+        for line in f:
+            if line.startswith(name + ":"):
+                return int(line.split()[1]) / 1024
+    return None
+
+# Everyone has imported: now measure, while all workers are alive
+sys.stdout.write("ready\n"); sys.stdout.flush()
+sys.stdin.readline()
+print(json.dumps({
+    "import_s": elapsed,
+    "rss_mb": field("/proc/self/status", "VmRSS"),
+    "pss_mb": field("/proc/self/smaps_rollup", "Pss"),
+}))
+"""
+
+
+def run(fmt, workers):
+    env = dict(os.environ, ML_MODEL_FORMAT=fmt, PYTHONWARNINGS="ignore")
+    procs = [
+        subprocess.Popen([sys.executable, "-c", WORKER], cwd=ROOT, env=env, text=True,
+                         stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        for _ in range(workers)
+    ]
+    for p in procs:
+        assert p.stdout.readline().strip() == "ready"
+    results = []
+    for p in procs:
+        out, _ = p.communicate("go\n")
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers\n")
+    print(f"{'format':<8} {'import s':>9} {'RSS MB/worker':>14} {'PSS MB/worker':>14} {'PSS MB total':>13}")
+    for fmt in ("pickle", "arrays"):
+        results = run(fmt, args.workers)
+        pss = [r["pss_mb"] for r in results]
+        print(
+            f"{fmt:<8} {statistics.mean(r['import_s'] for r in results):>9.3f}"
+            f" {statistics.mean(r['rss_mb'] for r in results):>14.1f}"
+            f" {statistics.mean(pss):>14.1f} {sum(pss):>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
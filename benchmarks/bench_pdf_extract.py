@@ -0,0 +1,104 @@
+# benchmarks/bench_pdf_extract.py
+"""
+PDF text extraction throughput (pages/sec) over the PDFs in rag/DATA.
+
+Compares the original PyPDF2 `text +=` loop with every installed backend,
+in-process and with the process pool. The rag/DATA files are short, so
+--long-copies also builds one long PDF (rag/DATA concatenated N times, needs
+pypdfium2), which is where the pool pays off on multi-core hosts.
+
+    python -m benchmarks.bench_pdf_extract --repeat 5 --workers 4 --long-copies 10
+"""
+
+import argparse
+import importlib.util
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from utils import extractor
+
+DATA_FOLDER = Path(__file__).resolve().parent.parent / "rag" / "DATA"
+
+
+def legacy_extract(file_path):
+    import PyPDF2
+
+    text = ""
+    with open(file_path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        for page in reader.pages:
+            text += page.extract_text() or ""
+    return text
+
+
+def run(label, extract, files, total_pages, repeat):
+    extract(files[0])  # warm imports / pool
+    start = time.perf_counter()
+    chars = 0
+    for _ in range(repeat):
+        for f in files:
+            chars += len(extract(f))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<22} {total_pages * repeat / elapsed:9.1f} pages/s   {chars // repeat:>9} chars")
+
+
+def build_long_pdf(files, copies):
+    import pypdfium2 as pdfium
+
+    out = pdfium.PdfDocument.new()
+    for _ in range(copies):
+        for f in files:
+            src = pdfium.PdfDocument(f)
+            out.import_pages(src)
+            src.close()
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    out.save(path)
+    out.close()
+    return path
+
+
+def bench(files, total_pages, repeat, workers):
+    run("legacy PyPDF2 +=", legacy_extract, files, total_pages, repeat)
+
+    for backend, (module, _, _) in extractor.BACKENDS.items():
+        if importlib.util.find_spec(module) is None:
+            print(f"{backend:<22} not installed")
+            continue
+        run(f"{backend}", lambda f: extractor.extract_text_from_pdf(f, backend, 1),
+            files, total_pages, repeat)
+        run(f"{backend} x{workers} procs",
+            lambda f: extractor.extract_text_from_pdf(f, backend, workers),
+            files, total_pages, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--long-copies", type=int, default=0)
+    args = parser.parse_args()
+
+    files = [str(p) for p in sorted(DATA_FOLDER.glob("*.pdf"))]
+    total_pages = sum(extractor.BACKENDS["pypdf2"][1](f) for f in files)
+    print(f"{len(files)} PDFs, {total_pages} pages, repeat {args.repeat}, {os.cpu_count()} CPUs\n")
+
+    # Force the pool rows to actually split these short files
+    extractor.PDF_PARALLEL_MIN_PAGES = 0
+    bench(files, total_pages, args.repeat, args.workers)
+
+    if args.long_copies:
+        path = build_long_pdf(files, args.long_copies)
+        try:
+            print(f"\none long PDF, {total_pages * args.long_copies} pages\n")
+            bench([path], total_pages * args.long_copies, 1, args.workers)
+        finally:
+            os.remove(path)
+
+    extractor.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# benchmarks/bench_router.py
+"""
+Routing accuracy and per-query latency: the legacy regex rule
+(formerly rag/retrival.py::is_diagnostic_query) vs agents/router.py.
+
+benchmarks/data/routing_queries.json holds labeled queries that are not in
+agents/router_examples.json. "rag/team accuracy" ignores trivial queries,
+which the legacy rule cannot recognize; "LLM calls saved" counts trivial
+queries answered without the model.
+
+    python -m benchmarks.bench_router                    # MiniLM (needs sentence-transformers)
+    python -m benchmarks.bench_router --embedder ngram   # char n-gram TF-IDF stand-in, CPU-only
+"""
+
+import argparse
+import json
+import re
+import statistics
+import time
+from pathlib import Path
+
+from agents.router import IntentRouter, EXAMPLES_PATH
+
+QUERIES_PATH = Path(__file__).resolve().parent / "data" / "routing_queries.json"
+
+
+def legacy_route(query: str):
+    # Verbatim copy of the old rule, so the benchmark survives changes to retrival.py
+    q = query.lower()
+    patterns = [
+        r"malignant vs benign", r"mimicker", r"imaging features",
+        r"biomarker ratio", r"risk weightage", r"granuloma",
+        r"nodule", r"tuberculosis", r"sarcoidosis",
+        r"report", r"test", r"results", r"explain"
+    ]
+    return "rag" if any(re.search(p, q) for p in patterns) else "team"
+
+
+class NgramEmbeddings:
+    """Character n-gram TF-IDF fit on the router examples, a stand-in when MiniLM is unavailable."""
+
+    def __init__(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        examples = json.loads(Path(EXAMPLES_PATH).read_text())
+        self.vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(2, 4), sublinear_tf=True)
+        self.vectorizer.fit([q.lower() for queries in examples.values() for q in queries])
+
+    def embed_documents(self, texts):
+        return self.vectorizer.transform(texts).toarray()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def evaluate(label, route, queries):
+    latencies, correct, correct_non_trivial, non_trivial, saved = [], 0, 0, 0, 0
+    confusion = {}
+    for item in queries:
+        start = time.perf_counter()
+        branch = route(item["query"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        correct += branch == item["branch"]
+        saved += branch == "trivial" and item["branch"] == "trivial"
+        if item["branch"] != "trivial":
+            non_trivial += 1
+            correct_non_trivial += branch == item["branch"]
+        if branch != item["branch"]:
+            key = f"{item['branch']}->{branch}"
+            confusion[key] = confusion.get(key, 0) + 1
+
+    latencies.sort()
+    print(
+        f"{label:<22} accuracy {correct / len(queries):.3f}   rag/team accuracy {correct_non_trivial / non_trivial:.3f}"
+        f"   LLM calls saved {saved:2d}   p50 {statistics.median(latencies):7.3f} ms"
+        f"   p99 {latencies[int(len(latencies) * 0.99)]:7.3f} ms"
+    )
+    print(f"{'':<22} errors {confusion}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--embedder", choices=["minilm", "ngram"], default="minilm")
+    args = parser.parse_args()
+
+    queries = json.loads(QUERIES_PATH.read_text())
+    print(f"{len(queries)} labeled queries, {args.embedder} embeddings\n")
+
+    evaluate("legacy regex", legacy_route, queries)
+
+    keyword_only = IntentRouter()  # never warmed: keyword fast path + fallback
+    evaluate("keyword + fallback", lambda q: keyword_only.classify(q)["branch"], queries)
+
+    router = IntentRouter(embedder_factory=NgramEmbeddings) if args.embedder == "ngram" else IntentRouter()
+    start = time.perf_counter()
+    router.warm_up()
+    print(f"\ncentroids built in {time.perf_counter() - start:.2f} s")
+    evaluate("router (cold)", lambda q: router.classify(q)["branch"], queries)
+    evaluate("router (cached)", lambda q: router.classify(q)["branch"], queries)
+    print(f"\n{router.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# benchmarks/bench_search_cache.py
+"""
+Web search latency and network calls: plain DuckDuckGoTools vs
+agents/web_tools.py::CachedDuckDuckGoTools, against a fake search backend
+that sleeps instead of calling DuckDuckGo.
+
+Checks, each printed as ok / FAILED:
+- a repeated workload (queries differing only in case / punctuation) is
+  served from the cache after the first search
+- N threads asking the same question at once cause one backend call
+- worker processes sharing the SQLite file search once between them
+- expired entries are searched again, errors are not cached, and the
+  store never holds more than max_entries
+
+    python -m benchmarks.bench_search_cache --latency 0.8
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+
+from agents.web_tools import CachedDuckDuckGoTools
+from services.search_cache import SearchCache
+
+TOPICS = ["lung cancer screening", "immunotherapy side effects", "BRCA gene", "stage 4 cancer",
+          "HPV vaccine", "leukemia causes", "melanoma survival", "colon cancer tests"]
+
+
+class FakeSearch:
+    """Stands in for DDGS: sleeps `latency` seconds and counts calls (per process)."""
+
+    def __init__(self, latency: float, fail_on=()):
+        self.latency = latency
+        self.fail_on = set(fail_on)
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, kind, query, max_results=5, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if query in self.fail_on:
+            raise RuntimeError("rate limited")
+        return [{"title": f"{kind}: {query} #{i}", "href": f"https://example.org/{i}", "body": "..."}
+                for i in range(max_results)]
+
+
+def variants(topic):
+    return [topic, topic.upper(), f"  {topic}? ", f"{topic.title()}!"]
+
+
+def check(label, ok):
+    print(f"  {'ok' if ok else 'FAILED':<6} {label}")
+    return ok
+
+
+def workload(tools, queries):
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        tools.web_search(q)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def bench_repeated(args, path):
+    random.seed(0)
+    queries = [random.choice(variants(random.choice(TOPICS))) for _ in range(args.queries)]
+    print(f"repeated workload: {len(queries)} searches over {len(TOPICS)} topics, backend {args.latency * 1000:.0f} ms")
+    results = {}
+    for label, cache_enabled in (("uncached", False), ("cached", True)):
+        backend = FakeSearch(args.latency)
+        cache = SearchCache(path=path)
+        tools = CachedDuckDuckGoTools(cache=cache, search_backend=backend, cache_enabled=cache_enabled)
+        latencies = workload(tools, queries)
+        results[label] = backend.calls
+        print(f"  {label:<9} backend calls {backend.calls:3d}   p50 {statistics.median(latencies):8.2f} ms"
+              f"   total {sum(latencies) / 1000:6.2f} s")
+        if cache_enabled:
+            print(f"  {'':<9} {cache.stats()}")
+    return check("one backend call per distinct topic", results["cached"] == len(set(
+        q.lower().strip(" ?!") for q in queries)))
+
+
+def bench_coalescing(args, path):
+    print(f"\ncoalescing: {args.threads} threads, same question at once")
+    backend = FakeSearch(args.latency)
+    cache = SearchCache(path=path)
+    tools = CachedDuckDuckGoTools(cache=cache, search_backend=backend)
+    barrier = threading.Barrier(args.threads)
+    outputs = []
+
+    def ask(i):
+        barrier.wait()
+        outputs.append(tools.web_search(variants("what is remission")[i % 4]))
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    print(f"  backend calls {backend.calls}   wall {time.perf_counter() - start:.2f} s   {cache.stats()}")
+    return check("one backend call, identical answers", backend.calls == 1 and len(set(outputs)) == 1)
+
+
+def _worker(path, latency, start_at, queue):
+    backend = FakeSearch(latency)
+    tools = CachedDuckDuckGoTools(cache=SearchCache(path=path), search_backend=backend)
+    time.sleep(max(0, start_at - time.time()))
+    output = tools.web_search("Does the HPV vaccine prevent cancer")
+    queue.put((backend.calls, output))
+
+
+def bench_processes(args, path):
+    print(f"\nshared store: {args.processes} worker processes, same question at once")
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    start_at = time.time() + 2.0  # after every process has imported
+    procs = [ctx.Process(target=_worker, args=(path, args.latency, start_at, queue)) for _ in range(args.processes)]
+    for p in procs:
+        p.start()
+    results = [queue.get() for _ in procs]
+    for p in procs:
+        p.join()
+    calls = sum(c for c, _ in results)
+    print(f"  backend calls across processes {calls}")
+    return check("one backend call, identical answers", calls == 1 and len({o for _, o in results}) == 1)
+
+
+def bench_expiry_and_bounds(args, path):
+    print("\nexpiry, errors, bounds")
+    ok = True
+
+    backend = FakeSearch(0)
+    tools = CachedDuckDuckGoTools(cache=SearchCache(path=path, ttl=0.2, news_ttl=0.1), search_backend=backend)
+    tools.web_search("chemo duration")
+    tools.web_search("chemo duration")
+    time.sleep(0.3)
+    tools.web_search("chemo duration")
+    ok &= check("expired text entry searched again", backend.calls == 2)
+    tools.search_news("chemo duration")
+    ok &= check("news keyed apart from text", backend.calls == 3)
+
+    backend = FakeSearch(0, fail_on={"flaky"})
+    cache = SearchCache(path=path)
+    tools = CachedDuckDuckGoTools(cache=cache, search_backend=backend)
+    for _ in range(2):
+        try:
+            tools.web_search("flaky")
+        except RuntimeError:
+            pass
+    ok &= check("errors are not cached", backend.calls == 2 and cache.stats()["errors"] == 2)
+
+    cache = SearchCache(path=path + ".bounded", max_entries=50)
+    tools = CachedDuckDuckGoTools(cache=cache, search_backend=FakeSearch(0))
+    for i in range(200):
+        tools.web_search(f"query {i}")
+    stats = cache.stats()
+    ok &= check(f"store bounded ({stats['entries']} entries, {stats['evictions']} evicted)", stats["entries"] <= 50)
+    tools.web_search("query 199")
+    ok &= check("recent entries survive eviction", cache.stats()["hits"] == 1)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.8, help="fake backend latency in seconds")
+    parser.add_argument("--queries", type=int, default=60)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--processes", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ok = bench_repeated(args, os.path.join(tmp, "repeated.sqlite3"))
+        ok &= bench_coalescing(args, os.path.join(tmp, "coalescing.sqlite3"))
+        ok &= bench_processes(args, os.path.join(tmp, "processes.sqlite3"))
+        ok &= bench_expiry_and_bounds(args, os.path.join(tmp, "expiry.sqlite3"))
+    print("\nall checks passed" if ok else "\nSOME CHECKS FAILED")
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_summarizer.py
+"""
+BART summarization throughput (docs/sec) vs batch size on CPU.
+
+Documents are page texts from the PDFs in rag/DATA. The model is loaded once
+in-process and fed through the same `summarize_batch` the worker uses; the
+last row goes through the `summarize_many` service end to end.
+
+    python -m benchmarks.bench_summarizer --docs 16 --batch-sizes 1 2 4 8
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from agents import summarizer
+from utils.extractor import extract_text_from_pdf
+
+DATA_FOLDER = Path(__file__).resolve().parent.parent / "rag" / "DATA"
+
+
+def load_documents(n):
+    docs = []
+    for pdf_file in sorted(DATA_FOLDER.glob("*.pdf")):
+        text = extract_text_from_pdf(str(pdf_file))
+        # ~3500-char slices, the same size the summarizer keeps per document
+        docs.extend(text[i:i + 3500] for i in range(0, len(text), 3500))
+    docs = [d for d in docs if len(d.strip()) > 500]
+    return (docs * (n // max(len(docs), 1) + 1))[:n]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=16)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    docs = load_documents(args.docs)
+    print(f"{len(docs)} documents, model {summarizer.SUMMARIZER_MODEL_ID}\n")
+
+    start = time.perf_counter()
+    state = summarizer.load_summarizer()
+    print(f"load time {time.perf_counter() - start:.1f}s\n")
+
+    summarizer.summarize_batch(state, docs[:1])  # warm-up
+
+    for batch_size in args.batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(docs), batch_size):
+            summarizer.summarize_batch(state, docs[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+        print(f"batch {batch_size:>3}   {len(docs) / elapsed:6.2f} docs/sec   ({elapsed:.1f}s)")
+
+    start = time.perf_counter()
+    summarizer.summarize_many(docs)
+    elapsed = time.perf_counter() - start
+    print(f"\nsummarize_many (worker, batch {summarizer.SUMMARIZER_BATCH_SIZE})"
+          f"   {len(docs) / elapsed:6.2f} docs/sec   ({elapsed:.1f}s, includes worker load)")
+    summarizer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
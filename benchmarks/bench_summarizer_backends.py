@@ -0,0 +1,100 @@
+# benchmarks/bench_summarizer_backends.py
+"""
+Summarizer backends compared: load time, RSS, per-document latency, and
+parity of the int8 / ONNX outputs against the fp32 PyTorch baseline.
+
+Each backend runs in a fresh process so RSS figures do not bleed into each
+other. Exits non-zero if a backend's parity falls below --min-parity; the
+same check runs under pytest as tests/test_summarizer_parity.py.
+
+    python -m benchmarks.bench_summarizer_backends --backends torch int8 onnx
+"""
+
+import argparse
+import multiprocessing as mp
+import statistics
+import sys
+import time
+
+
+def rss_mb():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_backend(backend, docs, results):
+    from agents import summarizer
+
+    base_rss = rss_mb()
+    start = time.perf_counter()
+    try:
+        state = summarizer.load_summarizer(backend)
+    except Exception as e:
+        results[backend] = {"error": str(e)}
+        return
+    load_time = time.perf_counter() - start
+    loaded_rss = rss_mb()
+
+    summarizer.summarize_batch(state, docs[:1])  # warm-up
+
+    summaries, latencies = [], []
+    for doc in docs:
+        start = time.perf_counter()
+        summaries.extend(summarizer.summarize_batch(state, [doc]))
+        latencies.append(time.perf_counter() - start)
+
+    results[backend] = {
+        "load_s": load_time,
+        "model_rss_mb": loaded_rss - base_rss,
+        "peak_rss_mb": rss_mb(),
+        "latency_s": statistics.mean(latencies),
+        "summaries": summaries,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--docs", type=int, default=8)
+    parser.add_argument("--min-parity", type=float, default=0.8,
+                        help="minimum mean token similarity vs torch")
+    args = parser.parse_args()
+
+    from agents.summarizer import summary_parity
+    from benchmarks.bench_summarizer import load_documents
+    docs = load_documents(args.docs)
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    ctx = mp.get_context("spawn")
+    results = ctx.Manager().dict()
+    for backend in backends:
+        proc = ctx.Process(target=run_backend, args=(backend, docs, results))
+        proc.start()
+        proc.join()
+
+    print(f"{len(docs)} documents\n")
+    print(f"{'backend':<8} {'load s':>7} {'model MB':>9} {'peak MB':>8} {'s/doc':>7} {'exact':>6} {'similar':>8}")
+
+    reference = results.get("torch", {}).get("summaries")
+    failed = False
+    for backend in backends:
+        r = results.get(backend, {"error": "did not run"})
+        if "error" in r:
+            print(f"{backend:<8} error: {r['error']}")
+            continue
+        exact, similarity = summary_parity(reference, r["summaries"]) if reference else (None, None)
+        if similarity is not None and similarity < args.min_parity:
+            failed = True
+        print(
+            f"{backend:<8} {r['load_s']:>7.1f} {r['model_rss_mb']:>9.0f} {r['peak_rss_mb']:>8.0f}"
+            f" {r['latency_s']:>7.2f} {exact:>6.2f} {similarity:>8.2f}"
+        )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
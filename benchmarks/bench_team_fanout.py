@@ -0,0 +1,128 @@
+# benchmarks/bench_team_fanout.py
+"""
+Latency of the general-knowledge branch: the sequential delegate flow vs
+agents/fanout.py, with stub agents that sleep instead of calling Groq.
+
+The delegate flow is modelled as the leader's planning call, then each
+member in turn, then the leader's final answer. Fan-out runs the members
+concurrently under their deadlines, then the leader under its budget.
+Three scenarios: all healthy, a slow web search (misses its deadline),
+and a slow leader (misses its budget, so the fallback is used).
+
+    python -m benchmarks.bench_team_fanout --requests 20
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from agno.run.agent import RunEvent
+
+from agents.fanout import TeamFanout
+
+
+class _Event:
+    event = RunEvent.run_content
+
+    def __init__(self, content):
+        self.content = content
+
+
+class StubAgent:
+    def __init__(self, name, latency, jitter=0.2):
+        self.name = name
+        self.latency = latency
+        self.jitter = jitter
+
+    def _delay(self):
+        return self.latency * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _answer(self, input):
+        await asyncio.sleep(self._delay())
+        return _Event(f"{self.name} answer")
+
+    async def _stream(self, input):
+        await asyncio.sleep(self._delay())
+        for word in f"{self.name} streamed answer".split():
+            yield _Event(word + " ")
+
+    def arun(self, input, stream=False):
+        return self._stream(input) if stream else self._answer(input)
+
+
+async def delegate(leader, members, query):
+    # Leader decides whom to ask, members answer one by one, leader writes the answer
+    await leader.arun(query)
+    for member in members:
+        await member.arun(query)
+    return (await leader.arun(query)).content, {}
+
+
+async def measure(label, run, requests, concurrency=5):
+    latencies, metas = [], []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            _, meta = await run("What are early symptoms of blood cancer?")
+            latencies.append(time.perf_counter() - start)
+            metas.append(meta)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    fallbacks = sum(bool(m.get("fallback")) for m in metas)
+    print(f"  {label:<9} p50 {statistics.median(latencies):6.2f} s   max {max(latencies):6.2f} s   fallbacks {fallbacks}")
+    if metas and metas[-1]:
+        print(f"  {'':<9} last meta {metas[-1]}")
+
+
+async def main_async(args):
+    scenarios = {
+        "healthy": {"web": 3.0, "knowledge": 2.0, "leader": 1.5},
+        "slow web": {"web": 30.0, "knowledge": 2.0, "leader": 1.5},
+        "slow leader": {"web": 3.0, "knowledge": 2.0, "leader": 20.0},
+    }
+    for name, latency in scenarios.items():
+        print(f"{name}: web {latency['web']} s, knowledge {latency['knowledge']} s, leader {latency['leader']} s "
+              f"(x{args.speedup} faster for the run)")
+        scale = 1 / args.speedup
+        web = StubAgent("WebSearchAgent", latency["web"] * scale)
+        knowledge = StubAgent("CancerKnowledgeAgent", latency["knowledge"] * scale)
+        leader = StubAgent("SupervisorAgent", latency["leader"] * scale)
+        fanout = TeamFanout(
+            members=[web, knowledge], leader=leader,
+            member_timeouts={"WebSearchAgent": args.web_timeout * scale, "CancerKnowledgeAgent": args.knowledge_timeout * scale},
+            default_timeout=args.web_timeout * scale, leader_budget=args.leader_budget * scale,
+            fallback_order=["CancerKnowledgeAgent", "WebSearchAgent"],
+        )
+        if name != "slow web":
+            await measure("delegate", lambda q: delegate(leader, [web, knowledge], q), args.requests)
+        else:
+            print(f"  {'delegate':<9} waits out the full web search (~{latency['web'] + 2 * latency['leader'] + latency['knowledge']:.0f} s), skipped")
+        await measure("fanout", fanout.run, args.requests)
+
+        async def streamed(q):
+            meta = {}
+            text = "".join([token async for token in fanout.stream(q, meta)])
+            return text, meta
+
+        await measure("streamed", streamed, args.requests)
+        print()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--web-timeout", type=float, default=20)
+    parser.add_argument("--knowledge-timeout", type=float, default=20)
+    parser.add_argument("--leader-budget", type=float, default=10)
+    parser.add_argument("--speedup", type=float, default=10, help="divide every latency and deadline by this")
+    args = parser.parse_args()
+    random.seed(0)
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# benchmarks/bench_vector_backends.py
+"""
+MMR query latency (k=5, fetch_k=20, as in rag/retrival.py) for the local
+in-process index vs Qdrant.
+
+Embedding is taken out of the loop: the corpus and queries are random
+unit vectors with MiniLM's 384 dimensions, so only search cost is timed.
+The local rows use exact NumPy search and, when hnswlib is installed, the
+HNSW graph. Qdrant runs in its in-process :memory: mode; pass --qdrant-url
+to time a real server, network round trips included (a temporary
+collection is created and dropped). Recall is the overlap of each
+backend's MMR picks with the exact local result.
+
+    python -m benchmarks.bench_vector_backends --docs 104 20000 --queries 200
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from rag import local_index
+
+DIM = 384
+K, FETCH_K = 5, 20
+
+
+class VectorEmbeddings(Embeddings):
+    """Hands pre-computed query vectors to QdrantVectorStore."""
+
+    def __init__(self):
+        self.vector = np.zeros(DIM)
+
+    def embed_query(self, text):
+        return self.vector.tolist()
+
+    def embed_documents(self, texts):
+        return [self.vector.tolist() for _ in texts]
+
+
+def timed(search, queries):
+    results, latencies = [], []
+    search(queries[0])  # warm
+    for q in queries:
+        start = time.perf_counter()
+        results.append(search(q))
+        latencies.append((time.perf_counter() - start) * 1000)
+    return results, latencies
+
+
+def report(label, latencies, results=None, exact=None):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    recall = ""
+    if exact is not None:
+        hits = sum(len(set(a) & set(b)) for a, b in zip(results, exact))
+        recall = f"   recall@{K} {hits / (len(exact) * K):.3f}"
+    print(f"  {label:<18} p50 {statistics.median(latencies):8.3f} ms   p99 {p99:8.3f} ms{recall}")
+
+
+def qdrant_rows(store, embeddings, records_by_id):
+    def search(q):
+        embeddings.vector = q
+        docs = store.max_marginal_relevance_search("q", k=K, fetch_k=FETCH_K)
+        return [records_by_id[d.metadata["id"]] for d in docs]
+    return search
+
+
+def bench_qdrant(client, vectors, queries, exact, label):
+    from langchain_qdrant import QdrantVectorStore
+    from qdrant_client import models
+
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    client.create_collection(name, vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+    try:
+        ids = [str(uuid.uuid4()) for _ in range(len(vectors))]
+        for start in range(0, len(vectors), 512):
+            client.upsert(name, points=[
+                models.PointStruct(id=ids[i], vector=vectors[i].tolist(),
+                                   payload={"page_content": "", "metadata": {"id": ids[i]}})
+                for i in range(start, min(start + 512, len(vectors)))
+            ])
+        embeddings = VectorEmbeddings()
+        store = QdrantVectorStore(client=client, collection_name=name, embedding=embeddings)
+        results, latencies = timed(qdrant_rows(store, embeddings, {id_: i for i, id_ in enumerate(ids)}), queries)
+        report(label, latencies, results, exact)
+    finally:
+        client.delete_collection(name)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, nargs="+", default=[104, 20000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--qdrant-url", default=None)
+    parser.add_argument("--skip-qdrant-memory", action="store_true",
+                        help="the :memory: mode is pure Python and slow on large corpora")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = local_index._normalize(rng.standard_normal((args.queries, DIM)))
+
+    for n in args.docs:
+        print(f"\n{n} documents, {args.queries} queries")
+        vectors = local_index._normalize(rng.standard_normal((n, DIM)))
+        records = [{"id": str(i), "text": "", "metadata": {}} for i in range(n)]
+
+        with tempfile.TemporaryDirectory() as directory:
+            local_index.write_index(directory, records, vectors, hnsw=False)
+            index = local_index.LocalVectorIndex(directory)
+            exact, latencies = timed(lambda q: index.mmr_search(q, K, FETCH_K), queries)
+            report("local exact", latencies)
+
+            try:
+                import hnswlib  # noqa: F401
+            except ImportError:
+                print("  local hnsw         hnswlib not installed")
+            else:
+                local_index.write_index(directory, records, vectors, hnsw=True)
+                index = local_index.LocalVectorIndex(directory)
+                results, latencies = timed(lambda q: index.mmr_search(q, K, FETCH_K), queries)
+                report("local hnsw", latencies, results, exact)
+
+        from qdrant_client import QdrantClient
+
+        if not args.skip_qdrant_memory:
+            bench_qdrant(QdrantClient(":memory:"), vectors, queries, exact, "qdrant :memory:")
+        if args.qdrant_url:
+            client = QdrantClient(url=args.qdrant_url, api_key=os.getenv("QDRANT_API_KEY_CLOUD"))
+            bench_qdrant(client, vectors, queries, exact, "qdrant server")
+
+
+if __name__ == "__main__":
+    main()
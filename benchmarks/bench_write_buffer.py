@@ -0,0 +1,143 @@
+# benchmarks/bench_write_buffer.py
+"""
+Direct Supabase writes vs services/write_buffer.py against a local
+PostgREST stand-in (an in-process HTTP server that accepts the same
+requests the supabase client sends and sleeps --latency-ms per request).
+
+Reports the request-path cost of saving a chat message, the number of
+HTTP requests needed, flush latency, and checks that rows pending in the
+journal are written after a simulated restart.
+
+    python -m benchmarks.bench_write_buffer --messages 500 --latency-ms 20
+"""
+
+import argparse
+import json
+import statistics
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from services.db import SupabaseGateway
+from services.write_buffer import WriteBuffer
+
+
+class FakePostgREST(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.latency = latency
+        self.requests = 0
+        self.chat_rows = []
+        self.reports = {}
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like PostgREST behind Supabase's gateway
+    disable_nagle_algorithm = True
+    def log_message(self, *args):
+        pass
+
+    def _body(self):
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or "null")
+
+    def _reply(self, rows):
+        payload = json.dumps(rows).encode()
+        self.send_response(201 if self.command == "POST" else 200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        time.sleep(self.server.latency)
+        rows = self._body()
+        rows = rows if isinstance(rows, list) else [rows]
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.chat_rows.extend(rows)
+        self._reply(rows)
+
+    def do_PATCH(self):
+        time.sleep(self.server.latency)
+        fields = self._body()
+        condition = parse_qs(urlparse(self.path).query)["id"][0]
+        if condition.startswith("eq."):
+            ids = [condition[3:]]
+        else:
+            ids = condition[len("in.("):-1].split(",")
+        with self.server.lock:
+            self.server.requests += 1
+            for report_id in ids:
+                self.server.reports.setdefault(report_id.strip('"'), {}).update(fields)
+        self._reply([])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--reports", type=int, default=100)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    server = FakePostgREST(args.latency_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    gateway = SupabaseGateway(server.url, "bench-anon-key")
+    rows = [{"user_id": "u1", "user_message": f"question {i}", "ai_response": "answer " * 50} for i in range(args.messages)]
+
+    # Direct: one insert per message on the request path
+    latencies = []
+    for row in rows:
+        start = time.perf_counter()
+        gateway.execute("chat_history", lambda t: t.insert(row))
+        latencies.append((time.perf_counter() - start) * 1000)
+    print(f"direct    {args.messages} chat rows: p50 {statistics.median(latencies):7.3f} ms per message, "
+          f"{server.requests} HTTP requests")
+
+    with tempfile.TemporaryDirectory() as directory:
+        server.requests, server.chat_rows = 0, []
+        buffer = WriteBuffer(directory, db=gateway, max_rows=200, flush_seconds=0.5)
+        buffer.start()
+        latencies = []
+        for row in rows:
+            start = time.perf_counter()
+            buffer.add_chat(row)
+            latencies.append((time.perf_counter() - start) * 1000)
+        for i in range(args.reports):
+            buffer.update_report(str(i), {"status": "processing"})
+            buffer.update_report(str(i), {"status": "analyzed", "ai_result": "summary" if i % 2 else "same"})
+        buffer.shutdown()
+        stats = buffer.stats()
+        print(f"buffered  {args.messages} chat rows: p50 {statistics.median(latencies):7.3f} ms per message, "
+              f"{server.requests} HTTP requests for them and {2 * args.reports} report updates")
+        print(f"          flushes {stats['flushes']}, flush p50 {stats['flush_ms_p50']} ms, max {stats['flush_ms_max']} ms")
+        assert len(server.chat_rows) == args.messages
+        assert all(server.reports[str(i)]["status"] == "analyzed" for i in range(args.reports))
+
+        # Restart: rows journaled but never flushed are written by the next buffer
+        server.requests, server.chat_rows = 0, []
+        crashed = WriteBuffer(directory, db=gateway, max_rows=10 ** 9, flush_seconds=3600)
+        for row in rows[:50]:
+            crashed.add_chat(row)
+        restarted = WriteBuffer(directory, db=gateway)
+        restarted.start()
+        restarted.shutdown()
+        print(f"restart   recovered {restarted.stats()['recovered']} journaled rows, "
+              f"{len(server.chat_rows)} written after restart")
+        assert len(server.chat_rows) == 50
+
+    print(f"\nper-table latency: {gateway.stats()['tables']}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
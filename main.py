@@ -1,18 +1,35 @@
  # main.py
 
-from fastapi import FastAPI, Depends, UploadFile, File, HTTPException
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, UploadFile, File, HTTPException, BackgroundTasks, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from supabase import create_client
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from pathlib import Path
 import shutil
 from agents.ml_model import predict_cancer
 from agents.supervisor import supervisor
+from agents.router import router
 from auth.auth import verify_token
 from routes.uploads import router as upload_router
-from agents.medgemma import run_medgemma_inference
+from agents import medgemma, summarizer
+from agents.medgemma import arun_medgemma_inference, submit_medgemma, QueueFullError
+from rag import retrival
+from services.response_cache import response_cache, RESPONSE_CACHE_ENABLED
+from services.batch_prediction import parse_batch, iter_ndjson_predictions, BatchInputError
+from services.warmup import registry
+from services.job_queue import job_queue
+from services.job_worker import start_worker_pool, stop_worker_pool
+from services.write_buffer import write_buffer, WRITE_BUFFER_ENABLED
+from services.db import db
+from services.search_cache import search_cache
+from services import model_host
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -20,18 +37,47 @@ load_dotenv()
 # ENV VARIABLES
 # -------------------------------
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-
-supabase = create_client(SUPABASE_URL,SUPABASE_KEY,SUPABASE_SERVICE_ROLE_KEY)
+# Run the report job workers as children of the web process (set to 0 when a
+# separate `worker` process is deployed, as in the Procfile)
+JOB_WORKER_EMBEDDED = os.getenv("JOB_WORKER_EMBEDDED", "1") == "1"
+# This process owns MedGemma and the summarizer; job workers send their
+# inference here instead of loading the models again (services/model_host.py)
+MODEL_HOST_ENABLED = JOB_WORKER_EMBEDDED or bool(model_host.MODEL_HOST_ADDRESS)
 
 
 # -------------------------------
 # FASTAPI INIT
 # -------------------------------
 
-app = FastAPI(title="AI Early Cancer Detection API")
+registry.register("database", db.client, lambda: db.ready)
+registry.register("rag", retrival.warm_up, lambda: retrival.get_retriever_stats()["ready"])
+registry.register("router", router.warm_up, lambda: router.ready)
+registry.register("supervisor", supervisor.warm_up, lambda: supervisor.ready)
+registry.register("medgemma", medgemma.server.start, lambda: medgemma.get_stats()["workers_alive"] > 0)
+registry.register("summarizer", summarizer.server.start, lambda: summarizer.get_stats()["workers_alive"] > 0)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy subsystems load in the background; the port opens right away
+    # and /ready reports when they are warm
+    registry.warm_up_in_background()
+    if WRITE_BUFFER_ENABLED:
+        write_buffer.start()
+    host = model_host.serve() if MODEL_HOST_ENABLED else None
+    job_workers = start_worker_pool(model_host=host) if JOB_WORKER_EMBEDDED else []
+    yield
+    stop_worker_pool(job_workers)
+    model_host.stop()
+    write_buffer.shutdown()
+    retrival.shutdown()
+    medgemma.shutdown()
+    summarizer.shutdown()
+    await db.aclose()
+    db.close()
+
+
+app = FastAPI(title="AI Early Cancer Detection API", lifespan=lifespan)
 
 
 
@@ -65,18 +111,40 @@ class AskRequests(BaseModel):
     vision_score: float | None = None
     image_url: str | None = None
 
+DISCLAIMER = "This system provides AI-assisted risk analysis and is not a substitute for professional medical diagnosis."
+
 # -------------------------------
 # CHAT ENDPOINT (SECURE)
 # -------------------------------
 
+def save_chat_history(user_id: str, query: str, response: str):
+    row = {
+        "user_id": user_id,
+        "user_message": query,
+        "ai_response": response
+    }
+    try:
+        if WRITE_BUFFER_ENABLED:
+            # Journaled locally and bulk-inserted by the write buffer's flush thread
+            write_buffer.add_chat(row)
+        else:
+            db.execute("chat_history", lambda t: t.insert(row))
+    except Exception as e:
+        print("Saving chat history failed:", e)
+
+
 @app.post("/chat")
-def chat_with_ai(data: AskRequests, user=Depends(verify_token)):
+async def chat_with_ai(data: AskRequests, background_tasks: BackgroundTasks, user=Depends(verify_token)):
     try:
         # Integrate MedGemma if image is provided, OR just run the query through it as a secondary check
         if data.image_url or "medgemma" in data.query.lower():
-            # If specifically asked or image provided, use MedGemma primarily
-            medgemma_insights = run_medgemma_inference(data.query, data.image_url)
-            rag_insights = str(supervisor.run(query=data.query, vision_score=data.vision_score))
+            # If specifically asked or image provided, use MedGemma primarily.
+            # MedGemma (local, CPU-bound) and the supervisor (Groq I/O) are independent, so run both at once
+            medgemma_insights, (rag_insights, meta) = await asyncio.gather(
+                arun_medgemma_inference(data.query, data.image_url),
+                supervisor.arun_detailed(query=data.query, vision_score=data.vision_score)
+            )
+            rag_insights = str(rag_insights)
             
             if "Error" in medgemma_insights or "could not be loaded" in medgemma_insights:
                 # If MedGemma fails, just return the RAG/Supervisor response cleanly
@@ -84,29 +152,146 @@ def chat_with_ai(data: AskRequests, user=Depends(verify_token)):
             else:
                 response = f"**MedGemma Image Analysis:**\n{medgemma_insights}\n\n---\n**RAG Clinical Context:**\n{rag_insights}"
         else:
-             # Run Supervisor (handles RAG or Agent Team routing)
-             response = supervisor.run(
-                 query=data.query,
-                 vision_score=data.vision_score
-             )
+             route = await supervisor.aclassify(data.query)
+             branch = route["branch"]
+             response = None
+             meta = {"cached": True, "route": route}
+             # Trivial queries are answered without an LLM; nothing to cache
+             cache_enabled = RESPONSE_CACHE_ENABLED and branch != "trivial"
+             if cache_enabled:
+                 response = await asyncio.to_thread(response_cache.lookup, data.query, branch, data.vision_score)
 
-        # Store chat history if real user
+             if response is None:
+                 # Run Supervisor (handles RAG or Agent Team routing)
+                 response, meta = await supervisor.arun_detailed(
+                     query=data.query,
+                     vision_score=data.vision_score,
+                     route=route
+                 )
+                 # A hedged fallback is not the answer we want to serve again
+                 if cache_enabled and not meta.get("team", {}).get("fallback"):
+                     await asyncio.to_thread(response_cache.store, data.query, branch, str(response), data.vision_score)
+
+        # Store chat history if real user (after the response is sent)
         if user["id"] != "mock_test_id_123":
-            supabase.table("chat_history").insert({
-                "user_id": user["id"],
-                "user_message": data.query,
-                "ai_response": str(response)
-            }).execute()
+            background_tasks.add_task(save_chat_history, user["id"], data.query, str(response))
 
         return {
             "response": response,
-            "disclaimer": "This system provides AI-assisted risk analysis and is not a substitute for professional medical diagnosis."
+            "disclaimer": DISCLAIMER,
+            "meta": meta
         }
 
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# -------------------------------
+# STREAMING CHAT ENDPOINT (SSE)
+# -------------------------------
+
+def sse_event(data: dict, event: str | None = None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(data: AskRequests, user=Depends(verify_token)):
+
+    # Queue MedGemma up front so a saturated model server is a 429, not a broken stream
+    medgemma_future = None
+    if data.image_url or "medgemma" in data.query.lower():
+        try:
+            medgemma_future = submit_medgemma(data.query, data.image_url)
+        except QueueFullError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+
+    async def event_stream():
+        parts = []
+        try:
+            medgemma_task = None
+            if medgemma_future is not None:
+                # MedGemma runs alongside the token stream and is appended at the end
+                medgemma_task = asyncio.wrap_future(medgemma_future)
+
+            route = await supervisor.aclassify(data.query)
+            branch = route["branch"]
+            meta = {"route": route}
+            cache_enabled = RESPONSE_CACHE_ENABLED and branch != "trivial"
+            cached = None
+            if cache_enabled and medgemma_task is None:
+                cached = await asyncio.to_thread(response_cache.lookup, data.query, branch, data.vision_score)
+
+            if cached is not None:
+                meta["cached"] = True
+                parts.append(cached)
+                yield sse_event({"token": cached})
+            else:
+                async for token in supervisor.astream(query=data.query, vision_score=data.vision_score, meta=meta, route=route):
+                    parts.append(token)
+                    yield sse_event({"token": token})
+
+            if medgemma_task is not None:
+                try:
+                    medgemma_insights = await asyncio.wait_for(medgemma_task, medgemma.MEDGEMMA_TIMEOUT)
+                except Exception as e:
+                    medgemma_insights = f"MedGemma inference error: {str(e)}"
+                if not ("Error" in medgemma_insights or "could not be loaded" in medgemma_insights):
+                    section = f"\n\n---\n**MedGemma Image Analysis:**\n{medgemma_insights}"
+                    parts.append(section)
+                    yield sse_event({"token": section})
+            elif cached is None and cache_enabled and not meta.get("team", {}).get("fallback"):
+                await asyncio.to_thread(response_cache.store, data.query, branch, "".join(parts), data.vision_score)
+
+            response = "".join(parts)
+            yield sse_event({"response": response, "disclaimer": DISCLAIMER, "meta": meta}, event="done")
+
+        except Exception as e:
+            yield sse_event({"detail": str(e)}, event="error")
+            return
+
+        # Persist the assembled answer once the client has everything
+        if user["id"] != "mock_test_id_123":
+            await asyncio.to_thread(save_chat_history, user["id"], data.query, response)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# -------------------------------
+# METRICS
+# -------------------------------
+
+@app.get("/ready")
+def ready():
+    is_ready = registry.is_ready()
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "subsystems": registry.status()},
+    )
+
+
+@app.get("/metrics")
+def metrics():
+    return {
+        "rag": retrival.get_retriever_stats(),
+        "response_cache": response_cache.stats(),
+        "medgemma": medgemma.get_stats(),
+        "summarizer": summarizer.get_stats(),
+        "router": router.stats(),
+        "subsystems": registry.status(),
+        "jobs": job_queue.stats(),
+        "write_buffer": write_buffer.stats(),
+        "db": db.stats(),
+        "search_cache": search_cache.stats()
+    }
+
+
 # -------------------------------
 # FILE UPLOAD ENDPOINT
 # -------------------------------    
@@ -127,18 +312,48 @@ def predict(data: CancerInput):
     return result
 
 
+@app.post("/predict/batch")
+async def predict_batch(request: Request):
+    """
+    Scores a cohort in one vectorized pass and streams NDJSON back.
+
+    Accepts a JSON array of CancerInput records, a CSV or Arrow body, or a
+    multipart upload with a `file` field holding either.
+    """
+    content_type = request.headers.get("content-type", "")
+    filename = ""
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing file field")
+        body = await upload.read()
+        content_type, filename = upload.content_type, upload.filename
+    else:
+        body = await request.body()
+
+    try:
+        columns = await run_in_threadpool(parse_batch, body, content_type, filename)
+    except BatchInputError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Sync generator: Starlette pulls each chunk from the threadpool
+    return StreamingResponse(
+        iter_ndjson_predictions(columns),
+        media_type="application/x-ndjson"
+    )
+
+
 class LoginSchema(BaseModel):
     email: str
     password: str
 
 
 @app.post("/login")
-def login(data: LoginSchema):
+async def login(data: LoginSchema):
     try:
-        response = supabase.auth.sign_in_with_password({
-            "email": data.email,
-            "password": data.password
-        })
+        response = await db.asign_in(data.email, data.password)
         return {
             "access_token": response.session.access_token
         }
@@ -0,0 +1,74 @@
+# rag/bm25.py
+
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# Keeps biomarker-style tokens whole: her2, pd-l1, ras-raf-mek-erk, ca-125
+_TOKEN = re.compile(r"[a-z0-9]+(?:[-/][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from has have how i in is it its my of on or "
+    "should that the their this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str):
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        # Also index the parts so "pd-l1" matches "PD L1" and vice versa
+        if "-" in token or "/" in token:
+            tokens.extend(part for part in re.split(r"[-/]", token) if part and part not in STOPWORDS)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over an in-memory inverted index (term -> doc ids, term frequencies)."""
+
+    def __init__(self, texts, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.size = len(texts)
+
+        postings = defaultdict(list)
+        lengths = np.zeros(self.size, dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths[doc_id] = sum(counts.values())
+            for term, tf in counts.items():
+                postings[term].append((doc_id, tf))
+
+        avg_length = float(lengths.mean()) if self.size else 0.0
+        # Per-document length normalization, precomputed once
+        self._norm = k1 * (1 - b + b * lengths / (avg_length or 1.0))
+
+        self._postings = {}
+        for term, entries in postings.items():
+            ids = np.fromiter((doc_id for doc_id, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            idf = math.log(1 + (self.size - len(entries) + 0.5) / (len(entries) + 0.5))
+            self._postings[term] = (ids, tfs, idf)
+
+    def search(self, query: str, k: int = 20):
+        """Returns [(doc_id, score), ...] best first; documents sharing no term are left out."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        matched = False
+        for term in set(tokenize(query)):
+            entry = self._postings.get(term)
+            if entry is None:
+                continue
+            ids, tfs, idf = entry
+            scores[ids] += idf * tfs * (self.k1 + 1) / (tfs + self._norm[ids])
+            matched = True
+        if not matched:
+            return []
+
+        k = min(k, int(np.count_nonzero(scores)))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top]
@@ -0,0 +1,194 @@
+# rag/context_builder.py
+"""
+Turns retrieved chunks into a prompt context that fits a token budget.
+
+1. Near-duplicate chunks (e.g. the same paragraph in two PDFs) are dropped
+   using MinHash over word shingles.
+2. Chunks from the same source whose text overlaps (the indexer splits with
+   a 200-char overlap) are stitched back into one passage.
+3. Passages are added in retrieval order until CONTEXT_TOKEN_BUDGET is
+   reached; the passage that crosses the budget is cut at a word boundary.
+
+Tokens are counted with a tokenizer of the Groq model's family when it can
+be loaded (`tokenizers`, CONTEXT_TOKENIZER: an ungated Llama 3.1 copy, so no
+HF token is needed); otherwise, or with CONTEXT_TOKENIZER empty,
+len(text) / 4 is used. rag.retrival loads it during warm-up.
+"""
+
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500"))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", "unsloth/Llama-3.1-8B-Instruct")
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+
+MIN_OVERLAP_CHARS = 20
+MAX_OVERLAP_CHARS = 400
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 64
+
+_MERSENNE = (1 << 61) - 1
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, _MERSENNE, NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE, NUM_PERMUTATIONS, dtype=np.uint64)
+
+
+# ----------------------------------------------------
+#   TOKEN COUNTING
+# ----------------------------------------------------
+_tokenizer = None
+_tokenizer_loaded = False
+_tokenizer_lock = threading.Lock()
+
+
+def _get_tokenizer():
+    global _tokenizer, _tokenizer_loaded
+    if not _tokenizer_loaded:
+        with _tokenizer_lock:
+            if not _tokenizer_loaded:
+                try:
+                    if CONTEXT_TOKENIZER:
+                        from tokenizers import Tokenizer
+
+                        _tokenizer = Tokenizer.from_pretrained(CONTEXT_TOKENIZER, token=os.getenv("HF_TOKEN"))
+                except Exception as e:
+                    print(f"Tokenizer {CONTEXT_TOKENIZER} unavailable, estimating tokens as chars/4:", e)
+                _tokenizer_loaded = True
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return (len(text) + 3) // 4
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def tokenizer_name() -> str:
+    return CONTEXT_TOKENIZER if _get_tokenizer() is not None else "chars/4"
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        cut = text[:max_tokens * 4]
+    else:
+        encoding = tokenizer.encode(text, add_special_tokens=False)
+        if len(encoding.ids) <= max_tokens:
+            return text
+        cut = text[:encoding.offsets[max_tokens - 1][1]]
+    # Do not end mid-word
+    if len(cut) < len(text) and " " in cut:
+        cut = cut[:cut.rfind(" ")]
+    return cut.rstrip() + " ..."
+
+
+# ----------------------------------------------------
+#   OVERLAP MERGING
+# ----------------------------------------------------
+def _overlap(a: str, b: str) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b`."""
+    for size in range(min(len(a), len(b), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if a.endswith(b[:size]):
+            return size
+    return 0
+
+
+def merge_overlapping(docs):
+    """
+    Returns passages as [{"source", "text", "chunks"}] in retrieval order,
+    with chunks that continue each other merged into one passage.
+    """
+    passages = []
+    for doc in docs:
+        text = doc.page_content.strip()
+        source = doc.metadata.get("source", "Medical Journal")
+
+        for passage in passages:
+            if passage["source"] != source:
+                continue
+            if text in passage["text"]:
+                passage["chunks"] += 1
+                break
+            size = _overlap(passage["text"], text)
+            if size:
+                passage["text"] += text[size:]
+                passage["chunks"] += 1
+                break
+            size = _overlap(text, passage["text"])
+            if size:
+                passage["text"] = text + passage["text"][size:]
+                passage["chunks"] += 1
+                break
+        else:
+            passages.append({"source": source, "text": text, "chunks": 1})
+    return passages
+
+
+# ----------------------------------------------------
+#   NEAR-DUPLICATE REMOVAL
+# ----------------------------------------------------
+def minhash_signature(text: str):
+    words = re.findall(r"\w+", text.lower())
+    shingles = {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))}
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode(), digest_size=8).digest(), "little") % _MERSENNE for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    # (a * h + b) mod p for every permutation; uint64 arithmetic wraps, which is fine for hashing
+    return ((hashes[None, :] * _PERM_A[:, None] + _PERM_B[:, None]) % _MERSENNE).min(axis=1)
+
+
+def drop_near_duplicates(docs, threshold: float = NEAR_DUPLICATE_THRESHOLD):
+    """Keeps the first of any group of documents whose estimated Jaccard similarity >= threshold."""
+    kept, signatures = [], []
+    for doc in docs:
+        signature = minhash_signature(doc.page_content)
+        if any(np.mean(signature == other) >= threshold for other in signatures):
+            continue
+        kept.append(doc)
+        signatures.append(signature)
+    return kept
+
+
+# ----------------------------------------------------
+#   CONTEXT
+# ----------------------------------------------------
+def build_context(docs, token_budget: int = CONTEXT_TOKEN_BUDGET):
+    """Returns (context, stats) for the retrieved documents."""
+    unique = drop_near_duplicates(docs)
+    passages = merge_overlapping(unique)
+
+    parts, used, truncated = [], 0, False
+    for passage in passages:
+        block = f"Source [{passage['source']}]: {passage['text']}"
+        tokens = count_tokens(block) + (2 if parts else 0)
+        if used + tokens <= token_budget:
+            parts.append(block)
+            used += tokens
+            continue
+        remaining = token_budget - used
+        if remaining >= 50:
+            # Leave room for the separator and the " ..." marker
+            block = _truncate_to_tokens(block, remaining - 4)
+            parts.append(block)
+            used += count_tokens(block) + (2 if len(parts) > 1 else 0)
+            truncated = True
+        break
+
+    return "\n\n".join(parts), {
+        "chunks_retrieved": len(docs),
+        "near_duplicates_dropped": len(docs) - len(unique),
+        "passages": len(passages),
+        "passages_used": len(parts),
+        "truncated": truncated,
+        "context_tokens": used,
+        "token_budget": token_budget,
+    }
@@ -0,0 +1,172 @@
+# rag/embedding_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    return _WHITESPACE.sub(" ", text).strip().lower()
+
+
+def _key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little")
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Normalized-text -> embedding cache in front of another embedder.
+
+    Vectors live in a fixed (capacity, dim) float32 matrix sized from
+    `max_bytes`, with slots recycled in LRU order. When `path` is given the
+    matrix is a memory-mapped file (`<path>.f32`) with a JSON index
+    (`<path>.json`), so a restarted process starts warm. Each row's key hash
+    is kept next to it (`<path>.keys`); on load, index entries whose slot was
+    rewritten for another key after the last flush are dropped.
+    """
+
+    def __init__(self, embedder: Embeddings, max_bytes: int = 32 * 1024 * 1024,
+                 path: str = None, flush_every: int = 32):
+        self.embedder = embedder
+        self.max_bytes = max_bytes
+        self.path = path
+        self.flush_every = flush_every
+
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._slots = OrderedDict()
+        self._free = []
+        self._vectors = None
+        self._hashes = None
+        self._dirty = 0
+
+        if path:
+            self._load()
+
+    # ------------------------------------------------
+    #  Storage
+    # ------------------------------------------------
+    def _allocate(self, dim: int):
+        capacity = max(1, self.max_bytes // (dim * 4))
+        if self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._vectors = np.memmap(
+                f"{self.path}.f32", dtype=np.float32, mode="w+", shape=(capacity, dim)
+            )
+            self._hashes = np.memmap(
+                f"{self.path}.keys", dtype=np.uint64, mode="w+", shape=(capacity,)
+            )
+        else:
+            self._vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    def _load(self):
+        index_path = f"{self.path}.json"
+        if not all(os.path.exists(p) for p in (index_path, f"{self.path}.f32", f"{self.path}.keys")):
+            return
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+            dim, capacity = index["dim"], index["capacity"]
+            if capacity != max(1, self.max_bytes // (dim * 4)):
+                print("Embedding cache size changed, starting cold.")
+                return
+            self._vectors = np.memmap(
+                f"{self.path}.f32", dtype=np.float32, mode="r+", shape=(capacity, dim)
+            )
+            self._hashes = np.memmap(
+                f"{self.path}.keys", dtype=np.uint64, mode="r+", shape=(capacity,)
+            )
+            self._slots = OrderedDict(
+                (key, slot) for key, slot in index["entries"] if int(self._hashes[slot]) == _key_hash(key)
+            )
+            stale = len(index["entries"]) - len(self._slots)
+            if stale:
+                print(f"Embedding cache dropped {stale} entries rewritten after the last flush.")
+            used = set(self._slots.values())
+            self._free = [i for i in range(capacity - 1, -1, -1) if i not in used]
+            print(f"Embedding cache loaded {len(self._slots)} entries from disk.")
+        except Exception as e:
+            print("Embedding cache load failed, starting cold:", e)
+            self._vectors = None
+            self._hashes = None
+            self._slots = OrderedDict()
+            self._free = []
+
+    def flush(self):
+        if not self.path or self._vectors is None:
+            return
+        with self._lock:
+            self._vectors.flush()
+            self._hashes.flush()
+            index = {
+                "dim": int(self._vectors.shape[1]),
+                "capacity": int(self._vectors.shape[0]),
+                "entries": list(self._slots.items()),
+            }
+            self._dirty = 0
+        tmp_path = f"{self.path}.json.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(index, f)
+        os.replace(tmp_path, f"{self.path}.json")
+
+    # ------------------------------------------------
+    #  Embeddings API
+    # ------------------------------------------------
+    def embed_query(self, text: str):
+        key = normalize_query(text)
+
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None:
+                self._slots.move_to_end(key)
+                self.hits += 1
+                return self._vectors[slot].tolist()
+            self.misses += 1
+
+        vector = np.asarray(self.embedder.embed_query(key), dtype=np.float32)
+
+        with self._lock:
+            if self._vectors is None:
+                self._allocate(vector.shape[0])
+            if key not in self._slots:
+                if not self._free:
+                    _, evicted = self._slots.popitem(last=False)
+                    self._free.append(evicted)
+                slot = self._free.pop()
+                # Hash first: a crash between the two writes must not leave
+                # the old key's persisted entry looking valid
+                if self._hashes is not None:
+                    self._hashes[slot] = _key_hash(key)
+                self._vectors[slot] = vector
+                self._slots[key] = slot
+                self._dirty += 1
+            should_flush = self.path and self._dirty >= self.flush_every
+
+        if should_flush:
+            self.flush()
+        return vector.tolist()
+
+    def embed_documents(self, texts):
+        return self.embedder.embed_documents(texts)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "entries": len(self._slots),
+            "capacity": int(self._vectors.shape[0]) if self._vectors is not None else None,
+            "persistent": bool(self.path),
+        }
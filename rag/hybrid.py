@@ -0,0 +1,119 @@
+# rag/hybrid.py
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from rag.bm25 import BM25Index
+from rag.embedding_cache import normalize_query
+from rag.index_version import get_index_version
+
+
+def rrf_fuse(rankings, k: int = 60):
+    """Reciprocal rank fusion of several best-first key lists."""
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+def _key(text: str) -> str:
+    return hashlib.sha1(text.strip().encode("utf-8")).hexdigest()
+
+
+class HybridRetriever:
+    """
+    Dense + BM25 retrieval fused with reciprocal rank fusion.
+
+    `load_chunks()` returns the indexed chunks as (text, metadata) pairs;
+    the BM25 index is built from them on first use and rebuilt when the
+    index version changes. Fused results are cached per normalized query,
+    so a repeated question costs neither an embedding nor a vector search.
+    """
+
+    def __init__(self, vector_store, load_chunks, k: int = 5, fetch_k: int = 20,
+                 rrf_k: int = 60, cache_size: int = 1024):
+        self.vector_store = vector_store
+        self.load_chunks = load_chunks
+        self.k = k
+        self.fetch_k = fetch_k
+        self.rrf_k = rrf_k
+        self.cache_size = cache_size
+
+        self._lock = threading.Lock()
+        # (BM25Index, chunks), swapped as one so a search never mixes two builds
+        self._index = None
+        self._version = None
+        self._cache = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.bm25_build_seconds = None
+
+    def ensure_index(self):
+        version = get_index_version()
+        if self._index is not None and version == self._version:
+            return
+        with self._lock:
+            if self._index is not None and version == self._version:
+                return
+            start = time.perf_counter()
+            chunks = list(self.load_chunks())
+            self._index = (BM25Index([text for text, _ in chunks]), chunks)
+            self._version = version
+            # Cached fusions point at the old chunks
+            self._cache.clear()
+            self.bm25_build_seconds = round(time.perf_counter() - start, 3)
+
+    def search(self, query: str):
+        from langchain_core.documents import Document
+
+        self.ensure_index()
+        cache_key = normalize_query(query)
+        with self._lock:
+            index = self._index
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        docs = {}
+        dense = []
+        for doc in self.vector_store.similarity_search(query, k=self.fetch_k):
+            key = _key(doc.page_content)
+            docs.setdefault(key, doc)
+            dense.append(key)
+
+        bm25, chunks = index
+        sparse = []
+        for doc_id, _ in bm25.search(query, self.fetch_k):
+            text, metadata = chunks[doc_id]
+            key = _key(text)
+            docs.setdefault(key, Document(page_content=text, metadata=metadata))
+            sparse.append(key)
+
+        results = [docs[key] for key in rrf_fuse([dense, sparse], self.rrf_k)[:self.k]]
+
+        with self._lock:
+            # Not cached if the index was rebuilt meanwhile: the cache now belongs to the new one
+            if self._index is index:
+                self._cache[cache_key] = results
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        index = self._index
+        return {
+            "chunks": len(index[1]) if index is not None else 0,
+            "bm25_build_seconds": self.bm25_build_seconds,
+            "cache_entries": len(self._cache),
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(self.hits / lookups, 3) if lookups else None,
+        }
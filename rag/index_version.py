@@ -0,0 +1,63 @@
+# rag/index_version.py
+"""
+Version of the RAG index, so anything derived from it (cached RAG answers,
+the BM25 index) can tell it is stale.
+
+The indexer stores a new version with the index after every run that
+changed it: in the Qdrant collection's metadata, or in meta.json of a local
+index. It usually runs on another machine, so the serving process reads the
+version back from the index, at most once every INDEX_VERSION_TTL seconds.
+"""
+
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+INDEX_VERSION_TTL = float(os.getenv("INDEX_VERSION_TTL", "30"))
+
+_source = None
+_version = 0.0
+_read_at = None
+_lock = threading.Lock()
+
+
+def set_index_version_source(read):
+    """Registers `read()`, which returns the version of the index this process serves."""
+    global _source, _read_at
+    with _lock:
+        _source = read
+        _read_at = None
+
+
+def get_index_version() -> float:
+    global _version, _read_at
+    if _source is None:
+        return 0.0
+    if _read_at is not None and time.monotonic() - _read_at < INDEX_VERSION_TTL:
+        return _version
+    # One thread refreshes; the others keep using the last version meanwhile
+    if not _lock.acquire(blocking=False):
+        return _version
+    try:
+        if _source is not None:
+            try:
+                _version = float(_source() or 0.0)
+            except Exception as e:
+                print("Index version read failed, keeping the last one:", e)
+            _read_at = time.monotonic()
+    finally:
+        _lock.release()
+    return _version
+
+
+def qdrant_index_version(client, collection_name: str) -> float:
+    metadata = client.get_collection(collection_name).config.metadata or {}
+    return metadata.get("index_version", 0.0)
+
+
+def set_qdrant_index_version(client, collection_name: str, version: float):
+    client.update_collection(collection_name, metadata={"index_version": version})
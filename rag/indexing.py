@@ -1,55 +1,384 @@
+# rag/indexing.py
+"""
+Incremental indexer for the PDFs in rag/DATA.
+
+Each file's sha256 is recorded in a manifest, so unchanged files are
+skipped. Chunk IDs are derived from (source, position, text), which makes
+re-indexing an upsert: edited files replace their own chunks and deleted
+files have them removed. Without a manifest (first run) or with --full,
+every point not written by this run is deleted afterwards, which clears
+out collections built by older indexers with random point IDs.
+
+    python -m rag.indexing             # index new/changed files into Qdrant
+    python -m rag.indexing --full      # re-embed everything
+    python -m rag.indexing --memory    # dry run against an in-memory Qdrant
+    python -m rag.indexing --backend local   # build the in-process index (rag/local_index.py)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
-from langchain_qdrant import QdrantVectorStore
+
+import numpy as np
 from dotenv import load_dotenv
-import os
+
+from rag.index_version import set_qdrant_index_version
 
 load_dotenv()
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY_CLOUD")
 
-DATA_FOLDER = Path(__file__).parent/"DATA"
+DATA_FOLDER = Path(__file__).parent / "DATA"
+MANIFEST_PATH = os.getenv("INDEX_MANIFEST_PATH", str(Path(__file__).parent / "cache" / "index_manifest.json"))
+
+RAG_BACKEND = os.getenv("RAG_BACKEND", "qdrant")
+COLLECTION_NAME = "cancer_rag"
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+INDEX_EMBED_BATCH = int(os.getenv("INDEX_EMBED_BATCH", "64"))
+INDEX_UPSERT_BATCH = int(os.getenv("INDEX_UPSERT_BATCH", "256"))
+INDEX_LOAD_WORKERS = int(os.getenv("INDEX_LOAD_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+CHUNK_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "cancer_rag/chunks")
+
+
+# ----------------------------------------------------
+#   LOADING + CHUNKING
+# ----------------------------------------------------
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, index: int, text: str) -> str:
+    text_hash = hashlib.sha1(text.encode("utf-8")).hexdigest()
+    return str(uuid.uuid5(CHUNK_NAMESPACE, f"{source}:{index}:{text_hash}"))
+
+
+def load_pdf(path: str):
+    """Returns [(page_number, text), ...]; runs in the loader processes."""
+    from utils.extractor import iter_pdf_pages
+
+    return list(enumerate(iter_pdf_pages(path, workers=1)))
+
+
+def split_pages(source: str, content_hash: str, pages):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = []
+    for page, text in pages:
+        for piece in splitter.split_text(text):
+            index = len(chunks)
+            chunks.append({
+                "id": chunk_id(source, index, piece),
+                "text": piece,
+                "metadata": {"source": source, "page": page, "chunk": index, "content_hash": content_hash},
+            })
+    return chunks
+
+
+# ----------------------------------------------------
+#   SINKS
+# ----------------------------------------------------
+class QdrantSink:
+    """Writes chunks in the payload layout langchain's QdrantVectorStore reads."""
+
+    def __init__(self, client, collection_name: str = COLLECTION_NAME, target: str = None):
+        self.client = client
+        self.collection_name = collection_name
+        # Identifies the index in the manifest; None means nothing persists between runs
+        self.target = target
+
+    def ensure_collection(self, dim: int):
+        from qdrant_client import models
+
+        if not self.client.collection_exists(self.collection_name):
+            self.client.create_collection(
+                self.collection_name,
+                vectors_config=models.VectorParams(size=dim, distance=models.Distance.COSINE),
+            )
+
+    def upsert(self, chunks, vectors):
+        from qdrant_client import models
+
+        for start in range(0, len(chunks), INDEX_UPSERT_BATCH):
+            batch = chunks[start:start + INDEX_UPSERT_BATCH]
+            self.client.upsert(
+                self.collection_name,
+                points=[
+                    models.PointStruct(
+                        id=chunk["id"],
+                        vector=vector,
+                        payload={"page_content": chunk["text"], "metadata": chunk["metadata"]},
+                    )
+                    for chunk, vector in zip(batch, vectors[start:start + INDEX_UPSERT_BATCH])
+                ],
+            )
+
+    def delete(self, ids):
+        from qdrant_client import models
+
+        if ids:
+            self.client.delete(self.collection_name, points_selector=models.PointIdsList(points=list(ids)))
+
+    def prune(self, keep_ids) -> int:
+        """Deletes every point whose ID is not in `keep_ids`; returns how many."""
+        if not self.client.collection_exists(self.collection_name):
+            return 0
+        keep = set(keep_ids)
+        unknown, offset = [], None
+        while True:
+            points, offset = self.client.scroll(
+                self.collection_name, limit=1000, offset=offset, with_payload=False, with_vectors=False
+            )
+            unknown.extend(point.id for point in points if str(point.id) not in keep)
+            if offset is None:
+                break
+        for start in range(0, len(unknown), INDEX_UPSERT_BATCH):
+            self.delete(unknown[start:start + INDEX_UPSERT_BATCH])
+        return len(unknown)
+
+    def count(self) -> int:
+        if not self.client.collection_exists(self.collection_name):
+            return 0
+        return self.client.count(self.collection_name).count
+
+    def set_version(self, version: float):
+        if self.client.collection_exists(self.collection_name):
+            set_qdrant_index_version(self.client, self.collection_name, version)
+
+
+class LocalSink:
+    """Holds the local index in memory during a run and rewrites it on flush()."""
+
+    def __init__(self, directory: str):
+        from rag.local_index import read_records
+
+        self.directory = directory
+        self.target = f"local:{os.path.abspath(directory)}"
+        records, vectors = read_records(directory)
+        self._rows = {record["id"]: (record, vector) for record, vector in zip(records, vectors if records else [])}
+        self._version = None
+
+    def ensure_collection(self, dim: int):
+        pass
+
+    def upsert(self, chunks, vectors):
+        for chunk, vector in zip(chunks, vectors):
+            record = {"id": chunk["id"], "text": chunk["text"], "metadata": chunk["metadata"]}
+            self._rows[chunk["id"]] = (record, np.asarray(vector, dtype=np.float32))
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self._rows.pop(chunk_id, None)
+
+    def prune(self, keep_ids) -> int:
+        unknown = set(self._rows) - set(keep_ids)
+        self.delete(unknown)
+        return len(unknown)
+
+    def count(self) -> int:
+        return len(self._rows)
+
+    def set_version(self, version: float):
+        self._version = version  # written to meta.json by flush()
+
+    def flush(self):
+        from rag.local_index import write_index
+
+        records = [record for record, _ in self._rows.values()]
+        vectors = np.stack([vector for _, vector in self._rows.values()]) if records else np.zeros((0, 0))
+        write_index(self.directory, records, vectors, EMBEDDING_MODEL_NAME, version=self._version)
+
+
+def make_qdrant_sink(memory: bool = False, collection_name: str = COLLECTION_NAME):
+    from qdrant_client import QdrantClient
+
+    if memory:
+        return QdrantSink(QdrantClient(":memory:"), collection_name)
+    url = os.getenv("QDRANT_URL")
+    if not url:
+        raise ValueError("QDRANT_URL not set")
+    client = QdrantClient(url=url, api_key=os.getenv("QDRANT_API_KEY_CLOUD"), timeout=60)
+    return QdrantSink(client, collection_name, target=f"{url}/{collection_name}")
+
+
+def make_embedder(batch_size: int = INDEX_EMBED_BATCH):
+    from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME, encode_kwargs={"batch_size": batch_size})
+
+
+# ----------------------------------------------------
+#   MANIFEST
+# ----------------------------------------------------
+def load_manifest(path, target):
+    if not path or not target or not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    # Another cluster/collection or embedding model: nothing in it is reusable
+    if manifest.get("target") != target or manifest.get("embedding_model") != EMBEDDING_MODEL_NAME:
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(path, target, files):
+    if not path or not target:
+        return
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"target": target, "embedding_model": EMBEDDING_MODEL_NAME, "files": files}, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------------------
+#   INDEXER
+# ----------------------------------------------------
+def run_index(sink, embedder, data_dir=DATA_FOLDER, manifest_path=MANIFEST_PATH, full: bool = False,
+              load_workers: int = INDEX_LOAD_WORKERS, embed_batch: int = INDEX_EMBED_BATCH):
+    start = time.perf_counter()
+    stats = {"files": 0, "indexed": 0, "skipped": 0, "removed": 0, "pruned": 0, "pages": 0, "chunks": 0,
+             "chunks_deleted": 0, "load_seconds": 0.0, "embed_seconds": 0.0, "upsert_seconds": 0.0}
+
+    # Loaded even with `full`, so chunks of edited or removed files are still deleted
+    manifest = load_manifest(manifest_path, sink.target)
+    # Without a manifest nothing says which points in the index are ours
+    prune = full or not manifest
+    files = {p.name: p for p in sorted(Path(data_dir).glob("*.pdf"))}
+    hashes = {name: file_sha256(path) for name, path in files.items()}
+    stats["files"] = len(files)
+
+    # Buffered sinks (local index) only hit disk on flush(), so the manifest waits for it
+    buffered = hasattr(sink, "flush")
+
+    changed = [name for name in files if full or manifest.get(name, {}).get("sha256") != hashes[name]]
+    stats["skipped"] = len(files) - len(changed)
+    print(f"{len(files)} PDFs, {len(changed)} new or changed, {stats['skipped']} unchanged")
+
+    load_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(load_workers, len(changed) or 1))) as pool:
+        futures = {pool.submit(load_pdf, str(files[name])): name for name in changed}
+        for done, future in enumerate(as_completed(futures), 1):
+            name = futures[future]
+            pages = future.result()
+            stats["load_seconds"] = time.perf_counter() - load_start
+
+            chunks = split_pages(name, hashes[name], pages)
+
+            t = time.perf_counter()
+            vectors = []
+            for i in range(0, len(chunks), embed_batch):
+                vectors.extend(embedder.embed_documents([c["text"] for c in chunks[i:i + embed_batch]]))
+            embed_seconds = time.perf_counter() - t
+
+            t = time.perf_counter()
+            if vectors:
+                sink.ensure_collection(len(vectors[0]))
+                sink.upsert(chunks, vectors)
+            new_ids = [c["id"] for c in chunks]
+            stale = set(manifest.get(name, {}).get("chunk_ids", [])) - set(new_ids)
+            sink.delete(stale)
+            upsert_seconds = time.perf_counter() - t
 
-all_docs = []
-for pdf_file in DATA_FOLDER.glob("*.pdf"):
-    print(f"loading.....{pdf_file.name}")
-    loader = PyPDFLoader(str(pdf_file))
-    docs = loader.load()
+            manifest[name] = {"sha256": hashes[name], "pages": len(pages), "chunk_ids": new_ids}
+            if not buffered:
+                save_manifest(manifest_path, sink.target, manifest)
 
-    for d in docs:
-        d.metadata["source"] = pdf_file.name
-    all_docs.extend(docs)
+            stats["indexed"] += 1
+            stats["pages"] += len(pages)
+            stats["chunks"] += len(chunks)
+            stats["chunks_deleted"] += len(stale)
+            stats["embed_seconds"] += embed_seconds
+            stats["upsert_seconds"] += upsert_seconds
+            print(
+                f"[{done}/{len(changed)}] {name}: {len(pages)} pages, {len(chunks)} chunks"
+                f" ({len(stale)} stale removed), embed {embed_seconds:.2f}s, upsert {upsert_seconds:.2f}s"
+            )
 
-print(f"Total pages loaded : {len(all_docs)}")
+    for name in [name for name in manifest if name not in files]:
+        stale = manifest.pop(name).get("chunk_ids", [])
+        sink.delete(stale)
+        if not buffered:
+            save_manifest(manifest_path, sink.target, manifest)
+        stats["removed"] += 1
+        stats["chunks_deleted"] += len(stale)
+        print(f"{name}: removed, {len(stale)} chunks deleted")
 
-# print(docs[0])
+    if prune:
+        pruned = sink.prune(chunk_id for entry in manifest.values() for chunk_id in entry.get("chunk_ids", []))
+        stats["pruned"] = pruned
+        stats["chunks_deleted"] += pruned
+        if pruned:
+            print(f"{pruned} points not written by this indexer deleted")
 
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200
-)
+    changed_index = stats["indexed"] or stats["removed"] or stats["pruned"]
+    if changed_index:
+        # Cached RAG answers and the BM25 index were built against the old index
+        sink.set_version(time.time())
+    if buffered and changed_index:
+        sink.flush()
+        save_manifest(manifest_path, sink.target, manifest)
 
+    stats["total_seconds"] = time.perf_counter() - start
+    return stats
 
-chunks = text_splitter.split_documents(all_docs)
-print(f"Total Chunks created {len(chunks)}")
 
+def report(stats):
+    total = stats["total_seconds"] or 1e-9
+    embed = stats["embed_seconds"] or 1e-9
+    print(
+        f"\nIndexed {stats['indexed']} files ({stats['skipped']} skipped, {stats['removed']} removed):"
+        f" {stats['pages']} pages, {stats['chunks']} chunks, {stats['chunks_deleted']} deleted"
+    )
+    print(
+        f"load {stats['load_seconds']:.2f}s, embed {stats['embed_seconds']:.2f}s"
+        f" ({stats['chunks'] / embed:.1f} chunks/s), upsert {stats['upsert_seconds']:.2f}s,"
+        f" total {total:.2f}s ({stats['pages'] / total:.1f} pages/s)"
+    )
 
 
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally index rag/DATA into Qdrant.")
+    parser.add_argument("--data", default=str(DATA_FOLDER))
+    parser.add_argument("--full", action="store_true", help="ignore the manifest and re-embed every file")
+    parser.add_argument("--backend", choices=["qdrant", "local"], default=RAG_BACKEND)
+    parser.add_argument("--memory", action="store_true", help="use an in-memory Qdrant (nothing is persisted)")
+    parser.add_argument("--collection", default=COLLECTION_NAME)
+    parser.add_argument("--embed-batch", type=int, default=INDEX_EMBED_BATCH)
+    parser.add_argument("--workers", type=int, default=INDEX_LOAD_WORKERS)
+    parser.add_argument("--manifest", default=None)
+    args = parser.parse_args()
 
-embedding_model = HuggingFaceEmbeddings(
-    model_name="sentence-transformers/all-MiniLM-L6-v2"
-)
+    if args.backend == "local":
+        from rag.local_index import LOCAL_INDEX_DIR
 
+        sink = LocalSink(LOCAL_INDEX_DIR)
+        manifest_path = args.manifest or os.path.join(LOCAL_INDEX_DIR, "manifest.json")
+    else:
+        sink = make_qdrant_sink(memory=args.memory, collection_name=args.collection)
+        manifest_path = args.manifest or MANIFEST_PATH
+    stats = run_index(
+        sink,
+        make_embedder(args.embed_batch),
+        data_dir=args.data,
+        manifest_path=manifest_path,
+        full=args.full,
+        load_workers=args.workers,
+        embed_batch=args.embed_batch,
+    )
+    report(stats)
+    print(f"{args.backend} index now holds {sink.count()} chunks.")
 
-vector_store = QdrantVectorStore.from_documents(
-    documents=chunks,
-    embedding=embedding_model,
-    url=os.getenv("QDRANT_URL"),
-    api_key=os.getenv("QDRANT_API_KEY_CLOUD"),
-    collection_name="cancer_rag",
-    batch_size=16
-)
 
-print("Indexing of MULTIPLE documents done successfully!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
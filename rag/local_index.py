@@ -0,0 +1,259 @@
+# rag/local_index.py
+"""
+In-process vector index, an alternative to the remote Qdrant collection.
+
+Layout of an index directory (written by `python -m rag.indexing --backend local`):
+
+    current         name of the version subdirectory being served
+    v<ms>-<random>/ one complete index per write:
+        vectors.f32     float32 (count, dim) matrix of L2-normalized embeddings
+        metadata.jsonl  one {"id", "text", "metadata"} line per matrix row
+        meta.json       dim, count, embedding model, version (set by the indexer)
+        hnsw.bin        optional hnswlib graph, built for large corpora
+
+A write fills a new subdirectory and then replaces `current`, so readers
+switch from one complete index to the next in a single rename. Running
+stores look at `current` every LOCAL_INDEX_CHECK_SECONDS and reload.
+
+The matrix is opened with np.memmap, so every worker shares the same page
+cache. Search is an exact dot product over the whole matrix; when an HNSW
+graph is present it only proposes candidates, which are re-scored exactly.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "local_index"))
+LOCAL_INDEX_HNSW_MIN = int(os.getenv("LOCAL_INDEX_HNSW_MIN", "50000"))
+LOCAL_INDEX_HNSW_EF = int(os.getenv("LOCAL_INDEX_HNSW_EF", "128"))
+LOCAL_INDEX_CHECK_SECONDS = float(os.getenv("LOCAL_INDEX_CHECK_SECONDS", "5"))
+
+
+def index_path(directory: str) -> str:
+    """The subdirectory holding the index currently served from `directory`."""
+    try:
+        with open(os.path.join(directory, "current")) as f:
+            return os.path.join(directory, f.read().strip())
+    except FileNotFoundError:
+        return directory  # index written before versioned subdirectories
+
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def mmr(query_vector, candidates, k: int = 4, lambda_mult: float = 0.5):
+    """
+    Maximal marginal relevance over L2-normalized vectors.
+
+    Same selection rule as langchain's maximal_marginal_relevance, but the
+    max similarity to the selected set is updated incrementally instead of
+    recomputing the full similarity matrix every step.
+    Returns indices into `candidates`.
+    """
+    n = len(candidates)
+    if min(k, n) <= 0:
+        return []
+    to_query = candidates @ query_vector
+    selected = [int(np.argmax(to_query))]
+    redundancy = candidates @ candidates[selected[0]]
+
+    while len(selected) < min(k, n):
+        scores = lambda_mult * to_query - (1 - lambda_mult) * redundancy
+        scores[selected] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        np.maximum(redundancy, candidates @ candidates[best], out=redundancy)
+    return selected
+
+
+class LocalVectorIndex:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.path = directory = index_path(directory)
+        with open(os.path.join(directory, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.count = self.meta["count"]
+        self.dim = self.meta["dim"]
+
+        if self.count:
+            self.vectors = np.memmap(
+                os.path.join(directory, "vectors.f32"), dtype=np.float32, mode="r", shape=(self.count, self.dim)
+            )
+        else:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+
+        self.records = []
+        with open(os.path.join(directory, "metadata.jsonl")) as f:
+            for line in f:
+                self.records.append(json.loads(line))
+
+        self.hnsw = None
+        hnsw_path = os.path.join(directory, "hnsw.bin")
+        if os.path.exists(hnsw_path):
+            try:
+                import hnswlib
+
+                self.hnsw = hnswlib.Index(space="ip", dim=self.dim)
+                self.hnsw.load_index(hnsw_path, max_elements=self.count)
+                self.hnsw.set_ef(LOCAL_INDEX_HNSW_EF)
+            except ImportError:
+                print("hnsw.bin present but hnswlib is not installed; using exact search.")
+
+    def search(self, query_vector, k: int = 4):
+        """Returns (rows, scores) of the k most similar vectors, best first."""
+        if not self.count:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        query_vector = _normalize(query_vector)
+        k = min(k, self.count)
+
+        if self.hnsw is not None:
+            labels, _ = self.hnsw.knn_query(query_vector, k=k)
+            rows = labels[0].astype(np.int64)
+            scores = self.vectors[rows] @ query_vector
+        else:
+            scores = self.vectors @ query_vector
+            rows = np.argpartition(-scores, k - 1)[:k]
+            scores = scores[rows]
+
+        order = np.argsort(-scores, kind="stable")
+        return rows[order], scores[order]
+
+    def mmr_search(self, query_vector, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5):
+        rows, _ = self.search(query_vector, fetch_k)
+        if not len(rows):
+            return []
+        picked = mmr(_normalize(query_vector), np.asarray(self.vectors[rows]), k, lambda_mult)
+        return [int(rows[i]) for i in picked]
+
+
+def build_hnsw(vectors, path: str, m: int = 16, ef_construction: int = 200):
+    import hnswlib
+
+    index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+    index.init_index(max_elements=len(vectors), M=m, ef_construction=ef_construction)
+    index.add_items(vectors, np.arange(len(vectors)))
+    index.save_index(path)
+
+
+def _prune_versions(directory: str, keep):
+    for name in os.listdir(directory):
+        if name.startswith("v") and name not in keep and os.path.isdir(os.path.join(directory, name)):
+            shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def write_index(directory: str, records, vectors, embedding_model: str = None, hnsw=None, version: float = None):
+    """
+    Writes a complete index. `records` are {"id", "text", "metadata"} dicts
+    aligned with `vectors`. The files go to a new version subdirectory and
+    `current` is then replaced in one rename, so readers never see a
+    half-written index or a mix of two.
+    """
+    os.makedirs(directory, exist_ok=True)
+    vectors = _normalize(vectors).reshape(len(records), -1)
+    dim = int(vectors.shape[1]) if len(records) else 0
+    previous = os.path.basename(index_path(directory))
+
+    version_dir = tempfile.mkdtemp(prefix=f"v{int(time.time() * 1000):015d}-", dir=directory)
+    os.chmod(version_dir, 0o755)  # mkdtemp creates it private
+
+    def path(name):
+        return os.path.join(version_dir, name)
+
+    try:
+        vectors.tofile(path("vectors.f32"))
+        with open(path("metadata.jsonl"), "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+        use_hnsw = len(records) >= LOCAL_INDEX_HNSW_MIN if hnsw is None else hnsw
+        if use_hnsw:
+            build_hnsw(vectors, path("hnsw.bin"))
+
+        with open(path("meta.json"), "w") as f:
+            json.dump({"dim": dim, "count": len(records), "embedding_model": embedding_model,
+                       "version": time.time() if version is None else version}, f)
+
+        with open(os.path.join(directory, "current.tmp"), "w") as f:
+            f.write(os.path.basename(version_dir))
+        os.replace(os.path.join(directory, "current.tmp"), os.path.join(directory, "current"))
+    except BaseException:
+        shutil.rmtree(version_dir, ignore_errors=True)
+        raise
+    # A reader that resolved `current` just before the swap may still open the previous version
+    _prune_versions(directory, keep={os.path.basename(version_dir), previous})
+
+
+def read_index_version(directory: str) -> float:
+    try:
+        with open(os.path.join(index_path(directory), "meta.json")) as f:
+            return json.load(f).get("version", 0.0)
+    except FileNotFoundError:
+        return 0.0
+
+
+def read_records(directory: str):
+    """Returns (records, vectors) of an existing index, or empty ones."""
+    if not os.path.exists(os.path.join(index_path(directory), "meta.json")):
+        return [], None
+    index = LocalVectorIndex(directory)
+    return index.records, np.array(index.vectors)
+
+
+class LocalVectorStore:
+    """
+    Drop-in for the parts of QdrantVectorStore that rag/retrival.py uses.
+    Picks up a newly written index within LOCAL_INDEX_CHECK_SECONDS.
+    """
+
+    def __init__(self, directory: str, embedding, check_seconds: float = LOCAL_INDEX_CHECK_SECONDS):
+        self.directory = directory
+        self.index = LocalVectorIndex(directory)
+        self.embedding = embedding
+        self.check_seconds = check_seconds
+        self._checked_at = time.monotonic()
+        self._reload_lock = threading.Lock()
+
+    def _current_index(self):
+        if time.monotonic() - self._checked_at < self.check_seconds:
+            return self.index
+        # One thread reloads; the others keep searching the loaded index meanwhile
+        if self._reload_lock.acquire(blocking=False):
+            try:
+                self._checked_at = time.monotonic()
+                if index_path(self.directory) != self.index.path:
+                    self.index = LocalVectorIndex(self.directory)
+                    print(f"Local index reloaded from {self.index.path}")
+            except Exception as e:
+                print("Local index reload failed, keeping the loaded one:", e)
+            finally:
+                self._reload_lock.release()
+        return self.index
+
+    @staticmethod
+    def _to_documents(index, rows):
+        from langchain_core.documents import Document
+
+        return [
+            Document(page_content=index.records[row]["text"], metadata=index.records[row]["metadata"])
+            for row in rows
+        ]
+
+    def similarity_search(self, query: str, k: int = 4):
+        index = self._current_index()
+        rows, _ = index.search(self.embedding.embed_query(query), k)
+        return self._to_documents(index, rows)
+
+    def max_marginal_relevance_search(self, query: str, k: int = 4, fetch_k: int = 20, lambda_mult: float = 0.5):
+        index = self._current_index()
+        rows = index.mmr_search(self.embedding.embed_query(query), k, fetch_k, lambda_mult)
+        return self._to_documents(index, rows)
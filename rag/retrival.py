@@ -97,13 +97,17 @@
 
 
 
+import asyncio
+import collections
 import os
-import re
+import threading
+import time
 from dotenv import load_dotenv
-from langchain_huggingface.embeddings import HuggingFaceEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from groq import Groq
+
+from rag.index_version import qdrant_index_version, set_index_version_source
+
+# langchain, sentence-transformers, qdrant and groq are imported on first
+# use (or during warm-up) so importing this module stays cheap
 
 load_dotenv()
 
@@ -114,116 +118,378 @@ GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY_CLOUD")
 COLLECTION_NAME = "cancer_rag"
+# qdrant (remote collection) | local (in-process index from rag/local_index.py)
+RAG_BACKEND = os.getenv("RAG_BACKEND", "qdrant")
+# dense (MMR over embeddings) | hybrid (BM25 + dense, reciprocal rank fusion)
+RAG_RETRIEVAL = os.getenv("RAG_RETRIEVAL", "dense")
+HYBRID_CACHE_SIZE = int(os.getenv("HYBRID_CACHE_SIZE", "1024"))
 MODEL_ID = "llama-3.1-8b-instant"
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "10"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))
+EMBED_CACHE_MAX_MB = float(os.getenv("EMBED_CACHE_MAX_MB", "32"))
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH")  # e.g. rag/cache/query_embeddings
 
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY not set")
 
-if not QDRANT_URL:
+if RAG_BACKEND == "qdrant" and not QDRANT_URL:
     raise ValueError("QDRANT_URL not set")
 
 # ----------------------------------------------------
 #           INITIALIZE GROQ CLIENT
 # ----------------------------------------------------
-client = Groq(api_key=GROQ_API_KEY)
+_client = None
+_async_client = None
+
+
+def get_groq_client():
+    global _client
+    if _client is None:
+        from groq import Groq
+        _client = Groq(api_key=GROQ_API_KEY)
+    return _client
+
+
+def get_async_groq_client():
+    global _async_client
+    if _async_client is None:
+        from groq import AsyncGroq
+        _async_client = AsyncGroq(api_key=GROQ_API_KEY)
+    return _async_client
 
 # ----------------------------------------------------
 #      LAZY LOAD VECTOR DB (Railway Safe)
 # ----------------------------------------------------
+# Built once per process and shared by every request: loading the
+# MiniLM weights and opening a Qdrant connection pool are far too
+# expensive to repeat per query.
+_vector_store = None
+_embedding_model = None
+_vector_store_lock = threading.Lock()
+
+_retriever_stats = {
+    "ready": False,
+    "loads": 0,
+    "load_failures": 0,
+    "reuses": 0,
+    "embedding_load_seconds": None,
+    "vector_store_load_seconds": None,
+    "last_error": None,
+}
+
+
+def get_embedding_model():
+    global _embedding_model
+    if _embedding_model is None:
+        with _vector_store_lock:
+            if _embedding_model is None:
+                from langchain_huggingface.embeddings import HuggingFaceEmbeddings
+                from rag.embedding_cache import CachedEmbeddings
+
+                start = time.perf_counter()
+                # MiniLM is uncased, so the cache can key on lowercased text
+                _embedding_model = CachedEmbeddings(
+                    HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL_NAME),
+                    max_bytes=int(EMBED_CACHE_MAX_MB * 1024 * 1024),
+                    path=EMBED_CACHE_PATH,
+                )
+                _retriever_stats["embedding_load_seconds"] = round(time.perf_counter() - start, 3)
+    return _embedding_model
+
+
+def _load_qdrant_store(embedding_model):
+    import httpx
+    from langchain_qdrant import QdrantVectorStore
+    from qdrant_client import QdrantClient
+
+    # One client per process; httpx keeps the connections alive
+    qdrant_client = QdrantClient(
+        url=QDRANT_URL,
+        api_key=QDRANT_API_KEY,
+        timeout=QDRANT_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=QDRANT_POOL_SIZE,
+            max_keepalive_connections=QDRANT_POOL_SIZE,
+        ),
+    )
+
+    store = QdrantVectorStore.from_existing_collection(
+        client=qdrant_client,
+        collection_name=COLLECTION_NAME,
+        embedding=embedding_model,
+    )
+    set_index_version_source(lambda: qdrant_index_version(qdrant_client, COLLECTION_NAME))
+    return store
+
+
+def _load_local_store(embedding_model):
+    from rag.local_index import LOCAL_INDEX_DIR, LocalVectorStore, read_index_version
+
+    # Built by `python -m rag.indexing --backend local`
+    set_index_version_source(lambda: read_index_version(LOCAL_INDEX_DIR))
+    return LocalVectorStore(LOCAL_INDEX_DIR, embedding_model)
+
+
 def get_vector_store():
-    try:
-        embedding_model = HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2"
-        )
+    global _vector_store
+    if _vector_store is not None:
+        _retriever_stats["reuses"] += 1
+        return _vector_store
 
-        qdrant_client = QdrantClient(
-            url=QDRANT_URL,
-            api_key=QDRANT_API_KEY,
-        )
+    embedding_model = get_embedding_model()
 
-        return QdrantVectorStore.from_existing_collection(
-            client=qdrant_client,
-            collection_name=COLLECTION_NAME,
-            embedding=embedding_model,
-        )
+    with _vector_store_lock:
+        if _vector_store is not None:
+            return _vector_store
+
+        try:
+            start = time.perf_counter()
+            if RAG_BACKEND == "local":
+                _vector_store = _load_local_store(embedding_model)
+            else:
+                _vector_store = _load_qdrant_store(embedding_model)
+
+            _retriever_stats["vector_store_load_seconds"] = round(time.perf_counter() - start, 3)
+            _retriever_stats["loads"] += 1
+            _retriever_stats["ready"] = True
+            _retriever_stats["last_error"] = None
+            return _vector_store
+
+        except Exception as e:
+            _retriever_stats["load_failures"] += 1
+            _retriever_stats["last_error"] = str(e)
+            print(f"Vector store ({RAG_BACKEND}) load failed:", e)
+            return None
+
+
+_hybrid = None
 
+
+def _load_chunks(vector_store):
+    """Yields (text, metadata) for every indexed chunk, for the BM25 index."""
+    if RAG_BACKEND == "local":
+        for record in vector_store.index.records:
+            yield record["text"], record["metadata"]
+        return
+
+    # One paged scan of the collection per index version, never per query
+    offset = None
+    while True:
+        points, offset = vector_store.client.scroll(
+            COLLECTION_NAME, limit=256, offset=offset, with_payload=True, with_vectors=False
+        )
+        for point in points:
+            yield point.payload.get("page_content", ""), point.payload.get("metadata", {})
+        if offset is None:
+            break
+
+
+def get_hybrid_retriever():
+    global _hybrid
+    if _hybrid is None:
+        vector_store = get_vector_store()
+        if vector_store is None:
+            return None
+        with _vector_store_lock:
+            if _hybrid is None:
+                from rag.hybrid import HybridRetriever
+
+                _hybrid = HybridRetriever(
+                    vector_store,
+                    lambda: _load_chunks(vector_store),
+                    k=5,
+                    fetch_k=20,
+                    cache_size=HYBRID_CACHE_SIZE,
+                )
+    return _hybrid
+
+
+def warm_up():
+    """Load the embedding model and open the vector store ahead of the first query."""
+    try:
+        get_async_groq_client()
+        get_vector_store()
+        get_embedding_model().embedder.embed_query("warm up")
+        # The first count would otherwise fetch the tokenizer inside a request
+        from rag.context_builder import count_tokens
+        count_tokens("warm up")
+        if RAG_RETRIEVAL == "hybrid" and get_hybrid_retriever() is not None:
+            get_hybrid_retriever().ensure_index()
     except Exception as e:
-        print("Qdrant connection failed:", e)
-        return None
+        _retriever_stats["last_error"] = str(e)
+        print("RAG warm-up failed:", e)
+        raise
 
-# ----------------------------------------------------
-#         INTENT DETECTOR
-# ----------------------------------------------------
-def is_diagnostic_query(query: str):
-    q = query.lower()
-    patterns = [
-        r"malignant vs benign", r"mimicker", r"imaging features",
-        r"biomarker ratio", r"risk weightage", r"granuloma",
-        r"nodule", r"tuberculosis", r"sarcoidosis",
-        r"report", r"test", r"results", r"explain"
-    ]
-    return any(re.search(p, q) for p in patterns)
 
-def build_medical_context(docs):
-    seen = set()
-    chunks = []
+def shutdown():
+    if _embedding_model is not None:
+        _embedding_model.flush()
+
 
-    for doc in docs:
-        content = doc.page_content.strip()
-        if content not in seen:
-            seen.add(content)
-            source = doc.metadata.get("source", "Medical Journal")
-            chunks.append(f"Source [{source}]: {content}")
+def get_retriever_stats():
+    stats = dict(_retriever_stats)
+    stats["backend"] = RAG_BACKEND
+    stats["retrieval"] = RAG_RETRIEVAL
+    if _embedding_model is not None:
+        stats["embedding_cache"] = _embedding_model.stats()
+    if _hybrid is not None:
+        stats["hybrid"] = _hybrid.stats()
+    stats["prompt"] = get_prompt_stats()
+    return stats
 
-    return "\n\n".join(chunks)
+
+# ----------------------------------------------------
+#        PROMPT TOKEN STATS
+# ----------------------------------------------------
+_prompt_stats = collections.deque(maxlen=500)
+
+
+def _record_prompt(messages, context_stats, groq_prompt_tokens=None):
+    from rag.context_builder import count_tokens
+
+    record = dict(context_stats)
+    record["prompt_tokens"] = sum(count_tokens(m["content"]) for m in messages)
+    if groq_prompt_tokens is not None:
+        record["groq_prompt_tokens"] = groq_prompt_tokens
+    _prompt_stats.append(record)
+
+
+def get_prompt_stats():
+    records = list(_prompt_stats)
+    if not records:
+        return {"requests": 0}
+    from rag.context_builder import tokenizer_name
+
+    prompt_tokens = sorted(r["prompt_tokens"] for r in records)
+    return {
+        "requests": len(records),
+        "tokenizer": tokenizer_name(),
+        "prompt_tokens_avg": round(sum(prompt_tokens) / len(records), 1),
+        "prompt_tokens_p50": prompt_tokens[len(records) // 2],
+        "prompt_tokens_max": prompt_tokens[-1],
+        "context_tokens_avg": round(sum(r["context_tokens"] for r in records) / len(records), 1),
+        "near_duplicates_dropped": sum(r["near_duplicates_dropped"] for r in records),
+        "truncated": sum(r["truncated"] for r in records),
+        "recent": records[-5:],
+    }
 
 # ----------------------------------------------------
 #        MAIN DIAGNOSTIC FUNCTION
 # ----------------------------------------------------
-def analyze_cancer_case(user_query: str, vision_score=None):
+SYSTEM_PROMPT = "You are a specialist in early cancer detection and radiology."
+
+# Built once; only the per-request fields are filled in
+PROMPT_TEMPLATE = """
+You are an empathetic, expert Clinical Assistant.
+
+Clinical Research Context (From Internal RAG DB):
+{context}
+
+{vision_block}
+
+User Query: {user_query}
+
+Instructions:
+1. Provide a conversational, highly concise, and relevant answer based on the context above.
+2. DO NOT output heavily formatted, cluttered markdown with rigid structural headers (like "1. Clinical Summary 2. Diagnostic Analysis") unless explicitly asked to generate a full formal report.
+3. If the user's query lacks context (for example, "Explain my report" but no text is provided), immediately stop and ask 1 or 2 specific clarifying questions to understand their situation better before jumping to conclusions.
+4. Keep the tone helpful, human-like, and professional.
+"""
+
+
+def retrieve_context(user_query: str):
+    """Returns (context, stats): retrieved chunks merged, deduplicated and fitted to the token budget."""
+    from rag.context_builder import build_context
 
     vector_db = get_vector_store()
 
-    context = ""
+    context, stats = "", build_context([])[1]
     if vector_db:
         try:
-            docs = vector_db.max_marginal_relevance_search(
-                user_query, k=5, fetch_k=20
-            )
-            context = build_medical_context(docs)
+            if RAG_RETRIEVAL == "hybrid":
+                docs = get_hybrid_retriever().search(user_query)
+            else:
+                docs = vector_db.max_marginal_relevance_search(
+                    user_query, k=5, fetch_k=20
+                )
+            context, stats = build_context(docs)
         except Exception as e:
             print("RAG retrieval failed:", e)
 
+    return context, stats
+
+
+def build_prompt(user_query: str, context: str, vision_score=None):
     vision_block = ""
     if vision_score:
         vision_block = f"Teachable Machine Vision Score: {vision_score} (Probability of Malignancy)"
 
+    final_prompt = PROMPT_TEMPLATE.format(
+        context=context if context else "No distinct external RAG context available for this.",
+        vision_block=vision_block,
+        user_query=user_query,
+    )
 
-    final_prompt = f"""
-You are an empathetic, expert Clinical Assistant.
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": final_prompt},
+    ]
 
-Clinical Research Context (From Internal RAG DB):
-{context if context else "No distinct external RAG context available for this."}
 
-{vision_block}
+def analyze_cancer_case(user_query: str, vision_score=None):
 
-User Query: {user_query}
+    context, context_stats = retrieve_context(user_query)
+    messages = build_prompt(user_query, context, vision_score)
+
+    chat = get_groq_client().chat.completions.create(
+        messages=messages,
+        model=MODEL_ID,
+        max_tokens=1000,
+        temperature=0.15
+    )
+
+    _record_prompt(messages, context_stats, getattr(chat.usage, "prompt_tokens", None))
+    return chat.choices[0].message.content
 
-Instructions:
-1. Provide a conversational, highly concise, and relevant answer based on the context above.
-2. DO NOT output heavily formatted, cluttered markdown with rigid structural headers (like "1. Clinical Summary 2. Diagnostic Analysis") unless explicitly asked to generate a full formal report.
-3. If the user's query lacks context (for example, "Explain my report" but no text is provided), immediately stop and ask 1 or 2 specific clarifying questions to understand their situation better before jumping to conclusions.
-4. Keep the tone helpful, human-like, and professional.
-"""
 
-    chat = client.chat.completions.create(
-        messages=[
-            {"role": "system", "content": "You are a specialist in early cancer detection and radiology."},
-            {"role": "user", "content": final_prompt},
-        ],
+async def analyze_cancer_case_async(user_query: str, vision_score=None):
+    """
+    Async variant for the event loop: retrieval (CPU embedding + Qdrant) runs
+    in a worker thread, the Groq call is awaited on the async client.
+    """
+
+    context, context_stats = await asyncio.to_thread(retrieve_context, user_query)
+    messages = build_prompt(user_query, context, vision_score)
+
+    chat = await get_async_groq_client().chat.completions.create(
+        messages=messages,
         model=MODEL_ID,
         max_tokens=1000,
         temperature=0.15
     )
 
-    return chat.choices[0].message.content
\ No newline at end of file
+    await asyncio.to_thread(_record_prompt, messages, context_stats, getattr(chat.usage, "prompt_tokens", None))
+    return chat.choices[0].message.content
+
+
+async def stream_cancer_case(user_query: str, vision_score=None):
+    """
+    Same as analyze_cancer_case_async, but yields the completion token by token.
+    """
+
+    context, context_stats = await asyncio.to_thread(retrieve_context, user_query)
+    messages = build_prompt(user_query, context, vision_score)
+    await asyncio.to_thread(_record_prompt, messages, context_stats)
+
+    stream = await get_async_groq_client().chat.completions.create(
+        messages=messages,
+        model=MODEL_ID,
+        max_tokens=1000,
+        temperature=0.15,
+        stream=True
+    )
+
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
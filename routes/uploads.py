@@ -1,35 +1,29 @@
 # routes/upload.py
 
 import os
-import shutil
-from pathlib import Path
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks
-from supabase import create_client
+from fastapi import APIRouter, Request, UploadFile, File, HTTPException, Depends
 from dotenv import load_dotenv
 
-from services.ai_analysis import analyze_and_update
+from services.db import db
+from services.job_queue import job_queue
+from services import content_store
+from services.content_store import FileTooLargeError
 from auth.auth import verify_token  # your existing auth
 from agents.summarizer import summarize_medical_text
 from utils.extractor import extract_text_from_pdf
-from agents.medgemma import run_medgemma_inference
+from agents.medgemma import run_medgemma_inference, QueueFullError
 
 load_dotenv()
 
 router = APIRouter()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-UPLOAD_DIR = "uploads"
 MAX_FILE_SIZE = 10 * 1024 * 1024
 ALLOWED_TYPES = ["application/pdf", "image/jpeg", "image/png"]
 
 
 @router.post("/upload")
 async def upload_report(
-    background_tasks: BackgroundTasks,
+    request: Request,
     file: UploadFile = File(...),
     user: dict = Depends(verify_token)
 ):
@@ -38,38 +32,48 @@ async def upload_report(
         if file.content_type not in ALLOWED_TYPES:
             raise HTTPException(status_code=400, detail="Invalid file type")
 
-        # Validate size
-        file.file.seek(0, 2)
-        size = file.file.tell()
-        file.file.seek(0)
-
-        if size > MAX_FILE_SIZE:
+        # Reject obviously oversized bodies before reading anything
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > MAX_FILE_SIZE + 64 * 1024:
             raise HTTPException(status_code=400, detail="File too large")
 
-        # Create folder
-        Path(UPLOAD_DIR).mkdir(exist_ok=True)
-
-        safe_name = file.filename.replace(" ", "_")
-        file_path = os.path.join(UPLOAD_DIR, f"{user['id']}_{safe_name}")
+        # Stream to the content-addressed store, hashing and size-checking per chunk
+        try:
+            file_path, content_hash, _ = await content_store.save_upload(file, MAX_FILE_SIZE)
+        except FileTooLargeError:
+            raise HTTPException(status_code=400, detail="File too large")
 
-        # Save file
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # Same bytes analyzed before: skip extraction, MedGemma and summarization
+        cached_summary = content_store.get_result(content_hash)
 
         if user["id"] == "mock_test_id_123":
             # Testing mock response without inserting into database
-            
+            if cached_summary is not None:
+                return {
+                    "message": "Report uploaded successfully.",
+                    "report_id": 999,
+                    "status": "analyzed",
+                    "summary": cached_summary,
+                    "abnormalMarkers": ["Detected via OCR pipeline if applicable"]
+                }
+
             raw_text = ""
             try:
                 if file.content_type == "application/pdf":
                     raw_text = extract_text_from_pdf(file_path)
                 elif file.content_type in ["image/jpeg", "image/png"]:
                     raw_text = run_medgemma_inference("Extract all visible clinical text and values exactly as written in this report.", file_path)
+            except QueueFullError:
+                raise
             except Exception as parse_e:
                 raw_text = f"Could not parse file: {str(parse_e)}"
             
             # 2. Use facebook/bart-large-cnn summarizer to digest the text
             final_summary = summarize_medical_text(raw_text) if raw_text.strip() else "File appeared empty or unreadable."
+            parsed = raw_text.strip() and not raw_text.startswith(("Could not parse file", "MedGemma inference error"))
+            # Same check as services/ai_analysis.py: never cache a summarizer failure
+            if parsed and not final_summary.startswith(("Summarization failed", "BART Summarization")):
+                content_store.save_result(content_hash, final_summary)
 
             return {
                 "message": "Report uploaded successfully.",
@@ -79,22 +83,46 @@ async def upload_report(
                 "abnormalMarkers": ["Detected via OCR pipeline if applicable"]
             }
 
+        if cached_summary is not None:
+            report = await db.aexecute("reports", lambda t: t.insert({
+                "user_id": user["id"],
+                "role": user["role"],
+                "file_path": file_path,
+                "status": "analyzed",
+                "ai_result": cached_summary
+            }))
+            report_id = report.data[0]["id"]
+
+            # No analysis runs, but /reports/{id}/status still finds a finished job
+            job_queue.record_completed(
+                "pdf" if file.content_type == "application/pdf" else "image",
+                {"report_id": report_id, "file_path": file_path, "role": user["role"], "user_id": user["id"],
+                 "content_hash": content_hash, "deduplicated": True},
+                key=str(report_id)
+            )
+
+            return {
+                "message": "Report uploaded. Identical report already analyzed.",
+                "report_id": report_id,
+                "status": "analyzed"
+            }
+
         # Insert DB record
-        report = supabase.table("reports").insert({
+        report = await db.aexecute("reports", lambda t: t.insert({
             "user_id": user["id"],
             "role": user["role"],  # patient or doctor
             "file_path": file_path,
             "status": "processing"
-        }).execute()
+        }))
 
         report_id = report.data[0]["id"]
 
-        # 🔥 Run AI in background
-        background_tasks.add_task(
-            analyze_and_update,
-            report_id,
-            file_path,
-            user["role"]
+        # 🔥 Run AI in the durable job queue (services/job_worker.py)
+        job_queue.enqueue(
+            "pdf" if file.content_type == "application/pdf" else "image",
+            {"report_id": report_id, "file_path": file_path, "role": user["role"], "user_id": user["id"],
+             "content_hash": content_hash},
+            key=str(report_id)
         )
 
         return {
@@ -103,5 +131,34 @@ async def upload_report(
             "status": "processing"
         }
 
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/reports/{report_id}/status")
+def report_status(report_id: str, user: dict = Depends(verify_token)):
+    job = job_queue.get_by_key(report_id)
+    if job is None or job["payload"].get("user_id") != user["id"]:
+        raise HTTPException(status_code=404, detail="Report not found")
+
+    status = job["status"]
+    if status == "queued" and job["attempts"]:
+        status = "retrying"
+
+    return {
+        "report_id": report_id,
+        "status": status,
+        "job_type": job["type"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "queue_position": job_queue.queue_position(job),
+        "next_attempt_at": job["run_after"] if status == "retrying" else None,
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "error": job["error"],
+    }
@@ -1,45 +1,75 @@
 # services/ai_analysis.py
 
-from supabase import create_client
 from utils.extractor import extract_text_from_pdf
 from agents.summarizer import summarize_medical_text
 from agents.medgemma import run_medgemma_inference
+from services import content_store
+from services.write_buffer import write_buffer, WRITE_BUFFER_ENABLED
+from services.db import db
 
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+def update_report(report_id, fields: dict):
+    if WRITE_BUFFER_ENABLED:
+        write_buffer.update_report(report_id, fields)
+    else:
+        db.execute("reports", lambda t: t.update(fields).eq("id", report_id))
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
 
+def analyze_report(report_id: str, file_path: str, role: str, content_hash: str = None):
+    """Extracts, summarizes and stores a report. Raises on failure so the job can be retried."""
+    # An identical upload may have finished while this job waited in the queue
+    cached_summary = content_store.get_result(content_hash)
+    if cached_summary is not None:
+        update_report(report_id, {
+            "status": "analyzed",
+            "ai_result": cached_summary
+        })
+        return
 
-async def analyze_and_update(report_id: str, file_path: str, role: str):
-    try:
-        # 1️⃣ Extract text from report
-        raw_text = ""
-        if file_path.endswith('.pdf'):
-            raw_text = extract_text_from_pdf(file_path)
-        else:
-            raw_text = run_medgemma_inference("Extract all visible clinical text and values exactly as written in this report.", f"file:///{os.path.abspath(file_path)}")
+    # 1️⃣ Extract text from report
+    raw_text = ""
+    if file_path.endswith('.pdf'):
+        raw_text = extract_text_from_pdf(file_path)
+    else:
+        # Background job: wait for room in the MedGemma queue instead of failing fast
+        raw_text = run_medgemma_inference("Extract all visible clinical text and values exactly as written in this report.", f"file:///{os.path.abspath(file_path)}", block=True)
+        if raw_text.startswith("MedGemma inference error"):
+            # run_medgemma_inference reports model errors as text
+            raise RuntimeError(raw_text)
 
-        # 2️⃣ Run facebook/bart-large-cnn
-        summary_result = "No readable text found."
-        if raw_text and raw_text.strip():
-             summary_result = summarize_medical_text(raw_text)
+    # 2️⃣ Run facebook/bart-large-cnn
+    summary_result = "No readable text found."
+    if raw_text and raw_text.strip():
+         summary_result = summarize_medical_text(raw_text)
 
-        response = summary_result
+    response = summary_result
+    if not response.startswith(("Summarization failed", "BART Summarization")):
+        content_store.save_result(content_hash, response)
 
-        # 4️⃣ Update DB
-        supabase.table("reports").update({
-            "status": "analyzed",
-            "ai_result": response
-        }).eq("id", report_id).execute()
-
-    except Exception as e:
-        supabase.table("reports").update({
-            "status": "failed",
-            "ai_result": str(e)
-        }).eq("id", report_id).execute()
\ No newline at end of file
+    # 4️⃣ Update DB
+    update_report(report_id, {
+        "status": "analyzed",
+        "ai_result": response
+    })
+
+
+def mark_report_failed(report_id: str, error: str):
+    update_report(report_id, {
+        "status": "failed",
+        "ai_result": error
+    })
+
+
+# ----------------------------------------------------
+#   JOB QUEUE HANDLERS (see services/job_worker.py)
+# ----------------------------------------------------
+def run_report_job(payload: dict):
+    analyze_report(payload["report_id"], payload["file_path"], payload["role"], payload.get("content_hash"))
+
+
+def fail_report_job(payload: dict, error: str):
+    mark_report_failed(payload["report_id"], error)
\ No newline at end of file
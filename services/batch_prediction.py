@@ -0,0 +1,120 @@
+# services/batch_prediction.py
+
+import csv
+import io
+import json
+
+import numpy as np
+
+from agents.ml_model import FEATURE_COLUMNS, predict_cancer_batch
+
+# Accept both the API field names (CancerInput) and the original dataset headers
+COLUMN_ALIASES = {
+    "Diagnosis_Age": "Diagnosis Age",
+    "Mutation_Count": "Mutation Count",
+    "Number_of_Samples_Per_Patient": "Number of Samples Per Patient",
+    "TMB_nonsynonymous": "TMB (nonsynonymous)",
+}
+
+ARROW_TYPES = (
+    "application/vnd.apache.arrow.file",
+    "application/vnd.apache.arrow.stream",
+)
+
+PREDICT_CHUNK_ROWS = 10_000
+
+
+class BatchInputError(ValueError):
+    """Raised for malformed batch input (maps to HTTP 400)."""
+
+
+def _canonical(name: str) -> str:
+    name = name.strip()
+    return COLUMN_ALIASES.get(name, name)
+
+
+def _check_columns(columns: dict):
+    missing = [name for name in FEATURE_COLUMNS if name not in columns]
+    if missing:
+        raise BatchInputError(f"Missing columns: {', '.join(missing)}")
+    return {name: columns[name] for name in FEATURE_COLUMNS}
+
+
+def columns_from_records(records):
+    if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+        raise BatchInputError("Expected a JSON array of patient records")
+    rows = [{_canonical(k): v for k, v in record.items()} for record in records]
+    try:
+        return {name: [row[name] for row in rows] for name in FEATURE_COLUMNS}
+    except KeyError as e:
+        raise BatchInputError(f"Missing column: {e.args[0]}")
+
+
+def columns_from_json(body: bytes):
+    try:
+        return columns_from_records(json.loads(body))
+    except json.JSONDecodeError as e:
+        raise BatchInputError(f"Invalid JSON: {e}")
+
+
+def columns_from_csv(body: bytes):
+    reader = csv.reader(io.StringIO(body.decode("utf-8-sig")))
+    try:
+        header = [_canonical(name) for name in next(reader)]
+    except StopIteration:
+        raise BatchInputError("Empty CSV")
+    rows = [row for row in reader if row]
+    if any(len(row) != len(header) for row in rows):
+        raise BatchInputError("Every CSV row must have one value per header column")
+    # Transpose rows into columns in one pass
+    values = list(zip(*rows)) or [()] * len(header)
+    return _check_columns(dict(zip(header, values)))
+
+
+def columns_from_arrow(body: bytes):
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise BatchInputError("Arrow uploads require pyarrow to be installed")
+    try:
+        try:
+            table = pa.ipc.open_file(pa.BufferReader(body)).read_all()
+        except pa.ArrowInvalid:
+            table = pa.ipc.open_stream(pa.BufferReader(body)).read_all()
+    except pa.ArrowInvalid as e:
+        raise BatchInputError(f"Invalid Arrow data: {e}")
+    columns = {_canonical(name): table.column(name).to_numpy(zero_copy_only=False) for name in table.column_names}
+    return _check_columns(columns)
+
+
+def parse_batch(body: bytes, content_type: str = "", filename: str = ""):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    filename = (filename or "").lower()
+
+    if content_type in ARROW_TYPES or filename.endswith((".arrow", ".feather", ".ipc")):
+        return columns_from_arrow(body)
+    if content_type in ("text/csv", "application/csv") or filename.endswith(".csv"):
+        return columns_from_csv(body)
+    return columns_from_json(body)
+
+
+def iter_ndjson_predictions(columns, chunk_rows: int = PREDICT_CHUNK_ROWS):
+    """Scores the batch chunk by chunk and yields one NDJSON line per patient."""
+    total = len(columns["Sex"])
+    for start in range(0, total, chunk_rows):
+        chunk = {name: values[start:start + chunk_rows] for name, values in columns.items()}
+        # Bad rows (unknown Sex, missing or non-numeric values) get their own error line
+        predictions, confidences, errors = predict_cancer_batch(chunk)
+
+        confidences = np.round(confidences, 2)
+        lines = []
+        for i in range(len(predictions)):
+            if errors[i] is None:
+                lines.append(json.dumps({
+                    "index": start + i,
+                    "prediction": predictions[i],
+                    "confidence": float(confidences[i])
+                }))
+            else:
+                lines.append(json.dumps({"index": start + i, "error": errors[i]}))
+        yield "\n".join(lines) + "\n"
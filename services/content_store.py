@@ -0,0 +1,101 @@
+# services/content_store.py
+
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONTENT_STORE_DIR = os.getenv("CONTENT_STORE_DIR", os.path.join("uploads", "objects"))
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+
+EXTENSIONS = {"application/pdf": ".pdf", "image/jpeg": ".jpg", "image/png": ".png"}
+
+
+class FileTooLargeError(Exception):
+    """Raised while streaming an upload once it passes the size limit."""
+
+
+def _pipeline_version() -> str:
+    # Cached analyses are only reused while the models that produced them are unchanged
+    return "|".join([
+        os.getenv("SUMMARIZER_MODEL_ID", "facebook/bart-large-cnn"),
+        os.getenv("MEDGEMMA_MODEL_ID", "google/medgemma-4b-it"),
+    ])
+
+
+def object_path(digest: str, content_type: str) -> str:
+    return os.path.join(CONTENT_STORE_DIR, digest[:2], digest + EXTENSIONS.get(content_type, ""))
+
+
+async def save_upload(upload, max_bytes: int):
+    """
+    Streams an UploadFile into the content-addressed store.
+
+    The file is read in UPLOAD_CHUNK_SIZE chunks, hashed and size-checked as
+    it is written, then renamed to `<sha256>.<ext>`. Identical content lands
+    on the same path, so a duplicate upload keeps the existing copy.
+    Returns (path, sha256, size).
+    """
+    os.makedirs(CONTENT_STORE_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+
+    fd, tmp_path = tempfile.mkstemp(dir=CONTENT_STORE_DIR, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise FileTooLargeError(f"File exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+
+        sha256 = digest.hexdigest()
+        path = object_path(sha256, upload.content_type)
+        if os.path.exists(path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp_path, path)
+        return path, sha256, size
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def _result_path(sha256: str) -> str:
+    return os.path.join(CONTENT_STORE_DIR, sha256[:2], sha256 + ".result.json")
+
+
+def get_result(sha256: str):
+    """Returns the cached analysis for this content, or None."""
+    if not sha256:
+        return None
+    try:
+        with open(_result_path(sha256)) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if record.get("pipeline") != _pipeline_version():
+        return None
+    return record["result"]
+
+
+def save_result(sha256: str, result: str):
+    if not sha256:
+        return
+    path = _result_path(sha256)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"result": result, "pipeline": _pipeline_version(), "created_at": time.time()}, f)
+    os.replace(tmp_path, path)
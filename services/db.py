@@ -0,0 +1,238 @@
+# services/db.py
+"""
+The one Supabase gateway every module goes through.
+
+A sync client (for threads: job workers, the write buffer, sync routes) and
+an async client (for async handlers) share the same settings: a keep-alive
+httpx pool sized by DB_POOL_*, and DB_TIMEOUT / DB_CONNECT_TIMEOUT on every
+request. Both are created on first use.
+
+Logins go through separate session-less auth clients on the same pools:
+signing a user in on the shared client would switch its Authorization
+header to that user's token for every later query.
+
+Queries are passed in as a function of the table builder, so the gateway
+can time them per table:
+
+    db.execute("reports", lambda t: t.update(fields).eq("id", report_id))
+    await db.aexecute("reports", lambda t: t.insert(row))
+"""
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_KEY")
+
+DB_POOL_MAX_CONNECTIONS = int(os.getenv("DB_POOL_MAX_CONNECTIONS", "20"))
+# Idle connections kept open; below max connections, bursts churn TCP/TLS handshakes
+DB_POOL_MAX_KEEPALIVE = int(os.getenv("DB_POOL_MAX_KEEPALIVE", str(DB_POOL_MAX_CONNECTIONS)))
+DB_POOL_KEEPALIVE_EXPIRY = float(os.getenv("DB_POOL_KEEPALIVE_EXPIRY", "60"))
+DB_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+DB_CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "3"))
+DB_HTTP2 = os.getenv("DB_HTTP2", "0") == "1"
+
+
+def is_row_error(error: Exception) -> bool:
+    """
+    True if PostgREST rejected the request itself (a 4xx: constraint
+    violation, invalid value, unknown column), so sending the same rows
+    again fails again. Connection errors, timeouts, auth and server-side
+    failures are False.
+    """
+    code = getattr(error, "code", None)
+    if code is None or not hasattr(error, "details"):
+        return False  # not a PostgREST APIError (httpx transport errors, timeouts)
+    code = str(code)
+    if code.isdigit() and len(code) == 3:
+        # HTTP status of a reply without a PostgREST body (e.g. a gateway error page)
+        return 400 <= int(code) < 500 and int(code) not in (401, 403, 408, 429)
+    if code.startswith("PGRST"):
+        # Group 1: malformed request, group 2: unknown table or column
+        return code[5:6] in ("1", "2")
+    # SQLSTATE: connection, transaction rollback, resources, operator intervention and system errors are transient
+    return code[:2] not in ("08", "40", "53", "55", "57", "58", "XX")
+
+
+class SupabaseGateway:
+    def __init__(self, url: str = SUPABASE_URL, key: str = SUPABASE_KEY):
+        self.url = url
+        self.key = key
+        self._client = None
+        self._auth = None
+        self._async_clients = {}  # event loop -> AsyncClient (httpx async pools are loop-bound)
+        self._async_auth = {}
+        self._lock = threading.Lock()
+        self._latencies = {}
+        self._calls = {}
+        self._errors = {}
+
+    # ----------------------------------------------------
+    #   CLIENTS
+    # ----------------------------------------------------
+    def _httpx_settings(self):
+        import httpx
+
+        return {
+            "limits": httpx.Limits(
+                max_connections=DB_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=DB_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=DB_POOL_KEEPALIVE_EXPIRY,
+            ),
+            "timeout": httpx.Timeout(DB_TIMEOUT, connect=DB_CONNECT_TIMEOUT),
+            "http2": DB_HTTP2,
+        }
+
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+                    from supabase import create_client, ClientOptions
+
+                    options = ClientOptions(httpx_client=httpx.Client(**self._httpx_settings()))
+                    self._client = create_client(self.url, self.key, options=options)
+        return self._client
+
+    async def aclient(self):
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            import httpx
+            from supabase import acreate_client, AsyncClientOptions
+
+            options = AsyncClientOptions(httpx_client=httpx.AsyncClient(**self._httpx_settings()))
+            client = await acreate_client(self.url, self.key, options=options)
+            # Another coroutine may have won the race; keep the first
+            client = self._async_clients.setdefault(loop, client)
+        return client
+
+    def _auth_settings(self):
+        return {
+            "url": f"{self.url.rstrip('/')}/auth/v1",
+            "headers": {"apikey": self.key, "Authorization": f"Bearer {self.key}"},
+            "auto_refresh_token": False,
+            "persist_session": False,
+        }
+
+    def auth_client(self):
+        if self._auth is None:
+            from supabase_auth import SyncGoTrueClient
+
+            http_client = self.client().options.httpx_client
+            with self._lock:
+                if self._auth is None:
+                    self._auth = SyncGoTrueClient(http_client=http_client, **self._auth_settings())
+        return self._auth
+
+    async def aauth_client(self):
+        loop = asyncio.get_running_loop()
+        auth = self._async_auth.get(loop)
+        if auth is None:
+            from supabase_auth import AsyncGoTrueClient
+
+            http_client = (await self.aclient()).options.httpx_client
+            auth = self._async_auth.setdefault(loop, AsyncGoTrueClient(http_client=http_client, **self._auth_settings()))
+        return auth
+
+    @property
+    def ready(self) -> bool:
+        return self._client is not None
+
+    # ----------------------------------------------------
+    #   QUERIES
+    # ----------------------------------------------------
+    def _record(self, table: str, seconds: float, failed: bool):
+        with self._lock:
+            self._latencies.setdefault(table, deque(maxlen=500)).append(seconds)
+            self._calls[table] = self._calls.get(table, 0) + 1
+            if failed:
+                self._errors[table] = self._errors.get(table, 0) + 1
+
+    def execute(self, table: str, build):
+        """Runs `build(client.table(table)).execute()` and returns the response."""
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = build(self.client().table(table)).execute()
+            failed = False
+            return response
+        finally:
+            self._record(table, time.perf_counter() - start, failed)
+
+    async def aexecute(self, table: str, build):
+        start = time.perf_counter()
+        failed = True
+        try:
+            client = await self.aclient()
+            response = await build(client.table(table)).execute()
+            failed = False
+            return response
+        finally:
+            self._record(table, time.perf_counter() - start, failed)
+
+    def sign_in(self, email: str, password: str):
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.auth_client().sign_in_with_password({"email": email, "password": password})
+            failed = False
+            return response
+        finally:
+            self._record("auth", time.perf_counter() - start, failed)
+
+    async def asign_in(self, email: str, password: str):
+        start = time.perf_counter()
+        failed = True
+        try:
+            auth = await self.aauth_client()
+            response = await auth.sign_in_with_password({"email": email, "password": password})
+            failed = False
+            return response
+        finally:
+            self._record("auth", time.perf_counter() - start, failed)
+
+    # ----------------------------------------------------
+    #   LIFECYCLE / METRICS
+    # ----------------------------------------------------
+    async def aclose(self):
+        loop = asyncio.get_running_loop()
+        self._async_auth.pop(loop, None)
+        client = self._async_clients.pop(loop, None)
+        if client is not None:
+            await client.options.httpx_client.aclose()
+
+    def close(self):
+        with self._lock:
+            client, self._client, self._auth = self._client, None, None
+        if client is not None:
+            client.options.httpx_client.close()
+
+    def stats(self):
+        with self._lock:
+            tables = {}
+            for table, recent in self._latencies.items():
+                latencies = sorted(recent)
+                tables[table] = {
+                    "calls": self._calls[table],
+                    "errors": self._errors.get(table, 0),
+                    "p50_ms": round(latencies[len(latencies) // 2] * 1000, 2),
+                    "p95_ms": round(latencies[int(len(latencies) * 0.95)] * 1000, 2),
+                    "max_ms": round(latencies[-1] * 1000, 2),
+                }
+        return {
+            "sync_client": self._client is not None,
+            "async_clients": len(self._async_clients),
+            "pool_max_connections": DB_POOL_MAX_CONNECTIONS,
+            "tables": tables,
+        }
+
+
+db = SupabaseGateway()
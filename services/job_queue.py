@@ -0,0 +1,250 @@
+# services/job_queue.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("data", "jobs.sqlite3"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", "5"))
+JOB_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_BACKOFF_MAX_SECONDS", "300"))
+# A running job's lease is renewed every JOB_HEARTBEAT_SECONDS; one not renewed
+# for JOB_LEASE_SECONDS belongs to a dead worker and counts as a failed attempt
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    type TEXT NOT NULL,
+    key TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    worker TEXT,
+    error TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (type, status, run_after);
+CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key);
+"""
+
+
+class JobQueue:
+    """
+    Durable job queue in a local SQLite file.
+
+    Jobs survive restarts and can be claimed from any number of processes:
+    `claim` atomically moves the oldest due job of a type to "running".
+    Failures are retried with exponential backoff until `max_attempts`.
+    Statuses: queued -> running -> done | failed (queued again on retry).
+    Running jobs hold a lease their worker renews with `heartbeat`; an
+    expired lease is handled like a failed attempt.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # Autocommit; multi-statement updates use explicit BEGIN IMMEDIATE
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+        return conn
+
+    def enqueue(self, job_type: str, payload: dict, key: str = None, max_attempts: int = JOB_MAX_ATTEMPTS) -> int:
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO jobs (type, key, payload, max_attempts, run_after, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (job_type, key, json.dumps(payload), max_attempts, now, now),
+        )
+        return cursor.lastrowid
+
+    def record_completed(self, job_type: str, payload: dict, key: str = None) -> int:
+        """Records a job that needed no work (e.g. a deduplicated upload) as already done."""
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO jobs (type, key, payload, status, max_attempts, run_after, created_at, started_at, "
+            "finished_at) VALUES (?, ?, ?, 'done', 0, ?, ?, ?, ?)",
+            (job_type, key, json.dumps(payload), now, now, now, now),
+        )
+        return cursor.lastrowid
+
+    def claim(self, job_type: str, worker: str):
+        """Returns the next due job of `job_type` (now running), or None."""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE type = ? AND status = 'queued' AND run_after <= ? ORDER BY id LIMIT 1",
+                (job_type, now),
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, heartbeat_at = ?, "
+                "worker = ? WHERE id = ?",
+                (now, now, worker, row["id"]),
+            )
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self._to_dict(job)
+
+    def heartbeat(self, job_id: int, worker: str) -> bool:
+        """Renews a running job's lease. Returns False if `worker` no longer holds it."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = 'running' AND worker = ?",
+            (time.time(), job_id, worker),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker: str) -> bool:
+        """Marks a running job done. Returns False if `worker` no longer holds its lease."""
+        cursor = self._connect().execute(
+            "UPDATE jobs SET status = 'done', finished_at = ?, error = NULL "
+            "WHERE id = ? AND status = 'running' AND worker = ?",
+            (time.time(), job_id, worker),
+        )
+        return cursor.rowcount == 1
+
+    def _record_failure(self, conn, job, error: str, now: float) -> bool:
+        final = job["attempts"] >= job["max_attempts"]
+        if final:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', finished_at = ?, error = ? WHERE id = ?",
+                (now, error, job["id"]),
+            )
+        else:
+            delay = min(JOB_BACKOFF_SECONDS * 2 ** (job["attempts"] - 1), JOB_BACKOFF_MAX_SECONDS)
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', run_after = ?, error = ? WHERE id = ?",
+                (now + delay, error, job["id"]),
+            )
+        return final
+
+    def fail(self, job_id: int, worker: str, error: str):
+        """
+        Records a failed attempt. Returns True if the job is out of retries,
+        False if it will be retried, and None if `worker` no longer holds its
+        lease (the job was already requeued or taken over).
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            job = conn.execute(
+                "SELECT id, attempts, max_attempts FROM jobs WHERE id = ? AND status = 'running' AND worker = ?",
+                (job_id, worker),
+            ).fetchone()
+            final = self._record_failure(conn, job, error, now) if job is not None else None
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return final
+
+    def requeue_stale(self, lease_seconds: float = JOB_LEASE_SECONDS):
+        """
+        Handles running jobs whose lease expired (their worker died) as failed
+        attempts: retried with backoff, or failed once out of attempts, so a
+        job that keeps killing its worker cannot loop forever.
+        Returns (number requeued, jobs that are now failed).
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stale = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'running' AND COALESCE(heartbeat_at, started_at) < ?",
+                (now - lease_seconds,),
+            ).fetchall()
+            failed = [self._to_dict(job) for job in stale if self._record_failure(conn, job, "worker lost", now)]
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return len(stale) - len(failed), failed
+
+    def get(self, job_id: int):
+        row = self._connect().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row else None
+
+    def get_by_key(self, key: str):
+        row = self._connect().execute(
+            "SELECT * FROM jobs WHERE key = ? ORDER BY id DESC LIMIT 1", (key,)
+        ).fetchone()
+        return self._to_dict(row) if row else None
+
+    def queue_position(self, job: dict):
+        if job["status"] != "queued":
+            return None
+        row = self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE type = ? AND status = 'queued' AND id < ?",
+            (job["type"], job["id"]),
+        ).fetchone()
+        return row[0]
+
+    def stats(self, window_seconds: float = 300):
+        conn = self._connect()
+        since = time.time() - window_seconds
+        stats = {}
+        for row in conn.execute("SELECT type, status, COUNT(*) AS n FROM jobs GROUP BY type, status"):
+            stats.setdefault(row["type"], {})[row["status"]] = row["n"]
+
+        for row in conn.execute(
+            "SELECT type, COUNT(*) AS n, AVG(finished_at - started_at) AS run_s, AVG(started_at - created_at) AS wait_s "
+            "FROM jobs WHERE status = 'done' AND attempts > 0 AND finished_at >= ? GROUP BY type",
+            (since,),
+        ):
+            stats.setdefault(row["type"], {}).update({
+                "completed_per_minute": round(row["n"] / (window_seconds / 60), 2),
+                # started_at is the last attempt, so wait includes retry backoff
+                "avg_run_seconds": round(row["run_s"], 3),
+                "avg_wait_seconds": round(row["wait_s"], 3),
+            })
+
+        for row in conn.execute(
+            "SELECT type, COUNT(*) AS n FROM jobs WHERE status = 'queued' AND attempts > 0 GROUP BY type"
+        ):
+            stats.setdefault(row["type"], {})["retrying"] = row["n"]
+        return stats
+
+    @staticmethod
+    def _to_dict(row):
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        return job
+
+
+# Singleton shared by the app and the workers
+job_queue = JobQueue()
@@ -0,0 +1,185 @@
+# services/job_worker.py
+"""
+Worker pool for the durable job queue.
+
+Run it next to the web process (see Procfile):
+
+    python -m services.job_worker
+
+JOB_WORKER_PROCESSES processes each run, per job type, as many runner
+threads as that type's concurrency allows. Runners only orchestrate: the
+heavy lifting happens in the MedGemma/summarizer model servers. When the
+web process hosts them (services/model_host.py) every worker sends its
+inference there; otherwise each worker process loads its own.
+"""
+
+import importlib
+import multiprocessing as mp
+import os
+import signal
+import sys
+import threading
+
+from dotenv import load_dotenv
+
+from services.job_queue import job_queue, JOB_HEARTBEAT_SECONDS
+from services.model_host import use_model_host, MODEL_HOST_ADDRESS, MODEL_HOST_AUTHKEY
+from services.write_buffer import write_buffer, WRITE_BUFFER_ENABLED
+
+load_dotenv()
+
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "1"))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+
+# type -> handler(payload), on_failure(payload, error) once retries are exhausted, concurrency
+JOB_TYPES = {
+    "pdf": {
+        "handler": "services.ai_analysis:run_report_job",
+        "on_failure": "services.ai_analysis:fail_report_job",
+        "concurrency": int(os.getenv("JOB_CONCURRENCY_PDF", "2")),
+    },
+    "image": {
+        "handler": "services.ai_analysis:run_report_job",
+        "on_failure": "services.ai_analysis:fail_report_job",
+        "concurrency": int(os.getenv("JOB_CONCURRENCY_IMAGE", "1")),
+    },
+}
+
+
+def _resolve(path: str):
+    module_name, attr = path.split(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def _run_failure_hook(job_type: str, job: dict, error: str):
+    try:
+        _resolve(JOB_TYPES[job_type]["on_failure"])(job["payload"], error)
+    except Exception as hook_error:
+        print(f"Failure hook for job {job['id']} raised:", hook_error)
+
+
+def _keep_lease(job: dict, done: threading.Event):
+    # Renews the lease while the handler runs, so a slow job is not taken for a dead one
+    while not done.wait(JOB_HEARTBEAT_SECONDS):
+        try:
+            if not job_queue.heartbeat(job["id"], job["worker"]):
+                print(f"Job {job['id']}: lease lost while running")
+                return
+        except Exception as e:
+            print(f"Job {job['id']}: lease renewal failed:", e)
+
+
+def _run_one(job_type: str, job: dict):
+    config = JOB_TYPES[job_type]
+    done = threading.Event()
+    threading.Thread(target=_keep_lease, args=(job, done), name=f"lease-{job['id']}", daemon=True).start()
+    try:
+        _resolve(config["handler"])(job["payload"])
+        if not job_queue.complete(job["id"], job["worker"]):
+            print(f"Job {job['id']} ({job_type}) finished after its lease was lost; leaving it to its new owner")
+    except Exception as e:
+        final = job_queue.fail(job["id"], job["worker"], str(e))
+        if final is None:
+            print(f"Job {job['id']} ({job_type}) failed after its lease was lost; leaving it to its new owner:", e)
+        elif final:
+            print(f"Job {job['id']} ({job_type}) failed after {job['attempts']} attempts:", e)
+            _run_failure_hook(job_type, job, str(e))
+        else:
+            print(f"Job {job['id']} ({job_type}) attempt {job['attempts']} failed, retrying:", e)
+    finally:
+        done.set()
+
+
+def _runner(job_type: str, name: str, stop: threading.Event):
+    while not stop.is_set():
+        try:
+            job = job_queue.claim(job_type, name)
+        except Exception as e:
+            print(f"{name}: claim failed:", e)
+            job = None
+        if job is None:
+            stop.wait(JOB_POLL_INTERVAL)
+            continue
+        _run_one(job_type, job)
+
+
+def _shutdown_models():
+    for module_name in ("agents.medgemma", "agents.summarizer"):
+        module = sys.modules.get(module_name)
+        if module is not None:
+            module.shutdown()
+    if "utils.extractor" in sys.modules:
+        sys.modules["utils.extractor"].shutdown_pool()
+
+
+def run_worker(index: int = 0, stop: threading.Event = None, model_host=None):
+    """
+    Runs the runner threads of one worker process until `stop` is set.
+    `model_host` is the (address, authkey) of the process owning the models.
+    """
+    stop = stop or threading.Event()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    if model_host is None and MODEL_HOST_ADDRESS:
+        model_host = (MODEL_HOST_ADDRESS, MODEL_HOST_AUTHKEY)
+    if model_host is not None:
+        use_model_host(*model_host)
+    if WRITE_BUFFER_ENABLED:
+        write_buffer.start()
+
+    threads = []
+    for job_type, config in JOB_TYPES.items():
+        for i in range(config["concurrency"]):
+            name = f"job-worker-{index}-{job_type}-{i}"
+            thread = threading.Thread(target=_runner, args=(job_type, name, stop), name=name, daemon=True)
+            thread.start()
+            threads.append(thread)
+
+    try:
+        while not stop.is_set():
+            requeued, failed = job_queue.requeue_stale()
+            if requeued:
+                print(f"Requeued {requeued} jobs left running by a dead worker.")
+            for job in failed:
+                print(f"Job {job['id']} ({job['type']}) lost its worker on every attempt, giving up.")
+                _run_failure_hook(job["type"], job, "worker lost")
+            stop.wait(60)
+    except KeyboardInterrupt:
+        stop.set()
+    for thread in threads:
+        thread.join()
+    # Report updates written by the last jobs are still in the buffer
+    write_buffer.shutdown()
+    _shutdown_models()
+
+
+def start_worker_pool(num_processes: int = JOB_WORKER_PROCESSES, model_host=None):
+    """Spawns the worker processes and returns them (used by the web app when embedded)."""
+    ctx = mp.get_context("spawn")
+    processes = []
+    for i in range(num_processes):
+        process = ctx.Process(target=run_worker, args=(i, None, model_host), name=f"job-worker-{i}", daemon=False)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def stop_worker_pool(processes, timeout: float = 30):
+    for process in processes:
+        process.terminate()  # SIGTERM: runners finish their current job
+    for process in processes:
+        process.join(timeout=timeout)
+        if process.is_alive():
+            process.kill()
+
+
+if __name__ == "__main__":
+    if JOB_WORKER_PROCESSES <= 1:
+        run_worker()
+    else:
+        pool = start_worker_pool()
+        try:
+            for p in pool:
+                p.join()
+        except KeyboardInterrupt:
+            stop_worker_pool(pool)
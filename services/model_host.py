@@ -0,0 +1,182 @@
+# services/model_host.py
+"""
+One owner for the MedGemma and summarizer models.
+
+The web process owns the model servers (agents/model_server.py) and
+serves them on a local socket; job-worker processes swap their own
+servers for RemoteModelServer proxies, so a report job's inference is
+queued and batched alongside chat traffic instead of loading a second
+copy of every model. Remote (job) requests may hold at most
+MODEL_HOST_JOB_CAPACITY places in each model's queue at a time; the rest
+wait in the host, so a backlog of jobs never fills the queue chat needs.
+
+Embedded workers (JOB_WORKER_EMBEDDED=1) are handed the address and key
+when they are spawned. A separately deployed worker on the same machine
+uses the host when MODEL_HOST_ADDRESS ("host:port") and MODEL_HOST_AUTHKEY
+are set for both processes; without them it loads its own models.
+"""
+
+import os
+import secrets
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from multiprocessing.managers import BaseManager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MODEL_HOST_ADDRESS = os.getenv("MODEL_HOST_ADDRESS", "")
+MODEL_HOST_AUTHKEY = os.getenv("MODEL_HOST_AUTHKEY", "")
+# Concurrent remote calls per client process; each one waits on a queued request
+MODEL_HOST_CLIENT_THREADS = int(os.getenv("MODEL_HOST_CLIENT_THREADS", "32"))
+# Remote requests queued or running in one model server at a time
+MODEL_HOST_JOB_CAPACITY = int(os.getenv("MODEL_HOST_JOB_CAPACITY", "2"))
+
+MODEL_MODULES = {"medgemma": "agents.medgemma", "summarizer": "agents.summarizer"}
+
+
+def _server(name: str):
+    import importlib
+    return importlib.import_module(MODEL_MODULES[name]).server
+
+
+class _Models:
+    """Lives in the owning process; each remote call runs in its own server thread."""
+
+    def __init__(self, capacity: int = MODEL_HOST_JOB_CAPACITY):
+        self.capacity = capacity
+        self._slots = {}
+
+    def infer(self, name: str, payload):
+        slots = self._slots.setdefault(name, threading.BoundedSemaphore(self.capacity))
+        with slots:
+            future = _server(name).submit(payload, block=True)
+            try:
+                return future.result()
+            except BaseException:
+                future.cancel()
+                raise
+
+
+_models = _Models()
+
+
+def _get_models():
+    return _models
+
+
+class _ModelHostManager(BaseManager):
+    pass
+
+
+_ModelHostManager.register("models", callable=_get_models)
+
+
+def parse_address(address: str):
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
+
+
+# ----------------------------------------------------
+#   OWNER SIDE
+# ----------------------------------------------------
+_host = None
+
+
+def _serve_forever(server):
+    try:
+        server.serve_forever()
+    except SystemExit:
+        pass  # serve_forever ends with sys.exit(), meant for a dedicated process
+
+
+def serve(address: str = MODEL_HOST_ADDRESS, authkey: str = MODEL_HOST_AUTHKEY):
+    """
+    Starts serving this process's model servers. Returns (address, authkey)
+    for the clients; with no address a free localhost port and a random key
+    are used.
+    """
+    global _host
+    if _host is None:
+        key = (authkey or secrets.token_hex(16)).encode()
+        server = _ModelHostManager(
+            address=parse_address(address) if address else ("127.0.0.1", 0), authkey=key
+        ).get_server()
+        threading.Thread(target=_serve_forever, args=(server,), name="model-host", daemon=True).start()
+        host, port = server.address
+        _host = (server, f"{host}:{port}", key.decode())
+        print(f"Model host serving on {_host[1]}")
+    return _host[1], _host[2]
+
+
+def stop():
+    global _host
+    if _host is not None:
+        _host[0].stop_event.set()
+        _host[0].listener.close()
+        _host = None
+
+
+# ----------------------------------------------------
+#   CLIENT SIDE
+# ----------------------------------------------------
+class RemoteModelServer:
+    """
+    Stands in for a BatchingModelServer in a client process: `submit`
+    returns a Future resolved by a call to the owner's server.
+    """
+
+    def __init__(self, name: str, address: str, authkey: str, threads: int = MODEL_HOST_CLIENT_THREADS):
+        self.name = name
+        self.address = address
+        self.authkey = authkey
+        self._executor = ThreadPoolExecutor(threads, thread_name_prefix=f"{name}-remote")
+        self._lock = threading.Lock()
+        self._models = None
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0}
+
+    def _proxy(self):
+        with self._lock:
+            if self._models is None:
+                manager = _ModelHostManager(address=parse_address(self.address), authkey=self.authkey.encode())
+                manager.connect()
+                self._models = manager.models()
+            return self._models
+
+    def _call(self, payload):
+        try:
+            result = self._proxy().infer(self.name, payload)
+        except Exception:
+            self._counters["failed"] += 1
+            raise
+        self._counters["completed"] += 1
+        return result
+
+    def start(self):
+        self._proxy()
+
+    def submit(self, payload, block: bool = False, timeout: float = None) -> Future:
+        # The owner's bounded queue applies; a full queue surfaces from the Future
+        self._counters["submitted"] += 1
+        return self._executor.submit(self._call, payload)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        done = self._counters["completed"] + self._counters["failed"]
+        return {
+            "remote": self.address,
+            **self._counters,
+            "in_flight": self._counters["submitted"] - done,
+        }
+
+
+def use_model_host(address: str, authkey: str):
+    """Points this process's model servers at the owner serving on `address`."""
+    import importlib
+
+    for name, module_name in MODEL_MODULES.items():
+        importlib.import_module(module_name).server = RemoteModelServer(name, address, authkey)
+    print(f"Model inference goes to the model host at {address}")
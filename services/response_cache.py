@@ -0,0 +1,168 @@
+# services/response_cache.py
+
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+from rag.index_version import get_index_version
+
+load_dotenv()
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+RESPONSE_CACHE_VISION_BUCKET = float(os.getenv("RESPONSE_CACHE_VISION_BUCKET", "0.1"))
+
+_UNITS = (
+    "ng/ml|ng/dl|pg/ml|mg/dl|g/dl|mg/l|u/l|iu/l|miu/l|mmol/l|umol/l|µmol/l|ug/l|µg/l|"
+    "mm|cm|m|mg|mcg|ug|µg|g|kg|ml|dl|l|iu|u|cc|k|%|years?|yrs?|months?|weeks?|days?"
+)
+_NUMBER = re.compile(rf"(\d+(?:[.,]\d+)?)\s*({_UNITS})?(?![a-z])", re.IGNORECASE)
+
+
+def numeric_signature(query: str):
+    """
+    The numbers in a query with their units, in order: "a 6 mm nodule, PSA
+    9.20" -> ("6mm", "9.2"). Queries that differ only in a value embed
+    almost identically, so a cache hit also requires equal signatures.
+    """
+    signature = []
+    for value, unit in _NUMBER.findall(query):
+        number = float(value.replace(",", "."))
+        text = f"{number:g}"
+        signature.append(text + (unit or "").lower().rstrip("s"))
+    return tuple(signature)
+
+
+class SemanticResponseCache:
+    """
+    Caches chat answers keyed on query-embedding similarity.
+
+    Entries are partitioned by routing branch ("rag" / "team") and
+    vision_score bucket; a lookup only matches inside its own partition,
+    only above `threshold` cosine similarity and only if the numbers and
+    units in both queries are the same (see numeric_signature). RAG answers
+    remember the index version they were produced against and are dropped
+    once it changes.
+    """
+
+    def __init__(self, get_embedder, threshold: float = 0.92, ttl: float = 3600,
+                 max_entries: int = 512, vision_bucket: float = 0.1):
+        self.get_embedder = get_embedder
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.vision_bucket_width = vision_bucket
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._next_id = 0
+
+    def vision_bucket(self, vision_score):
+        if vision_score is None:
+            return None
+        return math.floor(float(vision_score) / self.vision_bucket_width)
+
+    def _embed(self, query: str):
+        vector = np.asarray(self.get_embedder().embed_query(query), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _is_stale(self, entry, now, index_version):
+        if now - entry["created"] > self.ttl:
+            return True
+        return entry["branch"] == "rag" and entry["index_version"] != index_version
+
+    def lookup(self, query: str, branch: str, vision_score=None):
+        vector = self._embed(query)
+        bucket = self.vision_bucket(vision_score)
+        numbers = numeric_signature(query)
+        now = time.time()
+        index_version = get_index_version()
+
+        with self._lock:
+            candidates = []
+            for entry_id, entry in list(self._entries.items()):
+                if self._is_stale(entry, now, index_version):
+                    del self._entries[entry_id]
+                    self.invalidations += 1
+                elif entry["branch"] == branch and entry["bucket"] == bucket and entry["numbers"] == numbers:
+                    candidates.append(entry_id)
+
+            if candidates:
+                matrix = np.stack([self._entries[i]["vector"] for i in candidates])
+                scores = matrix @ vector
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    entry_id = candidates[best]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id]["response"]
+
+            self.misses += 1
+            return None
+
+    def store(self, query: str, branch: str, response: str, vision_score=None):
+        entry = {
+            "vector": self._embed(query),
+            "branch": branch,
+            "bucket": self.vision_bucket(vision_score),
+            "numbers": numeric_signature(query),
+            "response": response,
+            "created": time.time(),
+            "index_version": get_index_version(),
+        }
+        with self._lock:
+            self._entries[self._next_id] = entry
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_branch(self, branch: str):
+        with self._lock:
+            stale = [i for i, e in self._entries.items() if e["branch"] == branch]
+            for entry_id in stale:
+                del self._entries[entry_id]
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": RESPONSE_CACHE_ENABLED,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+            "threshold": self.threshold,
+        }
+
+
+def _get_embedder():
+    from rag.retrival import get_embedding_model
+    return get_embedding_model()
+
+
+# Singleton instance shared by the chat endpoints
+response_cache = SemanticResponseCache(
+    _get_embedder,
+    threshold=RESPONSE_CACHE_THRESHOLD,
+    ttl=RESPONSE_CACHE_TTL,
+    max_entries=RESPONSE_CACHE_SIZE,
+    vision_bucket=RESPONSE_CACHE_VISION_BUCKET,
+)
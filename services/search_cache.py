@@ -0,0 +1,254 @@
+# services/search_cache.py
+"""
+Cache for web search results, shared by every worker through a local
+SQLite file (WAL mode, like the job queue).
+
+- Keys are a hash of the search kind, the normalized query (case,
+  whitespace and trailing punctuation ignored) and the search parameters.
+- Entries expire after SEARCH_CACHE_TTL (SEARCH_NEWS_TTL for news) and the
+  store is trimmed to SEARCH_CACHE_MAX_ENTRIES, least recently used first.
+- Identical searches in flight are coalesced: threads of one process wait
+  on the same Future, and other processes see the search's lease and poll
+  for its result instead of searching too.
+
+Failed searches are not cached.
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_ENABLED", "1") == "1"
+SEARCH_CACHE_PATH = os.getenv("SEARCH_CACHE_PATH", os.path.join("data", "search_cache.sqlite3"))
+SEARCH_CACHE_TTL = float(os.getenv("SEARCH_CACHE_TTL", str(6 * 3600)))
+SEARCH_NEWS_TTL = float(os.getenv("SEARCH_NEWS_TTL", "1800"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+# How long another worker's in-flight search is waited for before searching anyway
+SEARCH_INFLIGHT_TIMEOUT = float(os.getenv("SEARCH_INFLIGHT_TIMEOUT", "15"))
+SEARCH_INFLIGHT_POLL = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS search_cache (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    query TEXT NOT NULL,
+    results TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS search_cache_accessed ON search_cache (accessed_at);
+CREATE TABLE IF NOT EXISTS search_inflight (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    started_at REAL NOT NULL
+);
+"""
+
+_SPACES = re.compile(r"\s+")
+_EDGE_PUNCTUATION = re.compile(r"^[\s\"'?!.,;:]+|[\s\"'?!.,;:]+$")
+
+
+def normalize_query(query: str) -> str:
+    return _EDGE_PUNCTUATION.sub("", _SPACES.sub(" ", query.lower()))
+
+
+class SearchCache:
+    def __init__(self, path: str = SEARCH_CACHE_PATH, ttl: float = SEARCH_CACHE_TTL,
+                 news_ttl: float = SEARCH_NEWS_TTL, max_entries: int = SEARCH_CACHE_MAX_ENTRIES,
+                 inflight_timeout: float = SEARCH_INFLIGHT_TIMEOUT):
+        self.path = path
+        self.ttls = {"text": ttl, "news": news_ttl}
+        self.max_entries = max_entries
+        self.inflight_timeout = inflight_timeout
+        self.owner = f"{os.getpid()}"
+
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+        self._stats = {"hits": 0, "misses": 0, "coalesced": 0, "waited_on_other_worker": 0,
+                       "errors": 0, "evictions": 0}
+        self._fetch_seconds = deque(maxlen=200)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    conn.executescript(SCHEMA)
+                    self._initialized = True
+        return conn
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    # ----------------------------------------------------
+    #   STORE
+    # ----------------------------------------------------
+    def key(self, kind: str, query: str, **params) -> str:
+        raw = json.dumps([kind, normalize_query(query), params], sort_keys=True)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, key: str, kind: str):
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT results FROM search_cache WHERE key = ? AND created_at > ?",
+            (key, now - self.ttls[kind]),
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key: str, kind: str, query: str, results):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO search_cache (key, kind, query, results, created_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, kind, normalize_query(query), json.dumps(results), now, now),
+        )
+        self._trim(conn, now)
+
+    def _trim(self, conn, now: float):
+        removed = conn.execute(
+            "DELETE FROM search_cache WHERE created_at < ?", (now - max(self.ttls.values()),)
+        ).rowcount
+        excess = conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            removed += conn.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY accessed_at LIMIT ?)", (excess,)
+            ).rowcount
+        if removed:
+            self._count("evictions", removed)
+
+    # ----------------------------------------------------
+    #   CROSS-PROCESS LEASES
+    # ----------------------------------------------------
+    def _claim(self, key: str) -> bool:
+        now = time.time()
+        conn = self._connect()
+        if conn.execute(
+            "INSERT OR IGNORE INTO search_inflight (key, owner, started_at) VALUES (?, ?, ?)",
+            (key, self.owner, now),
+        ).rowcount:
+            return True
+        # A lease older than the timeout belongs to a search that died
+        return bool(conn.execute(
+            "UPDATE search_inflight SET owner = ?, started_at = ? WHERE key = ? AND started_at < ?",
+            (self.owner, now, key, now - self.inflight_timeout),
+        ).rowcount)
+
+    def _release(self, key: str):
+        self._connect().execute("DELETE FROM search_inflight WHERE key = ? AND owner = ?", (key, self.owner))
+
+    def _wait_for_other_worker(self, key: str, kind: str):
+        deadline = time.time() + self.inflight_timeout
+        conn = self._connect()
+        while time.time() < deadline:
+            time.sleep(SEARCH_INFLIGHT_POLL)
+            results = self.get(key, kind)
+            if results is not None:
+                return results
+            if conn.execute("SELECT 1 FROM search_inflight WHERE key = ?", (key,)).fetchone() is None:
+                return None  # the other search failed; do it ourselves
+        return None
+
+    # ----------------------------------------------------
+    #   LOOKUP
+    # ----------------------------------------------------
+    def fetch(self, kind: str, query: str, search, **params):
+        """
+        Returns cached results for (kind, query, params) or calls
+        `search(query, **params)` once, however many callers ask at the same time.
+        """
+        key = self.key(kind, query, **params)
+        results = self.get(key, kind)
+        if results is not None:
+            self._count("hits")
+            return results
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            self._count("coalesced")
+            return future.result()
+
+        try:
+            results = self._fetch_once(key, kind, query, search, params)
+            future.set_result(results)
+            return results
+        except Exception as e:
+            self._count("errors")
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def _fetch_once(self, key, kind, query, search, params):
+        if not self._claim(key):
+            results = self._wait_for_other_worker(key, kind)
+            if results is not None:
+                self._count("waited_on_other_worker")
+                return results
+            self._claim(key)
+        try:
+            # Another worker may have finished between our lookup and the claim
+            results = self.get(key, kind)
+            if results is not None:
+                self._count("hits")
+                return results
+            self._count("misses")
+            start = time.perf_counter()
+            results = search(query, **params)
+            with self._lock:
+                self._fetch_seconds.append(time.perf_counter() - start)
+            self.put(key, kind, query, results)
+            return results
+        finally:
+            self._release(key)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._fetch_seconds)
+        served = stats["hits"] + stats["coalesced"] + stats["waited_on_other_worker"]
+        lookups = served + stats["misses"]
+        stats.update({
+            "enabled": SEARCH_CACHE_ENABLED,
+            "hit_rate": round(served / lookups, 3) if lookups else None,
+            "search_ms_p50": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        })
+        if self._initialized:
+            stats["entries"] = self._connect().execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+        return stats
+
+
+# Singleton shared by the web search tools of this process
+search_cache = SearchCache()
@@ -0,0 +1,94 @@
+# services/warmup.py
+
+import os
+import threading
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Subsystems loaded in the background right after startup; the rest load on first use
+WARMUP_SUBSYSTEMS = [s.strip() for s in os.getenv("WARMUP_SUBSYSTEMS", "database,rag,router,supervisor").split(",") if s.strip()]
+# Subsystems that must be warm before /ready reports ready: what every chat
+# request needs (empty = ready at once)
+READY_REQUIRES = [s.strip() for s in os.getenv("READY_REQUIRES", "database,rag,router").split(",") if s.strip()]
+
+
+class SubsystemRegistry:
+    """
+    Tracks heavy subsystems that are imported/built lazily.
+
+    Each subsystem has a `loader` (idempotent, builds it) and a `probe`
+    (cheap, True once it is built, whether by warm-up or by first use).
+    """
+
+    def __init__(self):
+        self._subsystems = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, loader, probe):
+        self._subsystems[name] = {
+            "loader": loader,
+            "probe": probe,
+            "state": "cold",
+            "seconds": None,
+            "error": None,
+        }
+
+    def warm(self, name: str):
+        subsystem = self._subsystems[name]
+        with self._lock:
+            if subsystem["state"] == "warming":
+                return
+            subsystem["state"] = "warming"
+
+        start = time.perf_counter()
+        try:
+            subsystem["loader"]()
+            subsystem["state"] = "warm"
+            subsystem["error"] = None
+        except Exception as e:
+            subsystem["state"] = "failed"
+            subsystem["error"] = str(e)
+            print(f"Warm-up of {name} failed:", e)
+        subsystem["seconds"] = round(time.perf_counter() - start, 3)
+
+    def warm_up_in_background(self, names=None):
+        names = [n for n in (names or WARMUP_SUBSYSTEMS) if n in self._subsystems]
+
+        def run():
+            for name in names:
+                self.warm(name)
+
+        thread = threading.Thread(target=run, name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    def _state(self, subsystem):
+        # First use outside warm-up (or a later retry) also counts as warm
+        try:
+            if subsystem["probe"]():
+                return "warm"
+        except Exception:
+            pass
+        return "cold" if subsystem["state"] == "warm" else subsystem["state"]
+
+    def status(self):
+        return {
+            name: {
+                "state": self._state(subsystem),
+                "warm_up_seconds": subsystem["seconds"],
+                "error": subsystem["error"],
+            }
+            for name, subsystem in self._subsystems.items()
+        }
+
+    def is_ready(self, required=None):
+        required = READY_REQUIRES if required is None else required
+        status = self.status()
+        return all(status.get(name, {}).get("state") == "warm" for name in required)
+
+
+# Singleton shared by the app
+registry = SubsystemRegistry()
@@ -0,0 +1,353 @@
+# services/write_buffer.py
+"""
+Write-behind buffer for Supabase rows that nothing reads back right away:
+chat_history inserts and reports status/result updates.
+
+Writes are appended to a local JSONL journal and acknowledged immediately;
+a background thread flushes them when WRITE_BUFFER_MAX_ROWS are pending or
+every WRITE_BUFFER_FLUSH_SECONDS:
+
+- chat_history rows go out as one bulk insert per flush
+- updates to the same report are merged (last value wins); reports that
+  end up with identical fields share one `update ... where id in (...)`
+
+Each of those writes succeeds or fails on its own, and only what failed
+stays pending. A transport failure (Supabase unreachable, timeouts, 5xx)
+is retried with backoff for as long as it lasts. When PostgREST rejects
+the rows themselves (services/db.py:is_row_error), each row of that write
+counts an attempt and is retried on its own, so a bad row cannot fail a
+bulk write again; after WRITE_BUFFER_MAX_ATTEMPTS such rejections it is
+set aside in `dead_letter.jsonl` for inspection.
+
+The journal is compacted after every flush. Journal files are named
+`<owner pid>.*.jsonl`; on start a buffer adopts the journals of processes
+that are no longer running, so rows pending at a crash or restart are
+written by the next process. Delivery is at-least-once.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from dotenv import load_dotenv
+
+from services.db import db as default_db, is_row_error
+
+load_dotenv()
+
+WRITE_BUFFER_ENABLED = os.getenv("WRITE_BUFFER_ENABLED", "1") == "1"
+WRITE_BUFFER_DIR = os.getenv("WRITE_BUFFER_DIR", os.path.join("data", "write_buffer"))
+WRITE_BUFFER_MAX_ROWS = int(os.getenv("WRITE_BUFFER_MAX_ROWS", "200"))
+WRITE_BUFFER_FLUSH_SECONDS = float(os.getenv("WRITE_BUFFER_FLUSH_SECONDS", "1.0"))
+# After a failed flush, wait this long (doubling up to the max) before retrying
+WRITE_BUFFER_RETRY_SECONDS = float(os.getenv("WRITE_BUFFER_RETRY_SECONDS", "2"))
+WRITE_BUFFER_RETRY_MAX_SECONDS = float(os.getenv("WRITE_BUFFER_RETRY_MAX_SECONDS", "60"))
+# Rejections of a row by PostgREST before it is moved to the dead-letter file
+WRITE_BUFFER_MAX_ATTEMPTS = int(os.getenv("WRITE_BUFFER_MAX_ATTEMPTS", "5"))
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WriteBuffer:
+    def __init__(self, directory: str = WRITE_BUFFER_DIR, db=default_db,
+                 max_rows: int = WRITE_BUFFER_MAX_ROWS, flush_seconds: float = WRITE_BUFFER_FLUSH_SECONDS,
+                 max_attempts: int = WRITE_BUFFER_MAX_ATTEMPTS):
+        self.directory = directory
+        self.db = db
+        self.max_rows = max_rows
+        self.flush_seconds = flush_seconds
+        self.max_attempts = max_attempts
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._journal = None
+        self._journal_path = None
+
+        # chat rows are [row, rejections]; report rejections are keyed by report id
+        self._chat_rows = []
+        self._report_updates = {}
+        self._report_attempts = {}
+        self._oldest = None
+
+        self._flush_seconds_recent = deque(maxlen=200)
+        self._stats = {"flushes": 0, "failed_flushes": 0, "rows_written": 0, "rows_failed": 0,
+                       "dead_lettered": 0, "recovered": 0}
+        self._last_error = None
+        self._retry_at = 0.0
+
+    # ----------------------------------------------------
+    #   JOURNAL
+    # ----------------------------------------------------
+    def _open_journal(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._journal_path = os.path.join(self.directory, f"{os.getpid()}.jsonl")
+
+        # Adopt journals of dead processes (a previous run may have had our pid)
+        claimed = []
+        for name in sorted(os.listdir(self.directory)):
+            owner = name.split(".")[0]
+            if not name.endswith(".jsonl") or not owner.isdigit():
+                continue
+            if int(owner) != os.getpid() and _pid_alive(int(owner)):
+                continue
+            path = os.path.join(self.directory, f"{os.getpid()}.recovering.{name}")
+            try:
+                os.replace(os.path.join(self.directory, name), path)
+            except FileNotFoundError:
+                continue  # another process adopted it first
+            claimed.append(path)
+
+        for path in claimed:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from a crash
+                    self._apply(entry)
+                    self._stats["recovered"] += 1
+
+        self._journal = open(self._journal_path, "a")
+        self._rewrite_journal()
+        for path in claimed:
+            os.remove(path)
+        if self._stats["recovered"]:
+            print(f"Write buffer recovered {self._stats['recovered']} pending writes from the journal.")
+
+    def _entries(self):
+        entries = [{"kind": "chat", "row": row, "attempts": attempts} for row, attempts in self._chat_rows]
+        entries.extend({"kind": "report", "id": report_id, "fields": fields,
+                        "attempts": self._report_attempts.get(report_id, 0)}
+                       for report_id, fields in self._report_updates.items())
+        return entries
+
+    def _rewrite_journal(self):
+        tmp = self._journal_path + ".tmp"
+        with open(tmp, "w") as f:
+            for entry in self._entries():
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal.close()
+        os.replace(tmp, self._journal_path)
+        self._journal = open(self._journal_path, "a")
+
+    def _apply(self, entry: dict):
+        attempts = entry.get("attempts", 0)
+        if entry["kind"] == "chat":
+            self._chat_rows.append([entry["row"], attempts])
+        else:
+            self._report_updates.setdefault(entry["id"], {}).update(entry["fields"])
+            if attempts:
+                self._report_attempts[entry["id"]] = max(attempts, self._report_attempts.get(entry["id"], 0))
+        if self._oldest is None:
+            self._oldest = time.time()
+
+    # ----------------------------------------------------
+    #   PRODUCERS
+    # ----------------------------------------------------
+    def _add(self, entry: dict):
+        if self._journal is None:
+            self.start()
+        with self._lock:
+            self._journal.write(json.dumps(entry) + "\n")
+            self._journal.flush()
+            self._apply(entry)
+            pending = len(self._chat_rows) + len(self._report_updates)
+        if pending >= self.max_rows:
+            self._wake.set()
+
+    def add_chat(self, row: dict):
+        self._add({"kind": "chat", "row": row})
+
+    def update_report(self, report_id, fields: dict):
+        self._add({"kind": "report", "id": report_id, "fields": fields})
+
+    # ----------------------------------------------------
+    #   FLUSHING
+    # ----------------------------------------------------
+    def flush(self) -> int:
+        """
+        Writes everything pending and returns the number of rows written.
+        Rows whose write failed stay pending; raises if nothing could be written.
+        """
+        with self._flush_lock:
+            with self._lock:
+                chat_rows = self._chat_rows
+                report_updates = self._report_updates
+                report_attempts = self._report_attempts
+                oldest = self._oldest
+                self._chat_rows, self._report_updates, self._report_attempts, self._oldest = [], {}, {}, None
+            if not chat_rows and not report_updates:
+                return 0
+
+            start = time.perf_counter()
+            failed_chat, failed_reports, error = self._write(chat_rows, report_updates, report_attempts)
+            failed = len(failed_chat) + len(failed_reports)
+            written = len(chat_rows) + len(report_updates) - failed
+
+            # Rows out of attempts are set aside; the rest is retried
+            dead, retry_chat, retry_reports, retry_attempts = [], [], {}, {}
+            for row, attempts in failed_chat:
+                if attempts >= self.max_attempts:
+                    dead.append({"kind": "chat", "row": row, "attempts": attempts})
+                else:
+                    retry_chat.append([row, attempts])
+            for report_id, attempts in failed_reports.items():
+                if attempts >= self.max_attempts:
+                    dead.append({"kind": "report", "id": report_id, "fields": report_updates[report_id],
+                                 "attempts": attempts})
+                else:
+                    retry_reports[report_id] = report_updates[report_id]
+                    if attempts:
+                        retry_attempts[report_id] = attempts
+            if dead:
+                self._dead_letter(dead, error)
+
+            with self._lock:
+                # Failed rows go back in front of anything added meanwhile
+                if retry_chat or retry_reports:
+                    self._oldest = oldest
+                self._chat_rows = retry_chat + self._chat_rows
+                for report_id, fields in self._report_updates.items():
+                    retry_reports.setdefault(report_id, {}).update(fields)
+                self._report_updates = retry_reports
+                self._report_attempts = retry_attempts
+                self._rewrite_journal()
+                self._flush_seconds_recent.append(time.perf_counter() - start)
+                self._stats["flushes"] += 1
+                self._stats["rows_written"] += written
+                if error is not None:
+                    self._stats["failed_flushes"] += 1
+                    self._stats["rows_failed"] += failed
+                    self._last_error = str(error)
+
+            if error is not None:
+                if not written:
+                    raise error
+                print(f"Write buffer: {failed} of {failed + written} rows failed and will be retried:", error)
+            return written
+
+    def _write(self, chat_rows, report_updates, report_attempts):
+        """
+        Runs each write on its own. Returns (failed chat entries and
+        {failed report id: rejections}, both with rejections counted, and
+        the last error or None).
+        """
+        failed_chat, failed_reports, error = [], {}, None
+
+        # A bulk insert fails as a whole, so rows that were rejected before go one by one
+        fresh = [entry for entry in chat_rows if entry[1] == 0]
+        batches = ([fresh] if fresh else []) + [[entry] for entry in chat_rows if entry[1] > 0]
+        for batch in batches:
+            rows = [row for row, _ in batch]
+            try:
+                self.db.execute("chat_history", lambda t: t.insert(rows))
+            except Exception as e:
+                rejected = is_row_error(e)
+                failed_chat.extend([row, attempts + rejected] for row, attempts in batch)
+                error = e
+
+        groups = {}
+        for report_id, fields in report_updates.items():
+            if report_attempts.get(report_id):
+                groups[("retry", report_id)] = [report_id]
+            else:
+                groups.setdefault(json.dumps(fields, sort_keys=True), []).append(report_id)
+        for report_ids in groups.values():
+            fields = report_updates[report_ids[0]]
+            try:
+                if len(report_ids) == 1:
+                    self.db.execute("reports", lambda t: t.update(fields).eq("id", report_ids[0]))
+                else:
+                    self.db.execute("reports", lambda t: t.update(fields).in_("id", report_ids))
+            except Exception as e:
+                rejected = is_row_error(e)
+                for report_id in report_ids:
+                    failed_reports[report_id] = report_attempts.get(report_id, 0) + rejected
+                error = e
+        return failed_chat, failed_reports, error
+
+    def _dead_letter(self, entries, error):
+        path = os.path.join(self.directory, "dead_letter.jsonl")
+        with open(path, "a") as f:
+            for entry in entries:
+                f.write(json.dumps({**entry, "error": str(error), "at": time.time()}) + "\n")
+        with self._lock:
+            self._stats["dead_lettered"] += len(entries)
+        print(f"Write buffer: {len(entries)} rows rejected {self.max_attempts} times, moved to {path}")
+
+    def _run(self):
+        backoff = WRITE_BUFFER_RETRY_SECONDS
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            if self._stop.is_set():
+                break  # shutdown() makes the last flush
+            if time.time() < self._retry_at:
+                continue
+            try:
+                self.flush()
+                backoff = WRITE_BUFFER_RETRY_SECONDS
+            except Exception as e:
+                print("Write buffer flush failed, will retry:", e)
+                self._retry_at = time.time() + backoff
+                backoff = min(backoff * 2, WRITE_BUFFER_RETRY_MAX_SECONDS)
+
+    # ----------------------------------------------------
+    #   LIFECYCLE
+    # ----------------------------------------------------
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._open_journal()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="write-buffer", daemon=True)
+            self._thread.start()
+
+    def shutdown(self, timeout: float = 10):
+        """Stops the flush thread and makes a last attempt to write what is pending."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        try:
+            self.flush()
+        except Exception as e:
+            print("Final write buffer flush failed; rows stay in the journal:", e)
+        with self._lock:
+            self._journal.close()
+            self._journal = None
+
+    def stats(self):
+        with self._lock:
+            latencies = sorted(self._flush_seconds_recent)
+            oldest = self._oldest
+            return {
+                "enabled": WRITE_BUFFER_ENABLED,
+                "pending_chat_rows": len(self._chat_rows),
+                "pending_report_updates": len(self._report_updates),
+                "backlog_seconds": round(time.time() - oldest, 3) if oldest else 0.0,
+                **self._stats,
+                "flush_ms_p50": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+                "flush_ms_max": round(latencies[-1] * 1000, 2) if latencies else None,
+                "last_error": self._last_error,
+            }
+
+
+write_buffer = WriteBuffer()
@@ -0,0 +1,31 @@
+# tests/stand_in_model.py
+"""
+A tiny CPU "model" for BatchingModelServer tests, imported by the spawned
+workers through "tests.stand_in_model:load" / "tests.stand_in_model:infer".
+"""
+
+import os
+import signal
+import time
+
+import numpy as np
+
+
+def load():
+    return {"weights": np.arange(4, dtype=np.float32)}
+
+
+def infer(state, payloads):
+    results = []
+    for payload in payloads:
+        if payload == "die":
+            # What an OOM kill looks like from the app side
+            os.kill(os.getpid(), signal.SIGKILL)
+        if payload == "hang":
+            time.sleep(3600)
+        results.append(float(state["weights"] @ np.full(4, float(payload), dtype=np.float32)))
+    return results
+
+
+def fail_to_load():
+    raise RuntimeError("no weights")
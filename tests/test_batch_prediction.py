@@ -0,0 +1,39 @@
+# tests/test_batch_prediction.py
+
+import json
+
+from services.batch_prediction import iter_ndjson_predictions, parse_batch
+
+HEADER = b"Diagnosis_Age,Mutation_Count,Sex,TMB_nonsynonymous,Number_of_Samples_Per_Patient\n"
+GOOD_ROW = {"Diagnosis_Age": 60, "Mutation_Count": 10, "Sex": "Male",
+            "TMB_nonsynonymous": 3.2, "Number_of_Samples_Per_Patient": 1}
+
+
+def predict(body, content_type="application/json"):
+    lines = "".join(iter_ndjson_predictions(parse_batch(body, content_type), chunk_rows=100))
+    return [json.loads(line) for line in lines.splitlines()]
+
+
+def test_bad_csv_cells_only_fail_their_own_rows():
+    body = HEADER + b"60,10,Male,3.2,1\n" * 50 + b"abc,10,Male,3.2,1\n55,,Female,1,1\n" + b"60,10,Male,3.2,1\n" * 50
+    results = predict(body, "text/csv")
+
+    assert len(results) == 102
+    errors = {r["index"]: r["error"] for r in results if "error" in r}
+    assert errors == {50: "Invalid Diagnosis Age value: 'abc'", 51: "Invalid Mutation Count value: ''"}
+    assert all("prediction" in r for r in results if r["index"] not in errors)
+
+
+def test_missing_json_values_are_rejected_not_scored():
+    records = [GOOD_ROW, dict(GOOD_ROW, Diagnosis_Age=None), dict(GOOD_ROW, TMB_nonsynonymous=float("nan"))]
+    results = predict(json.dumps(records).encode())
+
+    assert "prediction" in results[0]
+    assert results[1] == {"index": 1, "error": "Invalid Diagnosis Age value: None"}
+    assert "error" in results[2] and "prediction" not in results[2]
+
+
+def test_unknown_sex_is_a_row_error():
+    results = predict(json.dumps([dict(GOOD_ROW, Sex="Other"), GOOD_ROW]).encode())
+    assert results[0] == {"index": 0, "error": "Unknown Sex value: 'Other'"}
+    assert "prediction" in results[1]
@@ -0,0 +1,109 @@
+# tests/test_extractor.py
+import glob
+import os
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from utils import extractor
+
+PDFS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "rag", "DATA", "*.pdf")))[:2]
+
+pytestmark = pytest.mark.skipif(not PDFS, reason="no sample PDFs in rag/DATA")
+
+
+@pytest.fixture
+def fast_backend():
+    backend = extractor.get_backend()
+    if backend == "pypdf2":
+        pytest.skip("no faster backend installed")
+    return backend
+
+
+def pages(path, backend, start=0, stop=None):
+    stop = extractor.BACKENDS[backend][1](path) if stop is None else stop
+    return list(extractor.BACKENDS[backend][2](path, start, stop))
+
+
+def test_concurrent_extraction_matches_serial():
+    expected = {path: extractor.extract_text_from_pdf(path, workers=1) for path in PDFS}
+    results, errors = [], []
+
+    def run():
+        try:
+            for path in PDFS:
+                results.append(extractor.extract_text_from_pdf(path, workers=1) == expected[path])
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert results and all(results)
+
+
+def test_pages_are_yielded_as_they_are_extracted(fast_backend, monkeypatch):
+    module, page_count, real_pages = extractor.BACKENDS[fast_backend]
+    extracted = []
+
+    def counting_pages(path, start, stop):
+        for text in real_pages(path, start, stop):
+            extracted.append(text)
+            yield text
+
+    monkeypatch.setitem(extractor.BACKENDS, fast_backend, (module, page_count, counting_pages))
+    stream = extractor.iter_pdf_pages(PDFS[0], workers=1)
+    next(stream)
+    assert len(extracted) == 1
+    stream.close()
+
+
+def test_error_mid_extraction_hands_over_to_pypdf2_at_that_page(fast_backend, monkeypatch):
+    module, page_count, real_pages = extractor.BACKENDS[fast_backend]
+
+    def failing_pages(path, start, stop):
+        for i, text in enumerate(real_pages(path, start, stop), start):
+            if i == 1:
+                raise RuntimeError("page failed")
+            yield text
+
+    monkeypatch.setitem(extractor.BACKENDS, fast_backend, (module, page_count, failing_pages))
+    result = list(extractor.iter_pdf_pages(PDFS[0], workers=1))
+    assert result == pages(PDFS[0], fast_backend, 0, 1) + pages(PDFS[0], "pypdf2", 1)
+
+
+def test_busy_backend_sends_the_document_to_the_pool(fast_backend, monkeypatch):
+    calls = []
+
+    def pool_pages(backend, path, workers, count=None):
+        calls.append(path)
+        yield "x"
+
+    monkeypatch.setattr(extractor, "_iter_parallel", pool_pages)
+    lock = extractor._INPROCESS_LOCKS[fast_backend]
+    with lock:
+        assert extractor.extract_text_from_pdf(PDFS[0], workers=1) == "x"
+    assert calls == [PDFS[0]]
+
+
+class BrokenPool:
+    def __init__(self):
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+def test_broken_pool_is_replaced_and_pypdf2_takes_over(fast_backend, monkeypatch):
+    broken = BrokenPool()
+    monkeypatch.setattr(extractor, "_pool", broken)
+    result = list(extractor._iter_parallel(fast_backend, PDFS[0], 2))
+    assert result == pages(PDFS[0], "pypdf2")
+    assert broken.shut_down and extractor._pool is None
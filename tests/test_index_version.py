@@ -0,0 +1,52 @@
+# tests/test_index_version.py
+import pytest
+
+from rag import index_version
+
+
+@pytest.fixture
+def source(monkeypatch):
+    reads = []
+    version = {"value": 1.0}
+
+    def read():
+        reads.append(version["value"])
+        return version["value"]
+
+    monkeypatch.setattr(index_version, "_source", None)
+    index_version.set_index_version_source(read)
+    yield version, reads
+    index_version.set_index_version_source(None)
+
+
+def test_version_is_read_at_most_once_per_ttl(source, monkeypatch):
+    version, reads = source
+    now = [100.0]
+    monkeypatch.setattr(index_version.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(index_version, "INDEX_VERSION_TTL", 30)
+
+    assert index_version.get_index_version() == 1.0
+    version["value"] = 2.0
+    assert index_version.get_index_version() == 1.0
+    assert len(reads) == 1
+
+    now[0] += 31
+    assert index_version.get_index_version() == 2.0
+    assert len(reads) == 2
+
+
+def test_failed_read_keeps_the_last_version(source, monkeypatch):
+    version, reads = source
+    monkeypatch.setattr(index_version, "INDEX_VERSION_TTL", 0)
+    assert index_version.get_index_version() == 1.0
+
+    def broken():
+        raise ConnectionError("qdrant unreachable")
+
+    monkeypatch.setattr(index_version, "_source", broken)
+    assert index_version.get_index_version() == 1.0
+
+
+def test_no_source_means_version_zero(monkeypatch):
+    monkeypatch.setattr(index_version, "_source", None)
+    assert index_version.get_index_version() == 0.0
@@ -0,0 +1,84 @@
+# tests/test_indexing.py
+import glob
+import os
+import shutil
+import uuid
+
+import pytest
+
+pytest.importorskip("qdrant_client")
+pytest.importorskip("langchain_text_splitters")
+
+from qdrant_client import models  # noqa: E402
+
+from rag import indexing  # noqa: E402
+
+PDFS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), "..", "rag", "DATA", "*.pdf")))[:1]
+
+pytestmark = pytest.mark.skipif(not PDFS, reason="no sample PDFs in rag/DATA")
+
+
+class StubEmbedder:
+    def embed_documents(self, texts):
+        return [[1.0, float(len(text)), 0.0, 1.0] for text in texts]
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    data = tmp_path / "data"
+    data.mkdir()
+    shutil.copy(PDFS[0], data / "report.pdf")
+    sink = indexing.make_qdrant_sink(memory=True, collection_name="test_rag")
+    sink.target = "memory/test_rag"  # lets the manifest persist between runs
+    return sink, data, str(tmp_path / "manifest.json")
+
+
+def add_legacy_point(sink):
+    # What langchain's from_documents left behind: a random UUID per chunk
+    sink.ensure_collection(4)
+    point_id = str(uuid.uuid4())
+    sink.client.upsert(sink.collection_name, points=[
+        models.PointStruct(id=point_id, vector=[0.0, 1.0, 0.0, 1.0], payload={"page_content": "old"}),
+    ])
+    return point_id
+
+
+def run(sink, data, manifest, full=False):
+    return indexing.run_index(sink, StubEmbedder(), data_dir=data, manifest_path=manifest, full=full, load_workers=1)
+
+
+def test_first_run_replaces_points_of_an_older_index(corpus):
+    sink, data, manifest = corpus
+    add_legacy_point(sink)
+    stats = run(sink, data, manifest)
+    assert stats["pruned"] == 1
+    assert sink.count() == stats["chunks"]
+
+
+def test_incremental_run_keeps_foreign_points_and_full_run_prunes(corpus):
+    sink, data, manifest = corpus
+    chunks = run(sink, data, manifest)["chunks"]
+    add_legacy_point(sink)
+
+    stats = run(sink, data, manifest)
+    assert stats["indexed"] == 0 and stats["pruned"] == 0
+    assert sink.count() == chunks + 1
+
+    stats = run(sink, data, manifest, full=True)
+    assert stats["pruned"] == 1
+    assert sink.count() == chunks
+
+
+def test_index_version_is_stored_with_the_collection(corpus):
+    from rag.index_version import qdrant_index_version
+
+    sink, data, manifest = corpus
+    run(sink, data, manifest)
+    first = qdrant_index_version(sink.client, sink.collection_name)
+    assert first > 0
+
+    run(sink, data, manifest)  # nothing changed
+    assert qdrant_index_version(sink.client, sink.collection_name) == first
+
+    run(sink, data, manifest, full=True)
+    assert qdrant_index_version(sink.client, sink.collection_name) > first
@@ -0,0 +1,71 @@
+# tests/test_job_queue.py
+
+import time
+
+import pytest
+
+from services.job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"))
+
+
+def test_lost_leases_count_as_attempts(queue):
+    job_id = queue.enqueue("pdf", {"report": 1}, max_attempts=2)
+
+    assert queue.claim("pdf", "w1")["attempts"] == 1
+    requeued, failed = queue.requeue_stale(lease_seconds=0)
+    assert (requeued, failed) == (1, [])
+    assert queue.get(job_id)["status"] == "queued"
+
+    queue._connect().execute("UPDATE jobs SET run_after = 0 WHERE id = ?", (job_id,))
+    assert queue.claim("pdf", "w2")["attempts"] == 2
+    requeued, failed = queue.requeue_stale(lease_seconds=0)
+    assert requeued == 0
+    assert [job["id"] for job in failed] == [job_id]
+    job = queue.get(job_id)
+    assert job["status"] == "failed"
+    assert job["error"] == "worker lost"
+
+
+def test_heartbeat_keeps_a_slow_job_leased(queue):
+    job_id = queue.enqueue("pdf", {})
+    job = queue.claim("pdf", "w1")
+    time.sleep(0.2)
+    assert queue.heartbeat(job_id, job["worker"])
+    assert queue.requeue_stale(lease_seconds=0.1) == (0, [])
+    assert queue.get(job_id)["status"] == "running"
+    assert not queue.heartbeat(job_id, "someone-else")
+
+
+def test_only_the_lease_owner_can_finish_a_job(queue):
+    job_id = queue.enqueue("pdf", {}, max_attempts=3)
+    queue.claim("pdf", "w1")
+    queue.requeue_stale(lease_seconds=0)
+    queue._connect().execute("UPDATE jobs SET run_after = 0 WHERE id = ?", (job_id,))
+    queue.claim("pdf", "w2")
+
+    # w1 lost its lease: its outcome must not touch w2's attempt
+    assert not queue.complete(job_id, "w1")
+    assert queue.fail(job_id, "w1", "late failure") is None
+    job = queue.get(job_id)
+    assert (job["status"], job["worker"], job["attempts"]) == ("running", "w2", 2)
+
+    assert queue.fail(job_id, "w2", "boom") is False
+    assert queue.get(job_id)["status"] == "queued"
+    queue._connect().execute("UPDATE jobs SET run_after = 0 WHERE id = ?", (job_id,))
+    queue.claim("pdf", "w3")
+    assert queue.complete(job_id, "w3")
+    assert not queue.complete(job_id, "w3")
+    assert queue.get(job_id)["status"] == "done"
+
+
+def test_completed_records_are_found_by_key(queue):
+    job_id = queue.record_completed("pdf", {"report_id": 7, "user_id": "u1"}, key="7")
+    job = queue.get_by_key("7")
+    assert job["id"] == job_id
+    assert job["status"] == "done"
+    assert queue.queue_position(job) is None
+    assert queue.claim("pdf", "w1") is None
@@ -0,0 +1,64 @@
+# tests/test_local_index.py
+import json
+import os
+
+import numpy as np
+import pytest
+
+from rag import local_index
+
+
+class StubEmbedder:
+    def embed_query(self, text):
+        return [1.0, 0.0, 0.0]
+
+
+def write(directory, texts, version):
+    records = [{"id": str(i), "text": text, "metadata": {"n": i}} for i, text in enumerate(texts)]
+    vectors = np.eye(3, dtype=np.float32)[: len(texts)]
+    local_index.write_index(str(directory), records, vectors, hnsw=False, version=version)
+
+
+def test_write_swaps_versions_and_keeps_the_previous_one(tmp_path):
+    for version in (1.0, 2.0, 3.0):
+        write(tmp_path, [f"text {version}"], version)
+
+    assert local_index.read_index_version(str(tmp_path)) == 3.0
+    versions = sorted(name for name in os.listdir(tmp_path) if name.startswith("v"))
+    assert len(versions) == 2
+    assert local_index.index_path(str(tmp_path)) in [os.path.join(tmp_path, name) for name in versions]
+    records, _ = local_index.read_records(str(tmp_path))
+    assert [r["text"] for r in records] == ["text 3.0"]
+
+
+def test_failed_write_leaves_the_served_index(tmp_path, monkeypatch):
+    write(tmp_path, ["first"], 1.0)
+
+    def broken(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(local_index.json, "dump", broken)
+    with pytest.raises(OSError):
+        write(tmp_path, ["second"], 2.0)
+    assert local_index.read_index_version(str(tmp_path)) == 1.0
+    assert len([name for name in os.listdir(tmp_path) if name.startswith("v")]) == 1
+
+
+def test_running_store_picks_up_a_new_index(tmp_path):
+    write(tmp_path, ["old", "other"], 1.0)
+    store = local_index.LocalVectorStore(str(tmp_path), StubEmbedder(), check_seconds=0)
+    assert store.similarity_search("q", k=1)[0].page_content == "old"
+
+    write(tmp_path, ["new", "other"], 2.0)
+    assert store.similarity_search("q", k=1)[0].page_content == "new"
+    assert store.max_marginal_relevance_search("q", k=1)[0].page_content == "new"
+
+
+def test_indexes_written_before_versioning_still_load(tmp_path):
+    np.eye(3, dtype=np.float32)[:1].tofile(tmp_path / "vectors.f32")
+    (tmp_path / "metadata.jsonl").write_text(json.dumps({"id": "0", "text": "flat", "metadata": {}}) + "\n")
+    (tmp_path / "meta.json").write_text(json.dumps({"dim": 3, "count": 1, "version": 5.0}))
+
+    assert local_index.read_index_version(str(tmp_path)) == 5.0
+    store = local_index.LocalVectorStore(str(tmp_path), StubEmbedder())
+    assert store.similarity_search("q", k=1)[0].page_content == "flat"
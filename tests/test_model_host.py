@@ -0,0 +1,81 @@
+# tests/test_model_host.py
+
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from services import model_host
+from tests.test_model_server import make_server
+
+
+@pytest.fixture
+def host(monkeypatch):
+    server = make_server()
+    monkeypatch.setattr(model_host, "_server", lambda name: server)
+    address, authkey = model_host.serve()
+    yield server, address, authkey
+    model_host.stop()
+    server.shutdown()
+
+
+def test_remote_requests_are_batched_by_the_owner(host):
+    server, address, authkey = host
+    remote = model_host.RemoteModelServer("stand-in", address, authkey, threads=8)
+    try:
+        futures = [remote.submit(i) for i in range(12)]
+        assert [f.result(timeout=30) for f in futures] == [6.0 * i for i in range(12)]
+        assert server.stats()["completed"] == 12
+        assert remote.stats()["completed"] == 12
+    finally:
+        remote.shutdown()
+
+
+def test_owner_errors_reach_the_client(host):
+    server, address, authkey = host
+    remote = model_host.RemoteModelServer("stand-in", address, authkey, threads=2)
+    try:
+        with pytest.raises(RuntimeError, match="exited"):
+            remote.submit("die").result(timeout=30)
+        assert remote.submit(1).result(timeout=30) == 6.0
+    finally:
+        remote.shutdown()
+
+
+class _SlowServer:
+    """Counts how many requests it holds at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+
+    def _run(self, future, payload):
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        future.set_result(payload)
+
+    def submit(self, payload, block=False, timeout=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        future = Future()
+        threading.Thread(target=self._run, args=(future, payload), daemon=True).start()
+        return future
+
+
+def test_remote_requests_are_capped_per_model(monkeypatch):
+    server = _SlowServer()
+    monkeypatch.setattr(model_host, "_server", lambda name: server)
+    monkeypatch.setattr(model_host, "_models", model_host._Models(capacity=2))
+    address, authkey = model_host.serve()
+    remote = model_host.RemoteModelServer("stand-in", address, authkey, threads=8)
+    try:
+        futures = [remote.submit(i) for i in range(8)]
+        assert [f.result(timeout=30) for f in futures] == list(range(8))
+        assert server.peak == 2
+    finally:
+        remote.shutdown()
+        model_host.stop()
@@ -0,0 +1,90 @@
+# tests/test_model_server.py
+
+import time
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from agents.model_server import BatchingModelServer
+
+
+def make_server(**kwargs):
+    options = {"num_workers": 1, "max_queue": 16, "max_batch_size": 4, "max_wait_ms": 20,
+               "monitor_interval": 0.1}
+    options.update(kwargs)
+    return BatchingModelServer(
+        "stand-in", loader="tests.stand_in_model:load", handler="tests.stand_in_model:infer", **options
+    )
+
+
+@pytest.fixture
+def server():
+    server = make_server()
+    yield server
+    server.shutdown()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not met in time"
+        time.sleep(0.05)
+
+
+def test_results_come_back_in_order(server):
+    futures = [server.submit(i, block=True) for i in range(10)]
+    assert [f.result(timeout=30) for f in futures] == [6.0 * i for i in range(10)]
+    stats = server.stats()
+    assert stats["completed"] == 10
+    assert stats["in_flight"] == 0
+
+
+def test_dead_worker_fails_its_requests_and_is_restarted(server):
+    assert server.submit(1, block=True).result(timeout=30) == 6.0
+
+    start = time.monotonic()
+    doomed = server.submit("die", block=True)
+    with pytest.raises(RuntimeError, match="exited"):
+        doomed.result(timeout=10)
+    assert time.monotonic() - start < 10
+
+    assert server.submit(2, block=True).result(timeout=30) == 12.0
+    stats = server.stats()
+    assert stats["restarts"] == 1
+    assert stats["workers_alive"] == 1
+    assert stats["in_flight"] == 0
+
+
+def test_overdue_batch_times_out_and_worker_is_replaced():
+    server = make_server(request_timeout=1)
+    try:
+        server.submit(1, block=True).result(timeout=30)
+        with pytest.raises(TimeoutError):
+            server.submit("hang", block=True).result(timeout=10)
+        assert server.submit(3, block=True).result(timeout=30) == 18.0
+        stats = server.stats()
+        assert stats["timed_out"] == 1
+        assert stats["restarts"] == 1
+    finally:
+        server.shutdown()
+
+
+def test_cancelled_requests_leave_the_pending_table(server):
+    server.submit(1, block=True).result(timeout=30)
+    future = server.submit("hang", block=True)
+    wait_for(lambda: server.stats()["in_flight"] == 1)
+    queued = server.submit(2, block=True)
+    assert queued.cancel()
+    wait_for(lambda: server.stats()["in_flight"] == 1)
+    assert server.stats()["cancelled"] == 1
+    future.cancel()
+
+
+def test_load_failure_is_reported_per_request():
+    server = BatchingModelServer("broken", loader="tests.stand_in_model:fail_to_load",
+                                 handler="tests.stand_in_model:infer", monitor_interval=0.1)
+    try:
+        with pytest.raises(RuntimeError, match="Initialization Error: no weights"):
+            server.submit(1, block=True).result(timeout=30)
+    finally:
+        server.shutdown()
@@ -0,0 +1,53 @@
+# tests/test_router.py
+import asyncio
+import threading
+
+from agents.router import IntentRouter
+
+
+class StubEmbedder:
+    """Two-dimensional vectors: queries mentioning "scan" point at the rag centroid."""
+
+    def __init__(self):
+        self.query_threads = []
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        self.query_threads.append(threading.current_thread())
+        return self._vector(text)
+
+    @staticmethod
+    def _vector(text):
+        return [1.0, 0.0] if "scan" in text or "rag" in text else [0.0, 1.0]
+
+
+def make_router(tmp_path):
+    examples = tmp_path / "examples.json"
+    examples.write_text('{"rag": ["rag scan"], "team": ["what is cancer"], "trivial": ["hello"]}')
+    embedder = StubEmbedder()
+    router = IntentRouter(embedder_factory=lambda: embedder, examples_path=str(examples))
+    router.warm_up()
+    return router, embedder
+
+
+def test_aclassify_embeds_off_the_event_loop(tmp_path):
+    router, embedder = make_router(tmp_path)
+
+    async def classify():
+        loop_thread = threading.current_thread()
+        route = await router.aclassify("does a scan show spread")
+        return route, loop_thread
+
+    route, loop_thread = asyncio.run(classify())
+    assert route["method"] == "embedding" and route["branch"] == "rag"
+    assert embedder.query_threads and loop_thread not in embedder.query_threads
+
+
+def test_aclassify_matches_classify_and_uses_the_cache(tmp_path):
+    router, embedder = make_router(tmp_path)
+    for query in ("hello", "does a scan show spread", "which foods lower risk"):
+        assert asyncio.run(router.aclassify(query)) == router.classify(query)
+    # Every query was embedded at most once
+    assert len(embedder.query_threads) == 2
@@ -0,0 +1,142 @@
+# tests/test_search_cache.py
+import json
+import threading
+import time
+
+import pytest
+
+from services import search_cache as search_cache_module
+from services.search_cache import SearchCache, normalize_query
+
+
+class FakeSearch:
+    """Local stand-in for DDGS: counts calls per (kind, query) and can fail or block."""
+
+    def __init__(self, fail_on=(), gate=None):
+        self.fail_on = set(fail_on)
+        self.gate = gate
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, kind, query, max_results=5, **kwargs):
+        with self._lock:
+            self.calls.append((kind, query))
+        if self.gate is not None:
+            self.gate.wait(5)
+        if query in self.fail_on:
+            raise RuntimeError("rate limited")
+        return [{"title": f"{kind}: {query} #{i}", "href": f"https://example.org/{i}"} for i in range(max_results)]
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SearchCache(path=str(tmp_path / "search.sqlite3"), ttl=60, news_ttl=10, max_entries=3)
+
+
+def fetch(cache, backend, kind, query, **params):
+    return cache.fetch(kind, query, lambda q, **kw: backend(kind, q, **kw), **params)
+
+
+def test_queries_are_normalized():
+    assert normalize_query("  What is BRCA?  ") == normalize_query("what is   brca") == "what is brca"
+
+
+def test_variants_of_a_query_share_one_search(cache):
+    backend = FakeSearch()
+    first = fetch(cache, backend, "text", "Lung cancer screening?")
+    assert fetch(cache, backend, "text", "  lung CANCER screening ") == first
+    assert len(backend.calls) == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_entries_expire_after_their_ttl(cache, monkeypatch):
+    backend = FakeSearch()
+    now = [1000.0]
+    monkeypatch.setattr(search_cache_module.time, "time", lambda: now[0])
+    fetch(cache, backend, "text", "leukemia causes")
+    fetch(cache, backend, "news", "leukemia causes")
+
+    now[0] += 30  # news (10 s) expired, text (60 s) not
+    fetch(cache, backend, "text", "leukemia causes")
+    fetch(cache, backend, "news", "leukemia causes")
+    assert backend.calls.count(("text", "leukemia causes")) == 1
+    assert backend.calls.count(("news", "leukemia causes")) == 2
+
+    now[0] += 60
+    fetch(cache, backend, "text", "leukemia causes")
+    assert backend.calls.count(("text", "leukemia causes")) == 2
+
+
+def test_news_and_text_are_cached_separately(cache):
+    backend = FakeSearch()
+    text = fetch(cache, backend, "text", "hpv vaccine")
+    news = fetch(cache, backend, "news", "hpv vaccine")
+    assert text != news
+    assert backend.calls == [("text", "hpv vaccine"), ("news", "hpv vaccine")]
+
+
+def test_errors_are_not_cached(cache):
+    backend = FakeSearch(fail_on={"melanoma survival"})
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            fetch(cache, backend, "text", "melanoma survival")
+    assert len(backend.calls) == 2
+    assert cache.stats()["errors"] == 2
+
+    backend.fail_on.clear()
+    fetch(cache, backend, "text", "melanoma survival")
+    fetch(cache, backend, "text", "melanoma survival")
+    assert len(backend.calls) == 3
+
+
+def test_store_is_bounded_least_recently_used_first(cache, monkeypatch):
+    backend = FakeSearch()
+    now = [1000.0]
+    monkeypatch.setattr(search_cache_module.time, "time", lambda: now[0])
+    for query in ("a1", "a2", "a3"):
+        now[0] += 1
+        fetch(cache, backend, "text", query)
+    now[0] += 1
+    fetch(cache, backend, "text", "a1")  # a2 is now the least recently used
+    now[0] += 1
+    fetch(cache, backend, "text", "a4")
+
+    assert cache.stats()["entries"] == 3
+    calls = len(backend.calls)
+    fetch(cache, backend, "text", "a1")
+    assert len(backend.calls) == calls
+    fetch(cache, backend, "text", "a2")
+    assert len(backend.calls) == calls + 1
+
+
+def test_concurrent_identical_searches_call_the_backend_once(cache):
+    gate = threading.Event()
+    backend = FakeSearch(gate=gate)
+    results = []
+
+    def ask():
+        results.append(fetch(cache, backend, "text", "BRCA gene"))
+
+    threads = [threading.Thread(target=ask) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while not backend.calls:
+        time.sleep(0.01)
+    time.sleep(0.1)  # the other threads are now waiting on the first one
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert len(backend.calls) == 1
+    assert len(results) == 8 and all(r == results[0] for r in results)
+
+
+def test_tools_serve_repeated_searches_from_the_cache(cache):
+    pytest.importorskip("agno")
+    from agents.web_tools import CachedDuckDuckGoTools
+
+    backend = FakeSearch()
+    tools = CachedDuckDuckGoTools(cache=cache, search_backend=backend)
+    first = tools.web_search("colon cancer tests")
+    assert tools.web_search("Colon cancer tests?") == first
+    assert json.loads(tools.search_news("colon cancer tests"))[0]["title"].startswith("news:")
+    assert [kind for kind, _ in backend.calls] == ["text", "news"]
@@ -0,0 +1,57 @@
+# tests/test_summarizer_parity.py
+"""
+The int8 and ONNX summarizer backends must stay close to the fp32 PyTorch
+output. Needs torch + transformers (and optimum[onnxruntime] for ONNX) and
+downloads SUMMARIZER_MODEL_ID on first run; skipped when they are missing.
+
+    SUMMARIZER_MIN_PARITY=0.8 python -m pytest tests/test_summarizer_parity.py
+"""
+
+import os
+
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from agents.summarizer import load_summarizer, summarize_batch, summary_parity  # noqa: E402
+
+MIN_PARITY = float(os.getenv("SUMMARIZER_MIN_PARITY", "0.8"))
+
+DOCS = [
+    "CT chest with contrast. Clinical history: 58-year-old former smoker with persistent cough. "
+    "Findings: A 14 mm spiculated nodule is present in the right upper lobe, increased from 9 mm "
+    "on the prior study six months ago. Two enlarged right hilar lymph nodes measure up to 12 mm "
+    "in short axis. No pleural effusion. The remaining lung parenchyma shows mild centrilobular "
+    "emphysema. Impression: Enlarging spiculated right upper lobe nodule with hilar adenopathy, "
+    "suspicious for primary lung malignancy. Recommend PET-CT and tissue sampling.",
+    "Complete blood count. White blood cell count 38.2 x10^9/L (high), with 62 percent blasts on "
+    "the peripheral smear. Hemoglobin 8.1 g/dL (low). Platelets 41 x10^9/L (low). Lactate "
+    "dehydrogenase is elevated at 780 U/L. Uric acid 9.4 mg/dL. Comment: Findings are concerning "
+    "for an acute leukemia. Urgent hematology referral, flow cytometry and bone marrow biopsy "
+    "are advised. Monitor for tumor lysis syndrome given the elevated uric acid and LDH.",
+    "Ultrasound of the right breast. A 17 mm irregular hypoechoic mass with angular margins and "
+    "posterior acoustic shadowing is seen at the 10 o'clock position, 4 cm from the nipple. "
+    "Internal vascularity is present on color Doppler. A morphologically abnormal axillary lymph "
+    "node with cortical thickening of 5 mm is noted. Assessment: BI-RADS 5, highly suggestive of "
+    "malignancy. Ultrasound-guided core needle biopsy of the mass and the axillary node is "
+    "recommended.",
+]
+
+
+@pytest.fixture(scope="module")
+def reference():
+    return summarize_batch(load_summarizer("torch"), DOCS)
+
+
+@pytest.mark.parametrize("backend", ["int8", "onnx"])
+def test_backend_matches_fp32(backend, reference):
+    if backend == "onnx":
+        pytest.importorskip("optimum.onnxruntime")
+    summaries = summarize_batch(load_summarizer(backend), DOCS)
+
+    exact, similarity = summary_parity(reference, summaries)
+    assert similarity >= MIN_PARITY, (
+        f"{backend} summaries drifted from fp32: token similarity {similarity:.2f} < {MIN_PARITY} "
+        f"(exact matches {exact:.2f})"
+    )
@@ -0,0 +1,38 @@
+# tests/test_supervisor.py
+import asyncio
+import os
+import threading
+
+# rag/retrival.py checks its settings at import time; nothing here calls Groq or Qdrant
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("QDRANT_URL", "http://127.0.0.1:6333")
+
+from agents import supervisor as supervisor_module  # noqa: E402
+from agents.supervisor import SupervisorAgent  # noqa: E402
+
+
+class StubFanout:
+    async def run(self, query):
+        await asyncio.sleep(0)
+        return f"team answer to {query}", {"thread": threading.current_thread().name}
+
+
+def make_supervisor(monkeypatch):
+    monkeypatch.setattr(supervisor_module.router, "classify",
+                        lambda query: {"branch": "team", "confidence": 1.0, "method": "stub"})
+    agent = SupervisorAgent(mode="fanout")
+    agent._fanout = StubFanout()
+    return agent
+
+
+def test_sync_run_in_fanout_mode(monkeypatch):
+    assert make_supervisor(monkeypatch).run("q") == "team answer to q"
+
+
+def test_sync_run_inside_a_running_event_loop(monkeypatch):
+    agent = make_supervisor(monkeypatch)
+
+    async def handler():
+        return agent.run("q")
+
+    assert asyncio.run(handler()) == "team answer to q"
@@ -0,0 +1,166 @@
+# tests/test_write_buffer.py
+import json
+import os
+
+import pytest
+
+from services.write_buffer import WriteBuffer
+
+
+class FakeQuery:
+    def __init__(self, table):
+        self.table = table
+        self.op = None
+
+    def insert(self, rows):
+        self.op = ("insert", rows)
+        return self
+
+    def update(self, fields):
+        self.op = ("update", fields)
+        return self
+
+    def eq(self, column, value):
+        self.op += ([value],)
+        return self
+
+    def in_(self, column, values):
+        self.op += (list(values),)
+        return self
+
+
+class RowRejected(Exception):
+    """Shaped like postgrest's APIError for a NOT NULL violation."""
+
+    code = "23502"
+    details = None
+
+
+class FakeDB:
+    """Rejects any insert containing a row with "bad" set and updates with a "bad" field."""
+
+    def __init__(self):
+        self.chat_rows = []
+        self.reports = {}
+        self.down = False
+        self.inserts = 0
+
+    def execute(self, table, build):
+        query = build(FakeQuery(table))
+        if self.down:
+            raise ConnectionError("database unreachable")
+        if query.op[0] == "insert":
+            self.inserts += 1
+            if any(row.get("bad") for row in query.op[1]):
+                raise RowRejected("invalid chat row")
+            self.chat_rows.extend(query.op[1])
+        else:
+            if "bad" in query.op[1]:
+                raise RowRejected("invalid report update")
+            for report_id in query.op[2]:
+                self.reports.setdefault(report_id, {}).update(query.op[1])
+
+
+@pytest.fixture
+def buffer(tmp_path):
+    db = FakeDB()
+    buffer = WriteBuffer(str(tmp_path), db=db, max_rows=10 ** 9, flush_seconds=3600, max_attempts=3)
+    buffer.start()
+    yield buffer, db
+    buffer.shutdown()
+
+
+def test_bad_chat_row_does_not_block_other_writes(buffer):
+    buffer, db = buffer
+    buffer.add_chat({"message": "a"})
+    buffer.add_chat({"message": "b", "bad": True})
+    buffer.update_report(1, {"status": "done"})
+
+    # The bulk insert fails; the report update still goes out
+    assert buffer.flush() == 1
+    assert db.reports == {1: {"status": "done"}}
+    assert db.chat_rows == []
+
+    # The failed rows are retried one by one, so the good one gets through
+    assert buffer.flush() == 1
+    assert db.chat_rows == [{"message": "a"}]
+    assert buffer.stats()["pending_chat_rows"] == 1
+
+
+def test_successful_writes_are_not_repeated(buffer):
+    buffer, db = buffer
+    buffer.add_chat({"message": "a"})
+    buffer.update_report(1, {"bad": 1})
+    buffer.flush()
+    buffer.add_chat({"message": "b"})
+    buffer.flush()
+    assert db.chat_rows == [{"message": "a"}, {"message": "b"}]
+
+
+def test_rows_that_keep_failing_are_dead_lettered(buffer):
+    buffer, db = buffer
+    buffer.add_chat({"message": "bad", "bad": True})
+    buffer.update_report(7, {"bad": 1})
+    for _ in range(3):
+        with pytest.raises(RowRejected):
+            buffer.flush()
+    assert buffer.flush() == 0
+    stats = buffer.stats()
+    assert stats["dead_lettered"] == 2
+    assert stats["pending_chat_rows"] == stats["pending_report_updates"] == 0
+
+    with open(os.path.join(buffer.directory, "dead_letter.jsonl")) as f:
+        dead = [json.loads(line) for line in f]
+    assert {entry["kind"] for entry in dead} == {"chat", "report"}
+    assert all(entry["attempts"] == 3 for entry in dead)
+
+
+def test_outage_is_retried_without_limit_in_bulk(buffer):
+    buffer, db = buffer
+    for i in range(50):
+        buffer.add_chat({"message": str(i)})
+    buffer.update_report(1, {"status": "done"})
+    db.down = True
+    for _ in range(20):
+        with pytest.raises(ConnectionError):
+            buffer.flush()
+    assert buffer.stats()["dead_lettered"] == 0
+
+    db.down = False
+    db.inserts = 0
+    assert buffer.flush() == 51
+    assert db.inserts == 1
+    assert len(db.chat_rows) == 50 and db.reports == {1: {"status": "done"}}
+
+
+def test_rejections_are_kept_in_the_journal(tmp_path):
+    db = FakeDB()
+    buffer = WriteBuffer(str(tmp_path), db=db, max_rows=10 ** 9, flush_seconds=3600, max_attempts=3)
+    buffer.start()
+    buffer.add_chat({"message": "a", "bad": True})
+    with pytest.raises(RowRejected):
+        buffer.flush()
+    db.down = True
+    buffer.shutdown()  # the final flush hits an outage, which counts nothing
+
+    restarted = WriteBuffer(str(tmp_path), db=db, max_rows=10 ** 9, flush_seconds=3600, max_attempts=3)
+    restarted.start()
+    assert restarted._chat_rows == [[{"message": "a", "bad": True}, 1]]
+    restarted.shutdown()
+
+
+@pytest.mark.parametrize("error, rejected", [
+    ({"code": "23505", "message": "duplicate key"}, True),
+    ({"code": "PGRST204", "message": "unknown column"}, True),
+    ({"code": "57014", "message": "statement timeout"}, False),
+    ({"code": "PGRST301", "message": "JWT expired"}, False),
+    ({"code": 503, "message": "JSON could not be generated"}, False),
+    ({"code": 413, "message": "JSON could not be generated"}, True),
+])
+def test_postgrest_errors_are_classified(error, rejected):
+    from postgrest.exceptions import APIError
+
+    from services.db import is_row_error
+
+    assert is_row_error(APIError(error)) is rejected
+    assert is_row_error(ConnectionError("unreachable")) is False
@@ -1,11 +1,225 @@
 # utils/extractor.py
 
-import PyPDF2
+import math
+import multiprocessing as mp
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
-def extract_text_from_pdf(file_path: str) -> str:
-    text = ""
-    with open(file_path, "rb") as file:
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# auto picks the fastest installed backend: pdfium -> pymupdf -> pypdf2
+PDF_BACKEND = os.getenv("PDF_BACKEND", "auto")
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Smaller documents are extracted in-process; the pool only pays off for long ones
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+
+
+# ----------------------------------------------------
+#   BACKENDS: page_count(path), pages(path, start, stop)
+# ----------------------------------------------------
+def _pdfium_page_count(path):
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(path)
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def _pdfium_pages(path, start, stop):
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(path)
+    try:
+        for i in range(start, stop):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            yield textpage.get_text_range()
+            textpage.close()
+            page.close()
+    finally:
+        pdf.close()
+
+
+def _pymupdf_page_count(path):
+    import pymupdf
+
+    with pymupdf.open(path) as doc:
+        return doc.page_count
+
+
+def _pymupdf_pages(path, start, stop):
+    import pymupdf
+
+    with pymupdf.open(path) as doc:
+        for i in range(start, stop):
+            yield doc[i].get_text()
+
+
+def _pypdf2_page_count(path):
+    import PyPDF2
+
+    with open(path, "rb") as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def _pypdf2_pages(path, start, stop):
+    import PyPDF2
+
+    with open(path, "rb") as file:
         reader = PyPDF2.PdfReader(file)
-        for page in reader.pages:
-            text += page.extract_text() or ""
-    return text
\ No newline at end of file
+        for i in range(start, stop):
+            yield reader.pages[i].extract_text() or ""
+
+
+BACKENDS = {
+    "pdfium": ("pypdfium2", _pdfium_page_count, _pdfium_pages),
+    "pymupdf": ("pymupdf", _pymupdf_page_count, _pymupdf_pages),
+    "pypdf2": ("PyPDF2", _pypdf2_page_count, _pypdf2_pages),
+}
+
+
+def get_backend(name: str = None) -> str:
+    name = name or PDF_BACKEND
+    if name != "auto":
+        return name
+    import importlib.util
+
+    for backend, (module, _, _) in BACKENDS.items():
+        if importlib.util.find_spec(module) is not None:
+            return backend
+    return "pypdf2"
+
+
+# pdfium and MuPDF are not thread-safe: two threads calling into either one at
+# once crash the interpreter. One thread at a time extracts with them in this
+# process; a thread that finds the backend busy sends its document to the pool.
+_INPROCESS_LOCKS = {"pdfium": threading.Lock(), "pymupdf": threading.Lock()}
+
+
+# ----------------------------------------------------
+#   PROCESS POOL
+# ----------------------------------------------------
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool(pool):
+    # A worker died (e.g. a crash inside the PDF library); the next call starts a fresh pool
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _extract_range(backend, path, start, stop):
+    return list(BACKENDS[backend][2](path, start, stop))
+
+
+def _iter_parallel(backend, path, workers, count=None):
+    pool = _get_pool(workers)
+    done = 0
+    try:
+        if count is None:
+            count = pool.submit(BACKENDS[backend][1], path).result()
+        if not count:
+            return
+        per_task = math.ceil(count / workers)
+        starts = range(0, count, per_task)
+        # map keeps page order; each worker opens the document once for its range
+        for texts in pool.map(
+            _extract_range,
+            [backend] * len(starts), [path] * len(starts), starts,
+            [min(start + per_task, count) for start in starts],
+        ):
+            for text in texts:
+                yield text
+                done += 1
+        return
+    except BrokenProcessPool as e:
+        _reset_pool(pool)
+        error = e
+    except Exception as e:
+        error = e
+    print(f"{backend} failed on {path} at page {done + 1}, PyPDF2 takes over:", error)
+    yield from _iter_pypdf2(path, done, count)
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
+
+
+# ----------------------------------------------------
+#   PUBLIC API
+# ----------------------------------------------------
+def _iter_pypdf2(path, start, stop=None):
+    yield from _pypdf2_pages(path, start, _pypdf2_page_count(path) if stop is None else stop)
+
+
+def _iter_in_process(backend, path, count):
+    done = 0
+    try:
+        for text in BACKENDS[backend][2](path, 0, count):
+            yield text
+            done += 1
+    except Exception as e:
+        if backend == "pypdf2":
+            raise
+        print(f"{backend} failed on {path} at page {done + 1}, PyPDF2 takes over:", e)
+        yield from _iter_pypdf2(path, done, count)
+
+
+def iter_pdf_pages(file_path: str, backend: str = None, workers: int = None):
+    """
+    Yields the text of each page in order, as it is extracted.
+
+    Uses the fastest installed backend; if it fails, PyPDF2 takes over from
+    the failing page. Documents with at least PDF_PARALLEL_MIN_PAGES pages
+    are split into page ranges extracted by a process pool, and so are
+    documents arriving while another thread is using a backend that is not
+    thread-safe.
+    """
+    backend = get_backend(backend)
+    workers = PDF_WORKERS if workers is None else workers
+    lock = _INPROCESS_LOCKS.get(backend)
+    if lock is not None and not lock.acquire(blocking=False):
+        yield from _iter_parallel(backend, file_path, max(1, workers))
+        return
+    try:
+        try:
+            count = BACKENDS[backend][1](file_path)
+        except Exception as e:
+            if backend == "pypdf2":
+                raise
+            print(f"{backend} could not open {file_path}, falling back to PyPDF2:", e)
+            yield from _iter_pypdf2(file_path, 0)
+            return
+        if not (workers > 1 and count >= PDF_PARALLEL_MIN_PAGES):
+            yield from _iter_in_process(backend, file_path, count)
+            return
+    finally:
+        if lock is not None:
+            lock.release()
+    yield from _iter_parallel(backend, file_path, workers, count)
+
+
+def extract_text_from_pdf(file_path: str, backend: str = None, workers: int = None) -> str:
+    return "".join(iter_pdf_pages(file_path, backend, workers))